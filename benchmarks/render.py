@@ -0,0 +1,285 @@
+"""Render throughput benchmarks (offline, with synthetic streams).
+
+Replays synthetic responses through the streaming display (`MarkdownStream`, the
+`Live`/`Markdown` pipeline responses are streamed into), writing to a null
+terminal, for every combination of:
+    - response length (tokens)
+    - chunk size (tokens per delta)
+    - chunk rate (deltas per second, 0 for as fast as possible)
+    - code block density (share of tokens in code blocks)
+    - terminal width
+
+Measures, per scenario:
+    - CPU time per token (all threads, including the refresh thread)
+    - frames rendered (live refreshes) and dropped frames (refreshes missed at
+      the display's refresh rate)
+    - max frame latency (refresh, including waiting for the display's lock)
+    - max append latency (handling a delta, which blocks the stream)
+
+Usage:
+    python -m benchmarks.render [--tokens N,...] [--chunk-size N,...]
+                                [--rate N,...] [--code-density X,...]
+                                [--width N,...] [--runs N] [--output FILE]
+                                [--baseline FILE] [--max-regression PERCENT]
+
+Exits with a non-zero status when a metric regressed (vs baseline).
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import time
+from typing import Any, Callable, Iterator, NamedTuple
+
+from rich.console import Console
+
+from benchmarks.startup import check
+
+# Metrics compared to a baseline (others depend on the scenario, not on speed)
+COMPARED_METRICS = ("cpu_us_per_token", "max_frame_ms", "max_append_ms")
+
+WORDS = (
+    "the a stream of tokens is rendered as markdown while response arrives "
+    + "each block printed once only tail redrawn live terminal"
+).split()
+CODE_LINES = (
+    "def handle(event: Event) -> None:",
+    "    if event.kind == 'delta':",
+    "        buffer.append(event.text)",
+    "for i, line in enumerate(lines):",
+    "    total += len(line)  # count",
+    "return {'status': 'ok', 'items': items}",
+)
+TOKEN_REGEX = re.compile(r"\S+\s*|\s+")
+
+
+class Scenario(NamedTuple):
+    tokens: int
+    chunk_size: int
+    rate: float
+    code_density: float
+    width: int
+
+    @property
+    def name(self) -> str:
+        return (
+            f"tokens={self.tokens},chunk={self.chunk_size},rate={self.rate:g},"
+            + f"code={self.code_density:g},width={self.width}"
+        )
+
+
+def synthetic_response(tokens: int, code_density: float, seed: int = 0) -> str:
+    """Markdown response of about `tokens` tokens (words), made of paragraphs,
+    lists and code blocks (holding about `code_density` of the tokens)."""
+    rand = random.Random(seed)
+    blocks: list[str] = []
+    num_tokens = 0
+    num_code_tokens = 0
+
+    while num_tokens < tokens:
+        if num_code_tokens < code_density * num_tokens or (
+            code_density == 1 and not blocks
+        ):
+            lines = [rand.choice(CODE_LINES) for _ in range(rand.randint(5, 30))]
+            block = "```python\n" + "\n".join(lines) + "\n```"
+            size = len(block.split())
+            num_code_tokens += size
+        elif rand.random() < 0.2:
+            items = [
+                "- " + " ".join(rand.choices(WORDS, k=rand.randint(3, 12)))
+                for _ in range(rand.randint(2, 6))
+            ]
+            block = "\n".join(items)
+            size = len(block.split())
+        else:
+            words = rand.choices(WORDS, k=rand.randint(20, 80))
+            words[0] = words[0].capitalize()
+            block = " ".join(words) + "."
+            size = len(words)
+
+        blocks.append(block)
+        num_tokens += size
+    return "\n\n".join(blocks) + "\n"
+
+
+def chunks(content: str, chunk_size: int) -> Iterator[str]:
+    """Split content in deltas of `chunk_size` tokens."""
+    tokens = TOKEN_REGEX.findall(content)
+
+    for i in range(0, len(tokens), chunk_size):
+        yield "".join(tokens[i : i + chunk_size])
+
+
+def timed(function: Callable[[], Any], latencies: list[float]) -> Callable[[], Any]:
+    def wrapper() -> Any:
+        start = time.perf_counter()
+        try:
+            return function()
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    return wrapper
+
+
+def replay(scenario: Scenario, seed: int = 0) -> dict[str, float]:
+    """Stream synthetic response of scenario to a null terminal.
+
+    Returns:
+        dict[str, float]: Metrics.
+    """
+    from intelliterm.rendering import MarkdownStream
+
+    content = synthetic_response(scenario.tokens, scenario.code_density, seed)
+    deltas = list(chunks(content, scenario.chunk_size))
+    interval = 1 / scenario.rate if scenario.rate else 0
+
+    with open(os.devnull, "w") as null:
+        console = Console(
+            file=null,
+            width=scenario.width,
+            height=50,
+            force_terminal=True,
+            color_system="truecolor",
+        )
+        frames: list[float] = []
+        appends: list[float] = []
+
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+
+        with MarkdownStream(console) as stream:
+            live = stream._live
+            live.refresh = timed(live.refresh, frames)  # type: ignore
+
+            for i, delta in enumerate(deltas):
+                if interval:
+                    # (paced, as if streamed by a model)
+                    time.sleep(max(start + i * interval - time.perf_counter(), 0))
+                append_start = time.perf_counter()
+                stream.append(delta)
+                appends.append(time.perf_counter() - append_start)
+
+        wall = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+
+    num_tokens = len(TOKEN_REGEX.findall(content))
+    expected_frames = int(wall * live.refresh_per_second)
+    return {
+        "deltas": len(deltas),
+        "wall_ms": wall * 1000,
+        "cpu_ms": cpu * 1000,
+        "cpu_us_per_token": cpu / num_tokens * 1e6,
+        "frames": len(frames),
+        "dropped_frames": max(expected_frames - len(frames), 0),
+        "max_frame_ms": max(frames, default=0) * 1000,
+        "max_append_ms": max(appends, default=0) * 1000,
+    }
+
+
+def run(scenarios: list[Scenario], runs: int) -> dict[str, Any]:
+    """Run all scenarios, reporting medians over `runs` runs."""
+    metrics: dict[str, float] = {}
+
+    for scenario in scenarios:
+        samples = [replay(scenario, seed) for seed in range(runs)]
+
+        for name in samples[0]:
+            metrics[f"{scenario.name}.{name}"] = statistics.median(
+                sample[name] for sample in samples
+            )
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": runs,
+        "metrics": metrics,
+    }
+
+
+def report(scenarios: list[Scenario], metrics: dict[str, float]) -> None:
+    columns = (
+        ("cpu_us_per_token", "cpu µs/tok"),
+        ("frames", "frames"),
+        ("dropped_frames", "dropped"),
+        ("max_frame_ms", "max frame ms"),
+        ("max_append_ms", "max append ms"),
+    )
+    print(f"{'scenario':<58}" + "".join(f"{title:>15}" for _, title in columns))
+
+    for scenario in scenarios:
+        print(
+            f"{scenario.name:<58}"
+            + "".join(
+                f"{metrics[f'{scenario.name}.{name}']:>15.1f}" for name, _ in columns
+            )
+        )
+
+
+def parse_list(type: Callable[[str], Any]) -> Callable[[str], list[Any]]:
+    return lambda value: [type(item) for item in value.split(",")]
+
+
+def main(args: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--tokens", type=parse_list(int), default=[500, 2000])
+    parser.add_argument("--chunk-size", type=parse_list(int), default=[1, 8])
+    parser.add_argument(
+        "--rate",
+        type=parse_list(float),
+        default=[0, 200],
+        help="deltas per second (0 for as fast as possible)",
+    )
+    parser.add_argument("--code-density", type=parse_list(float), default=[0, 0.5])
+    parser.add_argument("--width", type=parse_list(int), default=[80])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output", help="write results (JSON) to file")
+    parser.add_argument("--baseline", help="previous results (JSON) to compare to")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=20,
+        help="max regression vs baseline, in percent",
+    )
+    options = parser.parse_args(args)
+
+    scenarios = [
+        Scenario(*values)
+        for values in itertools.product(
+            options.tokens,
+            options.chunk_size,
+            options.rate,
+            options.code_density,
+            options.width,
+        )
+    ]
+    results = run(scenarios, options.runs)
+    report(scenarios, results["metrics"])
+
+    failures: list[str] = []
+    if options.baseline:
+        with open(options.baseline) as file:
+            baseline = {
+                name: value
+                for name, value in json.load(file)["metrics"].items()
+                if name.endswith(COMPARED_METRICS)
+            }
+        failures = check(results["metrics"], {}, baseline, options.max_regression)
+    results["failures"] = failures
+
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(results, file, indent=4)
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
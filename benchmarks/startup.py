@@ -0,0 +1,298 @@
+"""Startup and import-time benchmarks (offline, against a stub backend).
+
+Measures:
+    - per-module import cost (`python -X importtime`)
+    - time-to-prompt for interactive mode (`ai`)
+    - time-to-first-byte for oneshot mode (`ai -m <prompt>`)
+    - peak RSS of both
+
+Usage:
+    python -m benchmarks.startup [--runs N] [--output FILE]
+                                 [--budget FILE] [--baseline FILE]
+                                 [--max-regression PERCENT]
+
+Exits with a non-zero status when a budget is exceeded.
+"""
+
+import argparse
+import json
+import os
+import platform
+import pty
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Optional
+
+from benchmarks.stub_backend import PROMPT_READY, words
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "budget.json")
+
+IMPORTTIME_REGEX = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)$")
+
+STUB_CONFIG = """
+[DEFAULT]
+backend = OPENAI
+model = gpt-3.5-turbo
+temperature = 0
+presence_penalty = 0
+frequency_penalty = 0
+accent_color = blue
+
+[GPT3]
+model = gpt-3.5-turbo
+
+[CONFIG]
+active = GPT3
+"""
+
+
+def isolated_env(home: str) -> dict[str, str]:
+    """Environment isolating intelliterm's config, chats and logs in `home`."""
+    data_dir = os.path.join(home, "data")
+    config_dir = os.path.join(data_dir, "intelliterm")
+    os.makedirs(config_dir, exist_ok=True)
+
+    with open(os.path.join(config_dir, "config.ini"), "w") as file:
+        file.write(STUB_CONFIG)
+
+    return {
+        **os.environ,
+        "PYTHONPATH": ROOT_DIR,
+        "XDG_DATA_HOME": data_dir,
+        "XDG_DOCUMENTS_DIR": os.path.join(home, "documents"),
+        "OPENAI_API_KEY": "STUB_KEY",
+        "ANTHROPIC_API_KEY": "STUB_KEY",
+        "INTELLITERM_NO_DAEMON": "1",
+    }
+
+
+def max_rss_bytes(rusage: Any) -> int:
+    # (kilobytes on Linux, bytes on macOS)
+    return int(rusage.ru_maxrss * (1 if platform.system() == "Darwin" else 1024))
+
+
+def wait(process: subprocess.Popen) -> int:
+    """Wait for process to exit and return its peak RSS (in bytes)."""
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return max_rss_bytes(rusage)
+
+
+def import_times(module: str, env: dict[str, str]) -> dict[str, float]:
+    """Cumulative import time (in ms) of every module imported by `module`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, float] = {}
+
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_REGEX.match(line)
+        if match:
+            times[match.group(4)] = int(match.group(2)) / 1000
+    return times
+
+
+def time_to_prompt(env: dict[str, str]) -> tuple[float, int]:
+    """Time (in ms) from launching `ai` until the interactive prompt is ready."""
+    primary, secondary = pty.openpty()  # interactive mode requires a tty
+
+    try:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.stub_backend"],
+            env=env,
+            stdin=secondary,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        assert process.stdout
+
+        elapsed: Optional[float] = None
+        for line in process.stdout:
+            if PROMPT_READY in line:
+                elapsed = (time.perf_counter() - start) * 1000
+        rss = wait(process)
+    finally:
+        os.close(primary)
+        os.close(secondary)
+
+    if elapsed is None:
+        raise RuntimeError("Interactive prompt was never reached")
+    return elapsed, rss
+
+
+def time_to_first_byte(env: dict[str, str]) -> tuple[float, float, int]:
+    """Time (in ms) from launching `ai -m` until the first byte and until exit.
+
+    Raises:
+        RuntimeError: If the completion failed, was incomplete, or anything was
+            written to stderr (ie: a traceback, even if it exited successfully).
+    """
+    primary, secondary = pty.openpty()  # (typed in a terminal)
+
+    try:
+        with tempfile.TemporaryFile() as stderr:
+            start = time.perf_counter()
+            process = subprocess.Popen(
+                [sys.executable, "-m", "benchmarks.stub_backend", "-m", "hello"],
+                env=env,
+                stdin=secondary,
+                stdout=subprocess.PIPE,
+                stderr=stderr,
+            )
+            assert process.stdout
+
+            first_byte = process.stdout.read(1)
+            ttfb = (time.perf_counter() - start) * 1000
+            output = first_byte + process.stdout.read()
+            rss = wait(process)
+            total = (time.perf_counter() - start) * 1000
+
+            stderr.seek(0)
+            errors = stderr.read().decode(errors="replace").strip()
+    finally:
+        os.close(primary)
+        os.close(secondary)
+
+    if process.returncode != 0 or errors:
+        raise RuntimeError(
+            f"Oneshot completion failed ({process.returncode}): {errors[-1000:]}"
+        )
+    # (words are wrapped to the terminal width)
+    if " ".join(words()) not in " ".join(output.decode().split()):
+        raise RuntimeError(f"Oneshot completion incomplete: {output.decode()!r}")
+    return ttfb, total, rss
+
+
+def run(runs: int) -> dict[str, Any]:
+    """Run all benchmarks, reporting medians over `runs` runs."""
+    with tempfile.TemporaryDirectory() as home:
+        env = isolated_env(home)
+
+        samples: dict[str, list[float]] = {}
+        imports: dict[str, list[float]] = {}
+
+        def sample(name: str, value: float) -> None:
+            samples.setdefault(name, []).append(value)
+
+        for _ in range(runs):
+            for module in ("intelliterm.main", "intelliterm.chat"):
+                for name, ms in import_times(module, env).items():
+                    imports.setdefault(name, []).append(ms)
+
+            ms, rss = time_to_prompt(env)
+            sample("interactive.time_to_prompt_ms", ms)
+            sample("interactive.peak_rss_mb", rss / 2**20)
+
+            ttfb, total, rss = time_to_first_byte(env)
+            sample("oneshot.time_to_first_byte_ms", ttfb)
+            sample("oneshot.total_ms", total)
+            sample("oneshot.peak_rss_mb", rss / 2**20)
+
+    metrics = {name: statistics.median(values) for name, values in samples.items()}
+    for name, values in imports.items():
+        metrics[f"import_ms.{name}"] = statistics.median(values)
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": runs,
+        "metrics": metrics,
+    }
+
+
+def check(
+    metrics: dict[str, float],
+    budget: dict[str, float],
+    baseline: Optional[dict[str, float]] = None,
+    max_regression: Optional[float] = None,
+) -> list[str]:
+    """Check metrics against absolute budgets and relative regressions.
+
+    Args:
+        metrics (dict[str, float]): Measured metrics.
+        budget (dict[str, float]): Upper bound per metric.
+        baseline (Optional[dict[str, float]]): Previously measured metrics.
+        max_regression (Optional[float]): Max allowed regression vs baseline
+            (in percent).
+
+    Returns:
+        list[str]: Exceeded budgets (empty if none).
+    """
+    failures = [
+        f"{name}: {metrics[name]:.1f} > {limit:.1f} (budget)"
+        for name, limit in budget.items()
+        if name in metrics and metrics[name] > limit
+    ]
+
+    if baseline and max_regression is not None:
+        for name, previous in baseline.items():
+            limit = previous * (1 + max_regression / 100)
+            if name in metrics and previous > 0 and metrics[name] > limit:
+                failures.append(
+                    f"{name}: {metrics[name]:.1f} > {limit:.1f} "
+                    + f"(baseline {previous:.1f} + {max_regression:g}%)"
+                )
+    return failures
+
+
+def report(metrics: dict[str, float], top: int = 15) -> None:
+    imports = {k: v for k, v in metrics.items() if k.startswith("import_ms.")}
+    others = {k: v for k, v in metrics.items() if not k.startswith("import_ms.")}
+
+    for name, value in others.items():
+        print(f"{name:<40} {value:>10.1f}")
+    print(f"\nslowest imports (cumulative, top {top}):")
+    for name, value in sorted(imports.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"  {name[len('import_ms.'):]:<38} {value:>10.1f}")
+
+
+def main(args: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="write results (JSON) to file")
+    parser.add_argument("--budget", default=DEFAULT_BUDGET, help="budget (JSON)")
+    parser.add_argument("--baseline", help="previous results (JSON) to compare to")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=20,
+        help="max regression vs baseline, in percent",
+    )
+    options = parser.parse_args(args)
+
+    results = run(options.runs)
+    report(results["metrics"])
+
+    with open(options.budget) as file:
+        budget = json.load(file)
+
+    baseline = None
+    if options.baseline:
+        with open(options.baseline) as file:
+            baseline = json.load(file)["metrics"]
+
+    failures = check(results["metrics"], budget, baseline, options.max_regression)
+    results["failures"] = failures
+
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(results, file, indent=4)
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,84 @@
+"""Offline stub backend for benchmarks.
+
+Runs intelliterm with both backends (and the interactive prompt) stubbed out:
+
+    python -m benchmarks.stub_backend [intelliterm args]
+
+Environment:
+    STUB_CHUNKS (int): Number of streamed chunks per response. Defaults to 50.
+    STUB_CHUNK_DELAY (float): Seconds between chunks. Defaults to 0.
+"""
+
+import os
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, Iterator
+
+# Printed (to stdout) once the interactive prompt is ready for input.
+PROMPT_READY = "<<intelliterm:prompt-ready>>"
+
+
+def words() -> list[str]:
+    """Words of a stubbed response (in order)."""
+    return [f"word{i}" for i in range(int(os.environ.get("STUB_CHUNKS", 50)))]
+
+
+def stream_words() -> Iterator[str]:
+    delay = float(os.environ.get("STUB_CHUNK_DELAY", 0))
+
+    for word in words():
+        if delay:
+            time.sleep(delay)
+        yield f"{word} "
+
+
+class OpenAIStream:
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        for word in stream_words():
+            yield {"choices": [{"delta": {"content": word}}]}
+
+    def close(self) -> None:
+        pass
+
+
+class AnthropicStream:
+    def __iter__(self) -> Iterator[SimpleNamespace]:
+        for word in stream_words():
+            yield SimpleNamespace(
+                type="content_block_delta",
+                delta=SimpleNamespace(text=word),
+            )
+
+    def close(self) -> None:
+        pass
+
+
+def install() -> None:
+    """Replace network calls and the interactive prompt with stubs."""
+    os.environ.setdefault("OPENAI_API_KEY", "STUB_KEY")
+    os.environ.setdefault("ANTHROPIC_API_KEY", "STUB_KEY")
+
+    import anthropic.resources
+    import openai
+    from prompt_toolkit import PromptSession
+
+    def prompt(*args: Any, **kwargs: Any) -> str:
+        print(PROMPT_READY, flush=True)
+        raise EOFError  # quits intelliterm
+
+    openai.ChatCompletion.create = (  # type: ignore
+        lambda *args, **kwargs: OpenAIStream()
+    )
+    anthropic.resources.Messages.create = (  # type: ignore
+        lambda *args, **kwargs: AnthropicStream()  # type: ignore
+    )
+    PromptSession.prompt = prompt  # type: ignore
+
+
+if __name__ == "__main__":
+    install()
+
+    from intelliterm.main import main
+
+    main(sys.argv[1:])
@@ -0,0 +1,199 @@
+"""Branches of a chat (alternative lines of conversation), as a copy-on-write tree.
+
+A branch only holds the turns added since it was forked, and shares the turns
+before (the same prompts) with the branch it was forked from.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from rich.tree import Tree
+
+from intelliterm.prompt import Prompt
+
+# Name of the branch chats start on
+MAIN = "main"
+
+
+@dataclass
+class Branch:
+    """Line of conversation.
+
+    Attributes:
+        name (str)
+        parent (Optional[str]): Branch forked from (None for main).
+        fork (int): Turns shared with parent (ie: index forked at).
+        turns (list[Prompt]): Turns added since forked.
+    """
+
+    name: str
+    parent: Optional[str] = None
+    fork: int = 0
+    turns: list[Prompt] = field(default_factory=list)
+
+
+class BranchTree:
+    """Branches of a chat.
+
+    Attributes:
+        current (str): Name of checked out branch.
+        branches (dict[str, Branch]): Branches, by name.
+
+    Methods:
+        context(name: Optional[str] = None) -> list[Prompt]:
+            Turns of a branch (shared with its parents).
+        append(prompts: list[Prompt]) -> None: Add turns to current branch.
+        fork(at: int, name: Optional[str] = None) -> str:
+            Fork current branch and check it out.
+        checkout(name: str) -> list[Prompt]: Switch branch.
+        render() -> Tree: Branches, as a tree.
+    """
+
+    def __init__(self, context: Optional[list[Prompt]] = None) -> None:
+        self.current = MAIN
+        self.branches = {MAIN: Branch(MAIN, turns=list(context or []))}
+
+    def context(self, name: Optional[str] = None) -> list[Prompt]:
+        """Turns of a branch (prompts are shared, not copied).
+
+        Args:
+            name (Optional[str]): Defaults to current branch.
+
+        Returns:
+            list[Prompt]
+        """
+        branch = self.branches[name or self.current]
+
+        if branch.parent is None:
+            return list(branch.turns)
+        return self.context(branch.parent)[: branch.fork] + branch.turns
+
+    def append(self, prompts: list[Prompt]) -> None:
+        self.branches[self.current].turns.extend(prompts)
+
+    def fork(self, at: int, name: Optional[str] = None) -> str:
+        """Fork current branch (sharing its first turns) and check it out.
+
+        Args:
+            at (int): Number of turns shared.
+            name (Optional[str]): Defaults to a numbered name.
+
+        Raises:
+            ValueError: If a branch with name exists.
+
+        Returns:
+            str: Name of the new branch.
+        """
+        if name is None:
+            n = len(self.branches)
+            while f"{MAIN}-{n}" in self.branches:
+                n += 1
+            name = f"{MAIN}-{n}"
+        elif name in self.branches:
+            raise ValueError(f'Branch "{name}" exists')
+
+        parent = self.branches[self.current]
+        if at >= parent.fork or parent.parent is None:
+            self.branches[name] = Branch(name, parent.name, at)
+        else:
+            # (forked within the turns shared with its parent, fork it instead)
+            self.current = parent.parent
+            return self.fork(at, name)
+
+        self.current = name
+        return name
+
+    def checkout(self, name: str) -> list[Prompt]:
+        """Switch to branch.
+
+        Args:
+            name (str)
+
+        Raises:
+            KeyError: If branch doesn't exist.
+
+        Returns:
+            list[Prompt]: Turns of branch.
+        """
+        if name not in self.branches:
+            raise KeyError(name)
+
+        self.current = name
+        return self.context()
+
+    def render(self) -> Tree:
+        """Branches, as a tree (current branch highlighted).
+
+        Returns:
+            Tree
+        """
+
+        def label(branch: Branch) -> str:
+            turns = branch.fork + len(branch.turns)
+            text = f"{branch.name} [black]({turns} turns)"
+            return f"[bold]* {text}" if branch.name == self.current else text
+
+        nodes = {MAIN: Tree(label(self.branches[MAIN]))}
+
+        for branch in self.branches.values():
+            # (parents are created before branches forked from them)
+            if branch.parent is not None:
+                nodes[branch.name] = nodes[branch.parent].add(label(branch))
+        return nodes[MAIN]
+
+    def serialize(self) -> dict[str, Any]:
+        """Branches, without turns of the current branch's context (saved as the
+        chat's context, see `Chat.serialize`), so shared turns are saved once."""
+        # (turns of each branch that are in the current branch's context)
+        in_context: dict[str, int] = {}
+        branch = self.branches[self.current]
+        end = branch.fork + len(branch.turns)
+
+        while True:
+            in_context[branch.name] = end - branch.fork
+            end = branch.fork
+            if branch.parent is None:
+                break
+            branch = self.branches[branch.parent]
+
+        return {
+            "current": self.current,
+            "branches": [
+                {
+                    "name": branch.name,
+                    "parent": branch.parent,
+                    "fork": branch.fork,
+                    "in_context": in_context.get(branch.name, 0),
+                    "turns": [
+                        prompt.serialize()
+                        for prompt in branch.turns[in_context.get(branch.name, 0) :]
+                    ],
+                }
+                for branch in self.branches.values()
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, dict: dict[str, Any], context: list[Prompt]) -> "BranchTree":
+        """Branches from serialized attributes (see `serialize`).
+
+        Args:
+            dict (dict[str, Any])
+            context (list[Prompt]): Context of the current branch.
+
+        Returns:
+            BranchTree
+        """
+        tree = cls()
+        tree.current = dict["current"]
+        tree.branches = {}
+
+        for branch in dict["branches"]:
+            start = branch["fork"]
+            turns = context[start : start + branch["in_context"]] + [
+                Prompt.from_dict(prompt) for prompt in branch["turns"]
+            ]
+            tree.branches[branch["name"]] = Branch(
+                branch["name"], branch["parent"], branch["fork"], turns
+            )
+        return tree
@@ -4,26 +4,37 @@ import re
 import subprocess
 import time
 import uuid
+from collections import deque
+from contextlib import nullcontext
 from datetime import datetime
 from string import punctuation
-from typing import Any, Optional, Union
+from typing import Any, Iterable, Optional, Union
 
 import anthropic
 import openai
 from pick import pick
-from rich.markdown import Markdown
 from rich.panel import Panel
+from rich.status import Status
 
 import intelliterm
-from intelliterm.client import Backend, Client
+from intelliterm import diff, execution, files
+from intelliterm.branches import BranchTree
+from intelliterm.chunking import chunk_text, map_chunks
+from intelliterm.client import Client
 from intelliterm.command_palette import CommandPalette, prompt
 from intelliterm.config import config
 from intelliterm.console import console
-from intelliterm.constants import CODE_THEME, SAVED_CHATS_DIR
+from intelliterm.constants import SAVED_CHATS_DIR
+from intelliterm.context_store import ContextStore
 from intelliterm.notifications import notification
-from intelliterm.prompt import SPECIAL_PROMPTS, Prompt
+from intelliterm.prompt import SPECIAL_PROMPTS, Prompt, count_tokens
+from intelliterm.rendering import echo
+from intelliterm.retrieval import Index
+from intelliterm.stats import load_saved, saved_size, stats, summarize
+from intelliterm.tracing import traced
+from intelliterm.typeahead import TypeAhead
 from intelliterm.types import AutoCopy
-from intelliterm.utils import get_file_info, logger, pretty_dict
+from intelliterm.utils import get_file_info, logger, pretty_dict, shorten
 
 if "OPENAI_API_KEY" not in os.environ:
     console.error("Missing OPENAI_API_KEY")
@@ -40,6 +51,11 @@ if "ANTHROPIC_API_KEY" not in os.environ:
 openai.api_key = os.getenv("OPENAI_API_KEY")
 anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
 
+# Commands independent of the response being streamed (run right away when typed
+# ahead, instead of being queued), and their options that are not (ie: interactive)
+INDEPENDENT_COMMANDS = ("help", "version", "config")
+DEPENDENT_OPTIONS = ("edit", "reset")
+
 
 class Chat:
     """Class representing a chat client.
@@ -53,12 +69,20 @@ class Chat:
         is_completing (bool): Flag indicating whether chat is completing prompt.
         chat_id (str): Unique identifier for the chat session.
         _context (list[ChatPrompt]): Current chat context.
+        _branches (BranchTree): Branches of chat (context is the current one's).
+        _store (ContextStore): Request messages of context, updated as prompts
+            are added (keeps context bounded in memory, spilling contents of
+            old, large turns to disk).
+        _run_outputs (list[str]): Outputs of code runs, added to the next prompt.
+        _index (Optional[Index]): Index of project files (relevant chunks are
+            attached to prompts), if enabled.
 
     Methods:
         configure(options: list[str]) -> None:
             Manage intelliterm configuration.
         oneshot(toggle: bool) -> None:
             Toggle oneshot client.
+        is_oneshot() -> bool
         history(input: str) -> None:
             Add user input to history.
         context(prompt: Union[Prompt, list[Prompt]]) -> None:
@@ -67,12 +91,30 @@ class Chat:
             Return last prompt in context.
         new() -> None:
             Start a new chat (clear context).
+        branch(options: list[str]) -> None:
+            Fork chat at its last turn (or show branches).
+        checkout(name: str) -> None:
+            Switch to branch.
+        retry(options: list[str]) -> None:
+            Fork chat at its last user turn and ask it again.
         total_tokens() -> int:
             Return total number of tokens in current chat's context.
         info() -> str:
             Return current chat's info as formatted string.
-        file(path: str, prompt: ChatPrompt) -> None:
-            Handle file input.
+        run(options: list[str]) -> None:
+            Run code blocks in last response.
+        stats(options: list[str]) -> None:
+            Show performance statistics (of session, or all chats).
+        file(paths: list[str], prompt: ChatPrompt) -> None:
+            Handle file input (files, directories or glob patterns).
+        index(options: list[str]) -> None:
+            Index project files (or show index, or disable it).
+        retrieve(prompt: Prompt) -> Optional[str]:
+            Chunks of indexed files relevant to prompt.
+        ingest(lines: Iterable[str], prompt: Prompt, source: str) -> None:
+            Complete prompt on a large input, processing it in chunks.
+        commit_message(lines: Iterable[str]) -> None:
+            Generate a commit message for a git diff.
         create_title() -> str:
             Create a title for the current chat's context.
         save() -> None:
@@ -83,6 +125,12 @@ class Chat:
             Call model completion on a prompt.
         listen() -> None:
             Listen for new prompts/commands.
+        handle_independent(input: str) -> bool:
+            Take input typed ahead, if independent of the response.
+        run_independent() -> None:
+            Run commands typed ahead that are independent of the response.
+        handle(input: str) -> None:
+            Handle input (command or prompt).
     """
 
     def __init__(
@@ -98,6 +146,16 @@ class Chat:
         self._context: list[Prompt] = [
             Prompt(content=SPECIAL_PROMPTS["SYSTEM"], role="system")
         ]
+        self._branches = BranchTree(self._context)
+        self._store = ContextStore()
+        self._run_outputs: list[str] = []
+        self._index: Optional[Index] = None
+        # Inputs typed ahead (while a response was streaming), handled in order
+        self._queue: deque[str] = deque()
+        # Commands typed ahead that are independent of the response (run on the
+        # main thread, between deltas)
+        self._independent: deque[str] = deque()
+        self._draft: str = ""
 
     def history(self, input: str) -> None:
         """Add user input to history.
@@ -113,18 +171,22 @@ class Chat:
         Args:
             prompt (Union[Prompt, list[Prompt]])
         """
-        if isinstance(prompt, list):
-            self._context.extend(prompt)
-        else:
-            self._context.append(prompt)
+        prompts = prompt if isinstance(prompt, list) else [prompt]
+
+        self._context.extend(prompts)
+        self._branches.append(prompts)
+        self._store.sync(self._context)
+        self._store.trim(self._context)
 
     def serialize(self) -> dict[str, Any]:
         context = [prompt.serialize() for prompt in self._context]
-        obj = {
+        obj: dict[str, Any] = {
             "chat_id": self.chat_id,
             "timestamp": str(datetime.now()),
             "_context": context,
         }
+        if len(self._branches.branches) > 1:
+            obj["_branches"] = self._branches.serialize()
         return obj
 
     @classmethod
@@ -132,17 +194,17 @@ class Chat:
         dict = json.loads(json_str)
 
         dict.pop("timestamp", None)
+        branches = dict.pop("_branches", None)
         chat = Chat()
         chat.__dict__.update(dict)
 
-        new_context: list[Prompt] = []
-
-        for p in dict["_context"]:
-            prompt = Prompt()
-            prompt.__dict__.update(p)
-            new_context.append(prompt)
-
-        chat._context = new_context
+        chat._context = [Prompt.from_dict(p) for p in dict["_context"]]
+        chat._branches = (
+            BranchTree.from_dict(branches, chat._context)
+            if branches
+            else BranchTree(chat._context)
+        )
+        chat._switch(chat._context)
         return chat
 
     def configure(self, options: list[str]) -> None:
@@ -158,6 +220,9 @@ class Chat:
                 case "edit":
                     # > !config edit
                     config.edit()
+                case "save":
+                    # > !config save
+                    config.save_active()
                 case _:
                     # > !use <config_name>
                     config_name = options[0]
@@ -174,6 +239,9 @@ class Chat:
         """
         self._oneshot = toggle
 
+    def is_oneshot(self) -> bool:
+        return self._oneshot
+
     def last_prompt(self) -> Optional[Prompt]:
         """Return last prompt in context.
 
@@ -185,9 +253,74 @@ class Chat:
     def new(self) -> None:
         """Start a new chat (clear context)."""
         self._context = self._context[:1]  # keep system prompt
+        self._branches = BranchTree(self._context)
+        self._switch(self._context)
+        self._run_outputs = []
         self.chat_id = str(uuid.uuid4())
         console.info("[black]Started new chat")
 
+    def _switch(self, context: list[Prompt]) -> None:
+        """Make context current (ie: of another branch)."""
+        self._context = context
+        self._store = ContextStore()
+        self._store.sync(self._context)
+        self._store.trim(self._context)
+
+    def branch(self, options: list[str]) -> None:
+        """Handle `!branch` command: fork chat at its last turn (with `name`), or
+        show branches.
+
+        Args:
+            options (list[str]): Command options.
+        """
+        if not options:
+            console.print(self._branches.render())
+            return
+
+        try:
+            name = self._branches.fork(len(self._context), options[0])
+        except ValueError as e:
+            console.error(str(e))
+            return
+        self._switch(self._branches.context())
+        notification.emit(f'Switched to new branch "{name}"')
+
+    def checkout(self, name: str) -> None:
+        """Switch to branch.
+
+        Args:
+            name (str)
+        """
+        try:
+            self._switch(self._branches.checkout(name))
+        except KeyError:
+            console.error(f'No branch named "{name}"')
+            return
+        notification.emit(f'Switched to branch "{name}"')
+
+    def retry(self, options: list[str]) -> None:
+        """Fork chat at its last user turn (keeping the current branch) and ask it
+        again, or ask another prompt instead.
+
+        Args:
+            options (list[str]): Prompt to ask instead. Defaults to last one.
+        """
+        turns = [
+            i
+            for i, prompt in enumerate(self._context)
+            if prompt.role == "user" and not prompt.is_file
+        ]
+
+        if not turns:
+            notification.emit("Nothing to retry")
+            return
+
+        last = self._context[turns[-1]]
+        name = self._branches.fork(turns[-1])
+        self._switch(self._branches.context())
+        notification.emit(f'Retrying on new branch "{name}"')
+        self.ask(Prompt(content=" ".join(options) or last.content))
+
     def total_tokens(self) -> int:
         """Return total number of tokens in current chat's context.
 
@@ -207,45 +340,394 @@ class Chat:
         total_tokens = self.total_tokens()
 
         if last_prompt:
-            info += (
-                f"[bold][{config.get('accent_color')}]:gear: {config.active().name} "
-            )
+            settings = config.settings()
+            info += f"[bold][{settings.accent_color}]:gear: {settings.name} "
             info += f"[reset]([bold]{last_prompt.token_count()} "
             info += f"[reset]token{'s' if last_prompt.token_count() > 1 else ''}, "
             info += f"[bold]{total_tokens} [reset]total)"
         return info
 
-    def file(self, path: str, prompt: Prompt) -> None:
-        """Handle file input.
+    def run(self, options: list[str]) -> None:
+        """Run code blocks in last response (the first one, the n-th one or all).
+
+        Output is streamed, and added (as context) to the next prompt.
 
         Args:
-            path (str): Path to file.
-            prompt (ChatPrompt): (ie: what to do with file)
+            options (list[str]): (ie: `[]`, `["2"]`, `["all"]`)
         """
-        path = path.replace("~", os.environ["HOME"])
-
-        if os.environ["HOME"] not in path:
-            # use cwd
-            path = os.path.join(os.getcwd(), path)
-
-        if os.path.exists(path):
-            if os.path.isfile(path):
-                with open(path, "r") as file:
-                    file_info = get_file_info(path)
-                    console.print(
-                        Panel(
-                            pretty_dict(file_info),
-                            title="[bold]:open_file_folder: file",
-                            border_style="black",
-                        )
+        last_prompt = self.last_prompt()
+        code_blocks = last_prompt.parse_code() if last_prompt else []
+
+        if not code_blocks:
+            notification.emit("No code to run")
+            return
+
+        if not options:
+            selected = code_blocks[:1]
+        elif options[0] == "all":
+            selected = code_blocks
+        elif options[0].isdigit() and 0 < int(options[0]) <= len(code_blocks):
+            selected = [code_blocks[int(options[0]) - 1]]
+        else:
+            console.error(f"No code block {options[0]} (1-{len(code_blocks)})")
+            return
+
+        settings = config.settings()
+
+        for code in selected:
+            result = code.run(
+                settings.run_timeout, settings.run_memory_mb, settings.warm_python
+            )
+
+            if result:
+                self._run_outputs.append(result.as_context())
+                if result.interrupted:
+                    break
+
+    def stats(self, options: list[str]) -> None:
+        """Show performance statistics, per configuration, of this session (or
+        of this session and saved chats, with `all`).
+
+        Args:
+            options (list[str]): Command options.
+        """
+        measurements = list(stats.measurements)
+        bytes_written = stats.bytes_written
+        title = "Session stats"
+
+        if options and options[0] == "all":
+            # (responses of this session may be saved already)
+            measurements += [m for m in load_saved() if m not in stats.measurements]
+            bytes_written = saved_size()
+            title = "Stats (session and saved chats)"
+
+        if not measurements:
+            notification.emit("No responses yet")
+            return
+
+        console.print(
+            Panel(
+                summarize(measurements, bytes_written, stats.cache_rates()),
+                title=title,
+                title_align="left",
+                border_style="black",
+            )
+        )
+
+    def warm_up(self, response: Prompt) -> None:
+        """Start warm Python interpreter (in the background) if enabled and the
+        response has Python code (so it's ready by the time code is run)."""
+        settings = config.settings()
+
+        if settings.warm_python and any(
+            code.language.lower() in execution.PYTHON_LANGUAGES
+            for code in response.parse_code()
+        ):
+            from intelliterm.warm_pool import pool
+
+            pool.start(settings.preload_modules)
+
+    def file(self, paths: list[str], prompt: Prompt) -> None:
+        """Handle file input (files, directories or glob patterns).
+
+        Directories are walked (skipping `.gitignore`d paths) and binary files are
+        skipped. Files are combined into a single prompt, up to the configured
+        `file_token_budget`; a single large file is processed in chunks instead.
+
+        Args:
+            paths (list[str]): Paths to files/directories, or glob patterns. Paths
+                to files may select lines (ie: `big.log:1000-2000`, `big.log:-100`).
+            prompt (ChatPrompt): (ie: what to do with files)
+        """
+        settings = config.settings()
+        paths = [os.path.expanduser(path) for path in paths]
+        specs = [files.parse_spec(path) for path in paths]
+
+        missing = [p for p, _ in specs if not (files.is_glob(p) or os.path.exists(p))]
+        if missing:
+            for path in missing:
+                console.error(f"{path} does not exist")
+            return
+
+        path, line_range = specs[0]
+
+        if (
+            len(specs) == 1
+            and os.path.isfile(path)
+            and not files.is_binary(path)
+            and files.input_size(path, line_range) > settings.large_input_bytes
+        ):
+            info = get_file_info(path)
+            if line_range:
+                info["lines"] = str(line_range)
+            console.print(
+                Panel(
+                    pretty_dict(info),
+                    title="[bold]:open_file_folder: file",
+                    border_style="black",
+                )
+            )
+            # (streamed from a memory-mapped file, never read at once)
+            self.ingest(
+                files.iter_lines(path, line_range),
+                prompt,
+                source=os.path.basename(paths[0]),
+            )
+            return
+
+        file_inputs, skipped = files.read(
+            paths,
+            settings.file_token_budget,
+            settings.model,
+        )
+
+        if not file_inputs:
+            console.error(f"No text files to input (from {', '.join(paths)})")
+            return
+
+        if len(file_inputs) == 1:
+            title = "[bold]:open_file_folder: file"
+            info = get_file_info(file_inputs[0].path, file_inputs[0].content)
+            info["path"] = file_inputs[0].name
+        else:
+            title = f"[bold]:open_file_folder: {len(file_inputs)} files"
+            info = {
+                f.name: f"{f.lines} lines, {f.tokens} tokens" for f in file_inputs
+            }
+        console.print(Panel(pretty_dict(info), title=title, border_style="black"))
+
+        if skipped:
+            console.warning(
+                f"Skipped {len(skipped)} file{'s' if len(skipped) > 1 else ''} "
+                + "(binary or over file_token_budget)"
+            )
+            logger.info(f"Skipped files: {skipped}")
+
+        prompt.content = "\n\n".join(
+            part for part in (prompt.content, files.labeled(file_inputs)) if part
+        )
+        prompt.is_file = True
+        self.ask(prompt, show_input=False)
+
+    def index(self, options: list[str]) -> None:
+        """Handle `!index` command: index a directory (relevant chunks of its files
+        are then attached to every prompt), show the index, or disable it (`off`).
+
+        Args:
+            options (list[str]): Command options.
+        """
+        if options and options[0] == "off":
+            self._index = None
+            notification.emit("Index disabled")
+            return
+
+        if options:
+            directory = os.path.expanduser(" ".join(options))
+            if not os.path.isdir(directory):
+                console.error(f"{directory} is not a directory")
+                return
+
+            try:
+                with console.status(f"Indexing {directory}"):
+                    index = Index.load(directory)
+                    indexed, removed = index.update()
+            except OSError as e:
+                logger.exception(e)
+                console.error(f"Failed to index {directory} ({e})")
+                return
+            self._index = index
+            logger.info(f"Indexed {index.root}: {indexed} files, {removed} removed")
+        elif self._index is None:
+            notification.emit("No index (use !index <dir>)")
+            return
+
+        info = {
+            "directory": self._index.root.replace(os.environ["HOME"], "~"),
+            "files": str(len(self._index.files)),
+            "chunks": str(self._index.num_chunks()),
+            "attached": f"top {config.settings().retrieval_top_k} chunks per prompt",
+        }
+        console.print(
+            Panel(pretty_dict(info), title="[bold]:mag: index", border_style="black")
+        )
+
+    def retrieve(self, prompt: Prompt) -> Optional[str]:
+        """Chunks of indexed files relevant to prompt (if indexing is enabled),
+        updating the index first (only files that changed).
+
+        Args:
+            prompt (Prompt)
+
+        Returns:
+            Optional[str]: Chunks, labeled with their paths (None if none).
+        """
+        if self._index is None:
+            return None
+
+        self._index.update()
+        hits = self._index.search(prompt.content, config.settings().retrieval_top_k)
+        if not hits:
+            return None
+
+        console.print(
+            Panel(
+                pretty_dict({hit.name: f"score {hit.score:.1f}" for hit in hits}),
+                title=f"[bold]:mag: {len(hits)} chunks",
+                border_style="black",
+            )
+        )
+        return "\n\n".join(hit.label() for hit in hits)
+
+    def ingest(self, lines: Iterable[str], prompt: Prompt, source: str) -> None:
+        """Complete prompt on a large input, processing it in chunks.
+
+        The input is streamed in token-bounded chunks, relevant notes are extracted
+        from each chunk concurrently ("map"), then the notes are combined into the
+        final (streamed) response ("reduce").
+
+        Args:
+            lines (Iterable[str]): Input lines (ie: an open file).
+            prompt (Prompt): (ie: what to do with input)
+            source (str): Input name (ie: file name).
+        """
+        settings = config.settings()
+        task = prompt.content.strip() or SPECIAL_PROMPTS["CHUNK_TASK"]
+
+        notes = self.extract_notes(
+            chunk_text(lines, settings.chunk_tokens, settings.model),
+            task,
+            source,
+        )
+        if notes is None:
+            return
+
+        instruction = SPECIAL_PROMPTS["CHUNK_REDUCE"].format(source=source, task=task)
+        self.ask(
+            Prompt(content=instruction + "\n" + "\n\n".join(notes), is_file=True),
+            show_input=False,
+        )
+
+    def extract_notes(
+        self,
+        chunks: Iterable[str],
+        task: str,
+        source: str,
+        template: str = SPECIAL_PROMPTS["CHUNK_MAP"],
+    ) -> Optional[list[str]]:
+        """Extract notes relevant to task from chunks, concurrently ("map").
+
+        Notes are extracted again from the notes, until they fit in a chunk.
+
+        Args:
+            chunks (Iterable[str]): Token-bounded chunks (consumed lazily).
+            task (str): What to do with the input.
+            source (str): Input name (ie: file name).
+            template (str): Prompt template (formatted with part, source and task).
+                Defaults to `SPECIAL_PROMPTS["CHUNK_MAP"]`.
+
+        Returns:
+            Optional[list[str]]: Notes (in order), or None if aborted.
+        """
+        settings = config.settings()
+        client = Client(settings.backend)
+
+        def map_notes(
+            chunks: Iterable[str],
+            template: str,
+            status: Status,
+        ) -> list[str]:
+            def process(part: int, chunk: str) -> str:
+                instruction = template.format(part=part, source=source, task=task)
+                return client.complete(
+                    [self._context[0], Prompt(content=f"{instruction}\n{chunk}")]
+                )
+
+            def on_done(num_done: int) -> None:
+                status.update(f"Processing {source} ({num_done} parts done)")
+
+            return map_chunks(process, chunks, settings.chunk_concurrency, on_done)
+
+        logger.info(f"Processing {source} in chunks")
+
+        try:
+            self.is_completing = True
+
+            with console.status(f"Processing {source}") as status:
+                notes = map_notes(chunks, template, status)
+                notes_tokens = count_tokens("".join(notes), settings.model)
+
+                # too many notes to combine at once, extract from notes (again)
+                while len(notes) > 1 and notes_tokens > settings.chunk_tokens:
+                    notes = map_notes(
+                        chunk_text(
+                            (note + "\n\n" for note in notes),
+                            settings.chunk_tokens,
+                            settings.model,
+                        ),
+                        SPECIAL_PROMPTS["CHUNK_MAP"],
+                        status,
                     )
-                    prompt.content += file.read()
-                    self.ask(prompt, show_input=False)
+                    previous_tokens = notes_tokens
+                    notes_tokens = count_tokens("".join(notes), settings.model)
+
+                    if notes_tokens >= previous_tokens:
+                        break  # not converging
+        except KeyboardInterrupt:
+            console.with_divider(":stop_button: aborted")
+            return None
+        except Exception as e:
+            console.print(e)
+            return None
+        finally:
+            self.is_completing = False
+
+        return notes
+
+    def commit_message(self, lines: Iterable[str]) -> None:
+        """Generate a commit message for a git diff.
+
+        Lockfiles, generated and binary files are left out, and huge hunks are
+        truncated. Diffs too large to send at once are summarized per file
+        (concurrently), then the summaries are merged into a single message, so
+        latency stays flat as diffs grow.
+
+        Args:
+            lines (Iterable[str]): Diff lines (consumed lazily).
+        """
+        settings = config.settings()
+        texts: list[str] = []
+        ignored: list[str] = []
+
+        for file_diff in diff.parse_diff(lines):
+            if file_diff.is_ignored():
+                ignored.append(file_diff.path)
             else:
-                # is a dir / not a file
-                return
-        else:
-            console.error(f"{path} does not exist")
+                texts.append(file_diff.text())
+
+        task = SPECIAL_PROMPTS["GIT_DIFF"]
+        not_shown = diff.summarize_ignored(ignored)
+
+        if sum(len(text) for text in texts) <= settings.large_input_bytes:
+            self.ask(Prompt(content=task + "\n" + "".join(texts) + not_shown))
+            return
+
+        notes = self.extract_notes(
+            diff.chunk_files(texts, settings.chunk_tokens, settings.model),
+            task,
+            source="git diff",
+            template=SPECIAL_PROMPTS["GIT_DIFF_MAP"],
+        )
+        if notes is None:
+            return
+
+        instruction = SPECIAL_PROMPTS["GIT_DIFF_REDUCE"].format(task=task)
+        self.ask(
+            Prompt(
+                content=instruction + "\n" + "\n".join(notes) + "\n" + not_shown,
+                is_file=True,
+            ),
+            show_input=False,
+        )
 
     def create_title(self) -> str:
         """Create a title for the current chat's context.
@@ -253,15 +735,16 @@ class Chat:
         Returns:
             str: Generated title.
         """
+        settings = config.settings()
         response = openai.ChatCompletion.create(
-            model=config.get("model"),
+            model=settings.model,
             messages=(
-                [prompt.get_message() for prompt in self._context[1:]]
+                self._store.messages()[1:]
                 + [Prompt(content=SPECIAL_PROMPTS["CHAT_TITLE"]).get_message()]
             ),
-            temperature=float(config.get("temperature")),
-            presence_penalty=float(config.get("presence_penalty")),
-            frequency_penalty=float(config.get("frequency_penalty")),
+            temperature=settings.temperature,
+            presence_penalty=settings.presence_penalty,
+            frequency_penalty=settings.frequency_penalty,
         )
         title: str = str(response.choices[0].message.content).strip(punctuation)
         title = re.sub(r'[\\/*?:"<>|]', "", title)
@@ -284,6 +767,7 @@ class Chat:
 
         return title
 
+    @traced("chat.save")
     def save(self) -> None:
         """Save current chat."""
 
@@ -316,15 +800,21 @@ class Chat:
 
         with open(file_path, "w+") as file:
             chat_dict = self.serialize()
-            json.dump(chat_dict, file, indent=4)
+            data = json.dumps(chat_dict, indent=4)
+            file.write(data)
+            stats.record_write(len(data.encode()))
 
             file_path = file_path.replace(os.environ["HOME"], "~")
             logger.info(f"Saved chat ${self.chat_id}: ${file_path}")
             notification.emit(f"[black]Saved chat to: ${file_path}")
 
     # TODO(add test)
-    def load(self) -> None:
-        """Load a saved chat."""
+    def load(self, title: str = "") -> None:
+        """Load a saved chat (picked from a list, unless its title is given).
+
+        Args:
+            title (str): Title of saved chat. Defaults to "" (pick).
+        """
         file_names: list[str] = []
         chats: list[str] = []
 
@@ -333,20 +823,29 @@ class Chat:
                 file_path = os.path.join(SAVED_CHATS_DIR, file_name)
 
                 if os.path.isfile(file_path) and file_name.endswith(".json"):
+                    if title and file_name != f"{title}.json":
+                        continue
                     with open(file_path, "r") as file:
-                        file_names.append(file_name.split(".")[0])
+                        file_names.append(file_name[:-5])
                         chats.append(file.read())
-            if file_names:
-                file_name, i = pick(
-                    file_names,
-                    title="Load chat: ",
-                    indicator=">",
+            if title and not file_names:
+                console.error(f'No saved chat titled "{title}"')
+            elif file_names:
+                file_name, i = (
+                    (file_names[0], 0)
+                    if title
+                    else pick(
+                        file_names,
+                        title="Load chat: ",
+                        indicator=">",
+                    )
                 )
                 if i is not None:
                     selected_chat = Chat.deserialize(chats[i])
-                    self.__dict__.update(selected_chat.__dict__)
-                    # self.chat_id = selected_chat.chat_id
-                    # self._context = selected_chat._context
+                    # (session state, ie: index, inputs typed ahead, is kept)
+                    self.chat_id = selected_chat.chat_id
+                    self._branches = selected_chat._branches
+                    self._switch(selected_chat._context)
                     notification.emit(f'Loaded "{file_name}"')
             else:
                 notification.emit("No saved chats")
@@ -360,31 +859,68 @@ class Chat:
             prompt (ChatPrompt)
             show_input (bool): Show/hide input before completion. Defaults to True.
         """
-        client = Client(Backend(config.get("backend")))
-        prompt_message = prompt.get_message()
+        client = Client(config.settings().backend)
+
+        if self._run_outputs and prompt.role == "user":
+            # (outputs of code runs since last prompt)
+            prompt.content = "\n\n".join(self._run_outputs + [prompt.content])
+            self._run_outputs = []
 
-        console.clear()
-        logger.info(prompt_message)
+        settings = config.settings()
+
+        if not settings.scrollback:
+            console.clear()
+        # (only the start of large prompts is logged)
+        logger.info("%s: %s", prompt.role, shorten(prompt.content))
 
         self.context(prompt)
 
         if not self._oneshot and show_input:
             console.print(
                 Panel(
-                    Markdown(prompt.content, code_theme=CODE_THEME),
+                    echo(prompt.content),
                     title=self.info(),
                     title_align="right",
                     border_style="black",
                 )
             )
 
+        if prompt.role == "user" and not prompt.is_file:
+            # (relevant chunks are sent with this request only, not kept in context)
+            try:
+                self._store.attachment = self.retrieve(prompt)
+            except Exception as e:
+                logger.exception(e)
+                console.warning(f"Failed to retrieve chunks ({e}), sent without")
+
         full_content = ""
-        markdown = Markdown("", code_theme=CODE_THEME)
+        # (code blocks are extracted from deltas, as they are streamed)
+        response = Prompt(role="assistant")
+
+        # (next prompts can be typed while response is streaming)
+        typeahead = (
+            None if self._oneshot else TypeAhead(self.handle_independent, self._draft)
+        )
+
+        def on_delta(delta: str) -> None:
+            response.append(delta)
+            self.run_independent()
 
         try:
             self.is_completing = True
             start_time = time.time()
-            full_content = client.get_response(prompt, self._context, markdown) or ""
+
+            with typeahead or nullcontext():
+                full_content = (
+                    client.get_response(
+                        prompt,
+                        self._context,
+                        on_delta=on_delta,
+                        footer=typeahead,
+                        store=self._store,
+                    )
+                    or ""
+                )
         except (KeyboardInterrupt, EOFError):
             if self.is_completing:
                 console.with_divider(":stop_button: aborted")
@@ -393,14 +929,19 @@ class Chat:
             console.print(e)
         finally:
             self.is_completing = False
-            self.context(
-                Prompt(
-                    content=full_content,
-                    role="assistant",
-                    took=time.time() - start_time,
-                )
-            )
-            console.print(markdown)
+            self._store.attachment = None
+            if typeahead:
+                self.run_independent()  # (typed after the last delta)
+                self._queue.extend(typeahead.lines)
+                self._draft = typeahead.text
+            if response.content != full_content:
+                response.content = full_content  # (ie: aborted)
+            response.took = time.time() - start_time
+            if client.measurement:
+                response.stats = client.measurement.to_dict()
+            response.finish()
+            self.context(response)
+            self.warm_up(response)
 
         last_prompt = self.last_prompt()
 
@@ -415,81 +956,141 @@ class Chat:
         else:
             console.with_divider()
 
-        if not self._oneshot:
-            self.listen()
-
     def listen(self) -> None:
-        """Listen for new prompts/commands."""
+        """Listen for new prompts/commands (handling inputs typed ahead first, in
+        order)."""
         while True:
             try:
-                input = prompt()
-
-                if input is not None and len(input) > 0:
-                    self.history(input)
-
-                    if input.startswith(CommandPalette.TRIGGER):
-                        parts = input[1:].split()
-                        alias, options = parts[0], parts[1:]
-
-                        command = CommandPalette.get_command(alias)
-                        last_prompt = self.last_prompt()
-
-                        if command:
-                            match command.name:
-                                case "version":
-                                    console.print(f"[reset]{intelliterm.__version__}")
-                                case "help":
-                                    CommandPalette.help()
-                                case "config":
-                                    self.configure(options)
-                                case "info":
-                                    console.print(self.info())
-                                case "save":
-                                    self.save()
-                                case "load":
-                                    self.load()
-                                case "copy":
-                                    if last_prompt:
-                                        last_prompt.copy(options)
-                                    else:
-                                        notification.emit("Nothing to copy")
-                                case "run":
-                                    if last_prompt:
-                                        if last_prompt.parse_code() == []:
-                                            notification.emit("No code to run")
-                                        else:
-                                            last_prompt.parse_code()[0].run()
-                                    else:
-                                        notification.emit("No code to run")
-                                case "file":
-                                    if len(options) > 0:
-                                        self.file(
-                                            options[0],
-                                            Prompt(content="".join(options[1:])),
-                                        )
-                                    else:
-                                        console.error("No file specified")
-                                        console.print(command.hint())
-                                case "new":
-                                    self.new()
-                                case "shell":
-                                    if options and len(options) > 0:
-                                        try:
-                                            subprocess.run(options, shell=True)
-                                        except subprocess.SubprocessError as e:
-                                            console.print(e)
-                                    else:
-                                        console.error("No shell command specified")
-                                        console.print(command.hint())
-                                case "quit":
-                                    quit()
-                        else:
-                            CommandPalette.unrecognized(alias)
-                    else:
-                        self.ask(Prompt(content=input))
+                if self._queue:
+                    input = self._queue.popleft()
+                    console.print(f"[bold]> [reset]{input}", highlight=False)
+                else:
+                    input, self._draft = prompt(self._draft), ""
+
+                self.handle(input)
             except (KeyboardInterrupt, EOFError):
                 if self.is_completing:
                     pass
                 else:
                     # otherwise: quit intelliterm
                     quit()
+
+    def handle_independent(self, input: str) -> bool:
+        """Take input typed ahead (on the type-ahead reading thread) if it's a
+        command independent of the response being streamed (ie: `!help`,
+        `!use <config>`), to run it before the response ends.
+
+        Args:
+            input (str)
+
+        Returns:
+            bool: False if input was not handled (ie: is to be queued).
+        """
+        if not input.startswith(CommandPalette.TRIGGER):
+            return False
+
+        alias, *options = input[1:].split() or [""]
+        command = CommandPalette.get_command(alias)
+
+        if command is None or command.name not in INDEPENDENT_COMMANDS:
+            return False
+        if options and options[0] in DEPENDENT_OPTIONS:
+            return False
+
+        # (not handled on the reading thread, see `run_independent`)
+        self._independent.append(input)
+        return True
+
+    def run_independent(self) -> None:
+        """Run commands typed ahead that are independent of the response, on the
+        main thread (ie: between streamed deltas), reporting errors instead of
+        aborting the response."""
+        while self._independent:
+            input = self._independent.popleft()
+
+            try:
+                self.handle(input)
+            except Exception as e:
+                logger.exception(e)
+                console.error(f"{input}: {e}")
+
+    def handle(self, input: str) -> None:
+        """Handle input (command or prompt).
+
+        Args:
+            input (str)
+        """
+        if input is not None and len(input) > 0:
+            self.history(input)
+
+            if input.startswith(CommandPalette.TRIGGER):
+                parts = input[1:].split() or [""]
+                alias, options = parts[0], parts[1:]
+
+                command = CommandPalette.get_command(alias)
+                last_prompt = self.last_prompt()
+
+                if command:
+                    match command.name:
+                        case "version":
+                            console.print(f"[reset]{intelliterm.__version__}")
+                        case "help":
+                            CommandPalette.help()
+                        case "config":
+                            self.configure(options)
+                        case "info":
+                            console.print(self.info())
+                        case "save":
+                            self.save()
+                        case "load":
+                            self.load(" ".join(options))
+                        case "copy":
+                            if last_prompt:
+                                last_prompt.copy(options)
+                            else:
+                                notification.emit("Nothing to copy")
+                        case "run":
+                            self.run(options)
+                        case "stats":
+                            self.stats(options)
+                        case "file":
+                            paths, prompt_options = files.split_paths(options)
+                            if paths:
+                                self.file(
+                                    paths,
+                                    Prompt(content=" ".join(prompt_options)),
+                                )
+                            elif options:
+                                console.error(f"{options[0]} does not exist")
+                            else:
+                                console.error("No file specified")
+                                console.print(command.hint())
+                        case "index":
+                            self.index(options)
+                        case "new":
+                            self.new()
+                        case "branch":
+                            self.branch(options)
+                        case "checkout":
+                            if options:
+                                self.checkout(options[0])
+                            else:
+                                console.error("No branch specified")
+                                console.print(command.hint())
+                        case "retry":
+                            self.retry(options)
+                        case "shell":
+                            if options and len(options) > 0:
+                                try:
+                                    subprocess.run(options, shell=True)
+                                except subprocess.SubprocessError as e:
+                                    console.print(e)
+                            else:
+                                console.error("No shell command specified")
+                                console.print(command.hint())
+                        case "quit":
+                            quit()
+                else:
+                    CommandPalette.unrecognized(alias)
+            else:
+                self.ask(Prompt(content=input))
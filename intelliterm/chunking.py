@@ -0,0 +1,111 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional
+
+from intelliterm.prompt import count_tokens, get_encoding
+
+
+def split_tokens(text: str, max_tokens: int, model: str) -> Iterator[str]:
+    """Split text into pieces of at most `max_tokens` tokens.
+
+    Args:
+        text (str)
+        max_tokens (int): Max tokens per piece.
+        model (str): Model (tokenizer) to count tokens for.
+
+    Yields:
+        str: Pieces of text.
+    """
+    encoding = get_encoding(model)
+    tokens = encoding.encode(text)
+
+    for i in range(0, len(tokens), max_tokens):
+        yield encoding.decode(tokens[i : i + max_tokens])
+
+
+def chunk_text(
+    lines: Iterable[str],
+    max_tokens: int,
+    model: str,
+) -> Iterator[str]:
+    """Group lines into chunks of at most `max_tokens` tokens.
+
+    Lines are consumed lazily (ie: a file is streamed, never read at once). Lines
+    longer than `max_tokens` are split.
+
+    Args:
+        lines (Iterable[str]): Lines (including line endings).
+        max_tokens (int): Max tokens per chunk.
+        model (str): Model (tokenizer) to count tokens for.
+
+    Yields:
+        str: Chunks.
+    """
+    chunk: list[str] = []
+    chunk_tokens = 0
+
+    for line in lines:
+        line_tokens = count_tokens(line, model)
+
+        if chunk and chunk_tokens + line_tokens > max_tokens:
+            yield "".join(chunk)
+            chunk, chunk_tokens = [], 0
+
+        if line_tokens > max_tokens:
+            yield from split_tokens(line, max_tokens, model)
+        else:
+            chunk.append(line)
+            chunk_tokens += line_tokens
+
+    if chunk:
+        yield "".join(chunk)
+
+
+def map_chunks(
+    process: Callable[[int, str], str],
+    chunks: Iterable[str],
+    concurrency: int,
+    on_done: Optional[Callable[[int], None]] = None,
+) -> list[str]:
+    """Process chunks concurrently, preserving their order.
+
+    At most `concurrency` chunks are processed at once, and at most twice as many
+    are read ahead from `chunks` (so memory stays bounded for streamed inputs).
+
+    Args:
+        process (Callable[[int, str], str]): Called with (part number, chunk).
+        chunks (Iterable[str])
+        concurrency (int): Max chunks processed concurrently.
+        on_done (Optional[Callable[[int], None]]): Called with the number of
+            processed chunks whenever one is done. Defaults to None.
+
+    Returns:
+        list[str]: Results, in chunk order.
+    """
+    results: dict[int, str] = {}
+    pending: dict[int, Future[str]] = {}
+
+    def collect(block: bool) -> None:
+        for i, future in list(pending.items()):
+            if block or future.done():
+                results[i] = future.result()
+                del pending[i]
+                if on_done:
+                    on_done(len(results))
+                block = False
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    try:
+        for i, chunk in enumerate(chunks):
+            pending[i] = executor.submit(process, i + 1, chunk)
+            collect(block=False)
+
+            if len(pending) >= concurrency * 2:
+                collect(block=True)
+
+        while pending:
+            collect(block=True)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return [results[i] for i in sorted(results)]
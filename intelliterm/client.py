@@ -1,33 +1,52 @@
 import os
-from enum import Enum
+import time
+from typing import Callable, Iterable, Optional
 
 import anthropic
 import openai
-from rich.live import Live
-from rich.markdown import Markdown
+from rich.console import RenderableType
 
-from intelliterm.config import config
+from intelliterm.config import Settings, config
 from intelliterm.console import console
-from intelliterm.constants import CODE_THEME
-from intelliterm.prompt import Message, Prompt
+from intelliterm.context_store import ContextStore
+from intelliterm.files import BYTES_PER_TOKEN
+from intelliterm.profiling import profiler
+from intelliterm.prompt import Prompt, count_tokens
+from intelliterm.rendering import MarkdownStream
+from intelliterm.stats import Measurement, stats
+from intelliterm.tracing import tracer
+from intelliterm.types import Backend
+from intelliterm.utils import logger
 
 
-class Backend(Enum):
-    OPENAI = "OPENAI"
-    ANTHROPIC = "ANTHROPIC"
+class Client:
+    """Client of a model backend (streams and renders responses).
 
+    Attributes:
+        backend (Backend)
+        measurement (Optional[Measurement]): Measurement of last streamed response.
+    """
+
+    # Shared across instances, so connections are pooled between requests
+    # (ie: kept warm by a long-running daemon).
+    _anthropic_client: Optional[anthropic.Anthropic] = None
 
-class Client:
     def __init__(self, backend: Backend):
         self.backend = backend
         self.anthropic_client: anthropic.Anthropic
+        self.measurement: Optional[Measurement] = None
 
         if backend == Backend.OPENAI:
             openai.api_key = os.getenv("OPENAI_API_KEY")
         elif backend == Backend.ANTHROPIC:
-            self.anthropic_client = anthropic.Anthropic(
-                api_key=os.getenv("ANTHROPIC_API_KEY")
-            )
+            api_key = os.getenv("ANTHROPIC_API_KEY")
+            # (recreated if the key changed, ie: forwarded by a daemon's client)
+            if (
+                Client._anthropic_client is None
+                or Client._anthropic_client.api_key != api_key
+            ):
+                Client._anthropic_client = anthropic.Anthropic(api_key=api_key)
+            self.anthropic_client = Client._anthropic_client
         else:
             raise ValueError("Invalid backend specified")
 
@@ -35,36 +54,34 @@ class Client:
         self,
         prompt: Prompt,
         context: list[Prompt],
-        markdown: Markdown,
+        on_delta: Optional[Callable[[str], None]] = None,
+        footer: Optional[RenderableType] = None,
+        store: Optional[ContextStore] = None,
     ) -> str | None:
+        settings = config.settings()
+        store = store or ContextStore.of(context)
+
         try:
+            start = time.perf_counter()
             stream = openai.ChatCompletion.create(
-                model=config.get("model"),
-                messages=[prompt.get_message() for prompt in context],
-                temperature=float(config.get("temperature")),
-                presence_penalty=float(config.get("presence_penalty")),
-                frequency_penalty=float(config.get("frequency_penalty")),
+                model=settings.model,
+                messages=store.messages(),
+                temperature=settings.temperature,
+                presence_penalty=settings.presence_penalty,
+                frequency_penalty=settings.frequency_penalty,
                 stream=True,
             )
 
-            full_content = ""
-
-            with Live(
-                markdown,
-                console=console,
-                transient=False,
-                refresh_per_second=40,
-                vertical_overflow="visible",
-            ) as live:
-                messages = []
-                for chunk in stream:
-                    message = chunk["choices"][0]["delta"]
-                    messages.append(message)
-                    full_content = "".join([m.get("content", "") for m in messages])
-                    markdown = Markdown(full_content, code_theme=CODE_THEME)
-                    live.update(markdown)
+            content = self.stream(
+                (chunk["choices"][0]["delta"].get("content", "") for chunk in stream),
+                start,
+                context,
+                settings,
+                on_delta,
+                footer,
+            )
             stream.close()
-            return full_content
+            return content
         except openai.InvalidRequestError as e:
             console.print("openai:", e)
             return None
@@ -73,48 +90,38 @@ class Client:
         self,
         prompt: Prompt,
         context: list[Prompt],
-        markdown: Markdown,
+        on_delta: Optional[Callable[[str], None]] = None,
+        footer: Optional[RenderableType] = None,
+        store: Optional[ContextStore] = None,
     ) -> str | None:
+        settings = config.settings()
+        store = store or ContextStore.of(context)
+
         try:
-            system_message = " ".join(
-                [
-                    prompt.get_message()["content"]
-                    for prompt in context
-                    if prompt.get_message()["role"] == "system"
-                ]
-            )
-            messages = [
-                prompt.get_message()
-                for prompt in context
-                if prompt.get_message()["role"] != "system"
-            ]
+            start = time.perf_counter()
+            system_message, messages = store.system_and_turns()
             stream = self.anthropic_client.messages.create(  # type: ignore
                 max_tokens=1024,
                 system=system_message,
                 messages=messages,  # type: ignore
-                model=config.get("model"),
+                model=settings.model,
                 stream=True,
             )
 
-            full_content = ""
-
-            with Live(
-                markdown,
-                console=console,
-                transient=False,
-                refresh_per_second=40,
-                vertical_overflow="visible",
-            ) as live:
-                messages = []
-                for event in stream:
-                    if event.type == "content_block_delta":  # type: ignore
-                        message = event.delta.text  # type: ignore
-                        messages.append(Message(content=message, role="user"))
-                        full_content = "".join([m.get("content", "") for m in messages])
-                        markdown = Markdown(full_content, code_theme=CODE_THEME)
-                        live.update(markdown)
+            content = self.stream(
+                (
+                    event.delta.text  # type: ignore
+                    for event in stream
+                    if event.type == "content_block_delta"  # type: ignore
+                ),
+                start,
+                context,
+                settings,
+                on_delta,
+                footer,
+            )
             stream.close()  # type: ignore
-            return full_content
+            return content
         except anthropic.APIConnectionError as e:
             console.print("The server could not be reached")
             console.print(e.__cause__)
@@ -127,15 +134,132 @@ class Client:
             console.print(e.message)
         return None
 
+    def stream(
+        self,
+        deltas: Iterable[str],
+        start: float,
+        context: list[Prompt],
+        settings: Settings,
+        on_delta: Optional[Callable[[str], None]] = None,
+        footer: Optional[RenderableType] = None,
+    ) -> str:
+        """Render streamed deltas, measuring the response (see `stats`).
+
+        Args:
+            deltas (Iterable[str]): Deltas of response content.
+            start (float): Time request was sent at (`time.perf_counter`).
+            context (list[Prompt]): Context sent.
+            settings (Settings): Configuration the request was sent with (may be
+                switched while the response streams, ie: `!use` typed ahead).
+            on_delta (Optional[Callable[[str], None]]): Called with each delta.
+            footer (Optional[RenderableType]): Rendered below the response.
+
+        Returns:
+            str: Response content.
+        """
+        received: list[str] = []
+        ttft: Optional[float] = None
+
+        with MarkdownStream(console, footer) as markdown:
+            for delta in deltas:
+                if ttft is None and delta:
+                    ttft = time.perf_counter() - start
+                    tracer.instant("client.first_token")
+                received.append(delta)
+                if on_delta:
+                    on_delta(delta)
+                markdown.append(delta)
+
+        latency = time.perf_counter() - start
+        content = "".join(received)
+
+        try:
+            tokens_sent = sum(prompt.token_count() for prompt in context)
+            tokens_received = count_tokens(content, settings.model)
+        except Exception as e:
+            # (ie: tokenizer can't be loaded offline, the response is kept anyway)
+            logger.warning(f"Tokens of response estimated ({e})")
+            tokens_sent = sum(len(prompt.content) for prompt in context)
+            tokens_sent //= BYTES_PER_TOKEN
+            tokens_received = len(content) // BYTES_PER_TOKEN
+
+        self.measurement = Measurement(
+            config=settings.name,
+            model=settings.model,
+            latency=latency,
+            ttft=ttft,
+            tokens_sent=tokens_sent,
+            tokens_received=tokens_received,
+        )
+        stats.record(self.measurement)
+        return content
+
     def get_response(
         self,
         prompt: Prompt,
         context: list[Prompt],
-        markdown: Markdown,
+        on_delta: Optional[Callable[[str], None]] = None,
+        footer: Optional[RenderableType] = None,
+        store: Optional[ContextStore] = None,
     ) -> str | None:
+        """Stream and render response to context.
+
+        Args:
+            prompt (Prompt): Last prompt of context.
+            context (list[Prompt])
+            on_delta (Optional[Callable[[str], None]]): Called with each delta.
+            footer (Optional[RenderableType]): Rendered below the response.
+            store (Optional[ContextStore]): Store synced with context (messages
+                are built from context otherwise).
+
+        Returns:
+            str | None: Response content (None on error).
+        """
+        with tracer.span("client.request", backend=self.backend), profiler.profile(
+            "response"
+        ):
+            if self.backend == Backend.OPENAI:
+                return self.get_openai_response(
+                    prompt, context, on_delta, footer, store
+                )
+            elif self.backend == Backend.ANTHROPIC:
+                return self.get_anthropic_response(
+                    prompt, context, on_delta, footer, store
+                )
+            else:
+                raise ValueError("Invalid backend specified")
+
+    def complete(self, context: list[Prompt]) -> str:
+        """Complete context without streaming or rendering the response.
+
+        (ie: for intermediate steps, like processing chunks of a large input)
+
+        Args:
+            context (list[Prompt])
+
+        Returns:
+            str: Response content.
+        """
+        settings = config.settings()
+        store = ContextStore.of(context)
+
         if self.backend == Backend.OPENAI:
-            return self.get_openai_response(prompt, context, markdown)
+            response = openai.ChatCompletion.create(
+                model=settings.model,
+                messages=store.messages(),
+                temperature=settings.temperature,
+                presence_penalty=settings.presence_penalty,
+                frequency_penalty=settings.frequency_penalty,
+            )
+            return str(response.choices[0].message.content)  # type: ignore
         elif self.backend == Backend.ANTHROPIC:
-            return self.get_anthropic_response(prompt, context, markdown)
+            system_message, messages = store.system_and_turns()
+            message = self.anthropic_client.messages.create(
+                max_tokens=1024,
+                system=system_message,
+                messages=messages,  # type: ignore
+                model=settings.model,
+            )
+            return "".join(block.text for block in message.content)
         else:
             raise ValueError("Invalid backend specified")
@@ -1,33 +1,150 @@
-import subprocess
+import re
+from typing import Optional
 
 from prompt_toolkit.shortcuts import confirm
 
+from intelliterm import execution
 from intelliterm.console import console
+from intelliterm.execution import RunResult
 from intelliterm.notifications import notification
+from intelliterm.tracing import tracer
+
+
+# Opening fence (ie: "```python"), capturing the fence and language
+FENCE_REGEX = re.compile(r"^[ \t]*(`{3,}|~{3,})[ \t]*([\w+#.-]*)[^`]*$")
 
 
 class Code:
-    def __init__(self, language: str, code: str) -> None:
+    """Class representing a fenced code block.
+
+    Attributes:
+        language (str): Language (info string) of the block.
+        code (str): Code (without fences).
+        start (Optional[int]): Offset of code in the content it was extracted from.
+        end (Optional[int]): Offset of the end of code in that content.
+    """
+
+    def __init__(
+        self,
+        language: str,
+        code: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+    ) -> None:
         self.language: str = language
         self.code: str = code
+        self.start: Optional[int] = start
+        self.end: Optional[int] = end
         self._confirmed: bool = False
 
     # TODO(implement): Create venv + install deps (if necessary to run code snippet)
-    # TODO(implement): handle multiple code blocks
-    def run(self) -> None:
-        """Execute code."""
+    def run(
+        self, timeout: float, memory_mb: int, warm: bool = False
+    ) -> Optional[RunResult]:
+        """Execute code (after confirmation), streaming its output.
+
+        Args:
+            timeout (float): Wall-clock limit (in seconds).
+            memory_mb (int): Memory limit (in MiB).
+            warm (bool): Run Python code in the warm interpreter (if running).
+                Defaults to False.
+
+        Returns:
+            Optional[RunResult]: None if not run.
+        """
         if not self._confirmed:
-            self._confirmed = confirm(f"Run {self.language} code?")
-
-        if self._confirmed:
-            if self.language in ["bash", "zsh", "shell"]:
-                console.print(f"[black]({self.language})\n")
-                subprocess.run(self.code.split())
-            elif self.language == "python":
-                console.print("[black](python)\n")
-                subprocess.run(["python3", "-c", self.code])
-            elif self.language in ["javascript", "typescript"]:
-                console.print("[black](node)\n")
-                subprocess.run(["node", "-e", self.code])
-            else:
-                notification.emit(f"Running {self.language} code is not supported yet")
+            self._confirmed = confirm(f"Run {self.language or 'untagged'} code?")
+
+        if not self._confirmed:
+            return None
+
+        console.print(f"[black]({self.language})\n")
+        with tracer.span("code.run", language=self.language, warm=warm):
+            result = execution.run(
+                self.language, self.code, timeout, memory_mb, warm
+            )
+
+        if result is None:
+            notification.emit(f"Running {self.language} code is not supported yet")
+        else:
+            console.with_divider(result.status())
+        return result
+
+
+class CodeExtractor:
+    """Extracts fenced code blocks from streamed content, incrementally.
+
+    Content is fed in deltas (ie: as they are streamed); each block is recorded as
+    soon as its closing fence arrives, so blocks are available before the whole
+    content is, and content is never scanned more than once.
+
+    Attributes:
+        blocks (list[Code]): Code blocks extracted so far.
+        length (int): Length of content fed so far.
+
+    Methods:
+        feed(delta: str, final: bool = False) -> list[Code]:
+            Feed content, returning code blocks completed by it.
+    """
+
+    def __init__(self) -> None:
+        self.blocks: list[Code] = []
+        self.length: int = 0
+        self._line: list[str] = []  # (deltas of incomplete last line)
+        self._line_length = 0
+        self._fence: Optional[str] = None  # (of the open block)
+        self._language: str = ""
+        self._start: int = 0
+        self._lines: list[str] = []
+
+    def feed(self, delta: str, final: bool = False) -> list[Code]:
+        """Feed content.
+
+        Args:
+            delta (str): Content (continuing content fed so far).
+            final (bool): Content is complete (ie: a closing fence may not be
+                followed by a line break). Defaults to False.
+
+        Returns:
+            list[Code]: Code blocks completed by content.
+        """
+        num_blocks = len(self.blocks)
+        self.length += len(delta)
+
+        if "\n" not in delta and not final:
+            # (line still incomplete, not joined until it is)
+            self._line.append(delta)
+            self._line_length += len(delta)
+            return []
+
+        line_start = self.length - len(delta) - self._line_length
+        lines = ("".join(self._line) + delta).split("\n")
+        last = lines.pop()
+        self._line, self._line_length = [last], len(last)
+        if final and last:
+            lines.append(last)
+            self._line, self._line_length = [], 0
+
+        for line in lines:
+            self._feed_line(line, line_start)
+            line_start += len(line) + 1
+        return self.blocks[num_blocks:]
+
+    def _feed_line(self, line: str, offset: int) -> None:
+        if self._fence is None:
+            match = FENCE_REGEX.match(line)
+            if match:
+                self._fence = match.group(1)
+                self._language = match.group(2)
+                self._start = offset + len(line) + 1
+                self._lines = []
+        elif line.strip().startswith(self._fence) and (
+            line.strip().strip(self._fence[0]) == ""
+        ):
+            code = "\n".join(self._lines)
+            self.blocks.append(
+                Code(self._language, code, self._start, self._start + len(code))
+            )
+            self._fence = None
+        else:
+            self._lines.append(line)
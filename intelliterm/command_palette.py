@@ -1,10 +1,13 @@
+import itertools
 import os
 import re
-from typing import Any, Generator, Optional
+import time
+from functools import lru_cache
+from typing import Any, Generator, Generic, Iterable, Iterator, Optional, TypeVar
 
 from prompt_toolkit import HTML, PromptSession
 from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
-from prompt_toolkit.completion import Completer, Completion, FuzzyCompleter
+from prompt_toolkit.completion import Completer, Completion
 from prompt_toolkit.key_binding import KeyBindings
 from prompt_toolkit.styles import Style
 from prompt_toolkit.validation import Validator
@@ -13,7 +16,11 @@ from rich.panel import Panel
 
 import intelliterm
 from intelliterm.console import console
+from intelliterm.constants import SAVED_CHATS_DIR
 from intelliterm.notifications import notification
+from intelliterm.stats import lru_info, stats
+
+T = TypeVar("T")
 
 key_bindings = KeyBindings()
 
@@ -35,68 +42,102 @@ def get_history() -> None:
 session: PromptSession = PromptSession()  # history=)
 
 
+def refresh_toolbar() -> bool:
+    """Redraw prompt (and its toolbar), from any thread.
+
+    Returns:
+        bool: False if prompt is not shown.
+    """
+    app = session.app
+
+    if not app.is_running or app.loop is None:
+        return False
+
+    app.loop.call_soon_threadsafe(app.invalidate)
+    return True
+
+
+notification.subscribe(refresh_toolbar)
+
+
 def bottom_toolbar() -> Any:
     from intelliterm.config import config
 
-    buffer = session.default_buffer
-    input = buffer.text
-    curr_index = input.count(" ")
-    alias, *args = input.split(" ")
+    message = notification.current()
+
+    if message:
+        return HTML(message)
+
+    input = session.default_buffer.text
+    # (regular text doesn't change the toolbar, share one cache entry for it)
+    key = input if input.startswith(CommandPalette.TRIGGER) else ""
+    return toolbar(key, config.settings().name)
+
+
+@lru_cache(maxsize=1024)
+def toolbar(input: str, config_name: str) -> HTML:
+    """Toolbar for input (cached, as it's rendered on every keystroke/redraw).
+
+    Args:
+        input (str): Command input (empty for regular text).
+        config_name (str): Name of active configuration.
+
+    Returns:
+        HTML
+    """
+    output = f"<strong>{config_name}</strong>"
+
+    if input == CommandPalette.TRIGGER:
+        output = "Enter a command"
+    elif CommandPalette.is_valid_input(input):
+        alias, *_ = input.split(" ")
+        command = CommandPalette.get_command(alias)
 
-    output = ""
+        if command:
+            output = alias + " "
+
+            if command.args:
+                output += " | ".join(
+                    arg.name if arg.is_option else f"&lt;{arg.name}&gt;"
+                    for arg in command.args
+                )
 
-    if not notification.read:
-        output = notification.message
+            output_groups = output.split(" ", 1)
+
+            try:
+                curr_index = input.count(" ")
+                highlighted = output_groups[curr_index]
+                output_groups[curr_index] = f"<strong>{highlighted}</strong>"
+                output = " ".join(output_groups)
+            except IndexError:
+                pass
     else:
-        output = f"<strong>{config.active().name}</strong>"
-
-        if input == CommandPalette.TRIGGER:
-            output = "Enter a command"
-        if CommandPalette.is_valid_input(input):
-            command = CommandPalette.get_command(alias)
-
-            if command:
-                output = alias + " "
-
-                if command.args:
-                    output += " | ".join(
-                        arg.name if arg.is_option else f"&lt;{arg.name}&gt;"
-                        for arg in command.args
-                    )
-            if output.startswith(CommandPalette.TRIGGER):
-                output_groups = output.split(" ", 1)
-
-                try:
-                    output_groups[curr_index] = (
-                        f"<strong>{output_groups[curr_index]}</strong>"
-                    )
-                    output = " ".join(output_groups)
-                except IndexError:
-                    pass
-        else:
-            if input != CommandPalette.TRIGGER:
-                output = f"Unknown command: <strong><style color='ansired'>{input.strip()}</style></strong>"
+        output = f"Unknown command: <strong><style color='ansired'>{input.strip()}</style></strong>"
     return HTML(output)
 
 
 def rprompt() -> str:
     from intelliterm.config import config
 
-    return f"[{config.active().name}]"
+    return f"[{config.settings().name}]"
 
 
-def prompt() -> str:
+def prompt(default: str = "") -> str:
     """Prompt for user input.
 
+    Args:
+        default (str): Initial input (ie: typed ahead). Defaults to "".
+
     Returns:
         str: User input.
     """
     from intelliterm.config import config
 
+    settings = config.settings()
     style: Style = Style.from_dict(
         {
             "": "",
-            "caret": f"fg:ansi{config.get('accent_color')}",
+            "caret": f"fg:ansi{settings.accent_color}",
             "bottom-toolbar": "fg:ansiblack bg:black",
         }
     )
@@ -107,18 +148,68 @@ def prompt() -> str:
             ("class:input", " "),
         ],
         auto_suggest=AutoSuggestFromHistory(),
-        completer=FuzzyCompleter(CommandCompleter()),
+        completer=completer,
         mouse_support=False,
         key_bindings=key_bindings,
         validator=validator,
         validate_while_typing=False,
         bottom_toolbar=bottom_toolbar,
-        placeholder=HTML(f"<ansiblack>  ({config.active().name})</ansiblack>"),
+        placeholder=HTML(f"<ansiblack>  ({settings.name})</ansiblack>"),
+        default=default,
         # rprompt=rprompt,
         style=style,
     )
 
 
+class Trie(Generic[T]):
+    """Prefix tree mapping words to values (completes a prefix without scanning
+    all words).
+
+    Methods:
+        insert(word: str, value: T) -> None
+        complete(prefix: str) -> Iterator[tuple[str, T]]:
+            Words starting with prefix (and their values).
+    """
+
+    # (key of a node's value, can't clash with a character)
+    END = ""
+
+    def __init__(self, items: Iterable[tuple[str, T]] = ()) -> None:
+        self._root: dict[str, Any] = {}
+
+        for word, value in items:
+            self.insert(word, value)
+
+    def insert(self, word: str, value: T) -> None:
+        node = self._root
+
+        for char in word:
+            node = node.setdefault(char, {})
+        node[Trie.END] = value
+
+    def complete(self, prefix: str) -> Iterator[tuple[str, T]]:
+        """Words starting with prefix (and their values), in insertion order of
+        their characters."""
+        node = self._root
+
+        for char in prefix:
+            if char not in node:
+                return
+            node = node[char]
+
+        stack = [(prefix, node)]
+
+        while stack:
+            word, node = stack.pop()
+
+            for char, child in reversed(node.items()):
+                if char == Trie.END:
+                    continue
+                stack.append((word + char, child))
+            if Trie.END in node:
+                yield word, node[Trie.END]
+
+
 class CommandArgument:
     """Class defining a command argument/option.
 
@@ -287,7 +378,7 @@ class CommandPalette:
     """
 
     TRIGGER: str = "!"
-    COMMAND_REGEX = r"^!(\w+)(?:\s{0,1}(.*))?"
+    COMMAND_REGEX = re.compile(r"^!(\w+)(?:\s{0,1}(.*))?")
 
     AVAILABLE_COMMANDS: list[Command] = [
         Command(
@@ -306,6 +397,7 @@ class CommandPalette:
             args=[
                 CommandArgument("name"),
                 CommandArgument("edit", is_option=True),
+                CommandArgument("save", is_option=True),
                 CommandArgument("reset", is_option=True),
             ],
             aliases=["u", "use", "cfg", "switch", "config"],
@@ -314,7 +406,10 @@ class CommandPalette:
                 CommandUsage(
                     command="use",
                     args=[CommandArgument("name")],
-                    description="[reset]Use / switch to another configuration (case-insensitive)",
+                    description=(
+                        "[reset]Use / switch to another configuration "
+                        + "for this session (case-insensitive)"
+                    ),
                     examples=[
                         CommandExample(command="use", args=[CommandArgument("gpt3")])
                     ],
@@ -327,6 +422,11 @@ class CommandPalette:
                         + f"(via {os.environ.get('EDITOR', 'nano')})"
                     ),
                 ),
+                CommandUsage(
+                    command="config",
+                    args=[CommandArgument("save", is_option=True)],
+                    description="Save active configuration as default",
+                ),
                 CommandUsage(
                     command="config",
                     args=[CommandArgument("reset", is_option=True)],
@@ -344,6 +444,43 @@ class CommandPalette:
             description="Start new chat / clear context",
             aliases=["n", "new"],
         ),
+        Command(
+            name="branch",
+            description="Fork chat (or show branches)",
+            aliases=["b", "branch"],
+            args=[CommandArgument("name")],
+            usage=[
+                CommandUsage(command="branch", description="Show branches"),
+                CommandUsage(
+                    command="branch",
+                    args=[CommandArgument("name")],
+                    description="Fork chat at its last turn, as a new branch",
+                ),
+            ],
+        ),
+        Command(
+            name="checkout",
+            description="Switch to branch",
+            aliases=["ck", "checkout"],
+            args=[CommandArgument("name")],
+        ),
+        Command(
+            name="retry",
+            description="Retry last prompt, on a new branch",
+            aliases=["rt", "retry"],
+            args=[CommandArgument("prompt")],
+            usage=[
+                CommandUsage(
+                    command="retry",
+                    description="Fork chat at last prompt and ask it again",
+                ),
+                CommandUsage(
+                    command="retry",
+                    args=[CommandArgument("prompt")],
+                    description="Fork chat at last prompt and ask another one",
+                ),
+            ],
+        ),
         Command(
             name="save",
             description="Save chat",
@@ -353,6 +490,15 @@ class CommandPalette:
             name="load",
             description="Load chat",
             aliases=["l", "load"],
+            args=[CommandArgument("title")],
+            usage=[
+                CommandUsage(command="load", description="Pick a saved chat to load"),
+                CommandUsage(
+                    command="load",
+                    args=[CommandArgument("title")],
+                    description="Load saved chat by title (completed with Tab)",
+                ),
+            ],
         ),
         Command(
             name="copy",
@@ -364,23 +510,43 @@ class CommandPalette:
             name="run",
             description="Run code block in response",
             aliases=["r", "run"],
+            args=[
+                CommandArgument("n"),
+                CommandArgument("all", is_option=True),
+            ],
+            usage=[
+                CommandUsage(command="run", description="Run first code block"),
+                CommandUsage(
+                    command="run",
+                    args=[CommandArgument("n")],
+                    description="Run n-th code block",
+                    examples=[
+                        CommandExample(command="run", args=[CommandArgument("2")])
+                    ],
+                ),
+                CommandUsage(
+                    command="run",
+                    args=[CommandArgument("all", is_option=True)],
+                    description="Run all code blocks, in order",
+                ),
+            ],
         ),
         Command(
             name="file",
-            description="Input a file",
+            description="Input files",
             aliases=["f", "file"],
             args=[
-                CommandArgument("path"),
+                CommandArgument("paths"),
                 CommandArgument("prompt"),
             ],
             usage=[
                 CommandUsage(
                     command="file",
                     args=[
-                        CommandArgument("path"),
+                        CommandArgument("paths"),
                         CommandArgument("prompt"),
                     ],
-                    description="Input file with prompt",
+                    description="Input files, directories or globs with prompt",
                     examples=[
                         CommandExample(
                             command="file",
@@ -388,11 +554,43 @@ class CommandPalette:
                                 CommandArgument("file.txt"),
                                 CommandArgument("explain this file"),
                             ],
-                        )
+                        ),
+                        CommandExample(
+                            command="file",
+                            args=[
+                                CommandArgument("src/ *.md"),
+                                CommandArgument("document this"),
+                            ],
+                        ),
                     ],
                 ),
             ],
         ),
+        Command(
+            name="index",
+            description="Index project files, to attach relevant parts to prompts",
+            aliases=["ix", "index"],
+            args=[
+                CommandArgument("dir"),
+                CommandArgument("off", is_option=True),
+            ],
+            usage=[
+                CommandUsage(command="index", description="Show index"),
+                CommandUsage(
+                    command="index",
+                    args=[CommandArgument("dir")],
+                    description="Index directory (relevant chunks attached to prompts)",
+                    examples=[
+                        CommandExample(command="index", args=[CommandArgument("src/")])
+                    ],
+                ),
+                CommandUsage(
+                    command="index",
+                    args=[CommandArgument("off", is_option=True)],
+                    description="Stop attaching chunks to prompts",
+                ),
+            ],
+        ),
         Command(
             name="shell",
             description="Run a shell command",
@@ -409,6 +607,23 @@ class CommandPalette:
                 ),
             ],
         ),
+        Command(
+            name="stats",
+            description="Show performance statistics (latency, throughput, caches)",
+            aliases=["st", "stats"],
+            args=[CommandArgument("all", is_option=True)],
+            usage=[
+                CommandUsage(
+                    command="stats",
+                    description="Show statistics of this session, per configuration",
+                ),
+                CommandUsage(
+                    command="stats",
+                    args=[CommandArgument("all", is_option=True)],
+                    description="Show statistics of this session and saved chats",
+                ),
+            ],
+        ),
         Command(
             name="quit",
             description=f"Quit {intelliterm.__name__}",
@@ -422,6 +637,9 @@ class CommandPalette:
         for command in AVAILABLE_COMMANDS
     ]
     ALL_ALIASES = [alias for command in AVAILABLE_COMMANDS for alias in command.aliases]
+    COMMANDS_BY_ALIAS: dict[str, Command] = {
+        alias: command for command in AVAILABLE_COMMANDS for alias in command.aliases
+    }
 
     @staticmethod
     def get_command(alias: str) -> Optional[Command]:
@@ -434,14 +652,7 @@ class CommandPalette:
             Optional(Command): Command if it exists, otherwise None.
         """
         alias = alias.replace(CommandPalette.TRIGGER, "")
-        return next(
-            (
-                command
-                for command in CommandPalette.AVAILABLE_COMMANDS
-                if alias in command.aliases
-            ),
-            None,
-        )
+        return CommandPalette.COMMANDS_BY_ALIAS.get(alias)
 
     @staticmethod
     def get_aliases(command_name: str) -> list[str]:
@@ -486,8 +697,9 @@ class CommandPalette:
             bool
         """
         if input.startswith(CommandPalette.TRIGGER):
-            match = re.match(CommandPalette.COMMAND_REGEX, input)  # is command
-            return match.group(1) in CommandPalette.ALL_ALIASES if match else False
+            match = CommandPalette.COMMAND_REGEX.match(input)  # is command
+            aliases = CommandPalette.COMMANDS_BY_ALIAS
+            return match.group(1) in aliases if match else False
         else:
             return True  # is regular text
 
@@ -517,32 +729,166 @@ class CommandPalette:
         return alias not in CommandPalette.PRIMARY_ALIASES
 
 
+class PathCache:
+    """Directory listings, cached for a short while (so completing a path doesn't
+    list the same directory on every keystroke).
+
+    Attributes:
+        ttl (float): Seconds a listing is kept for.
+        max_size (int): Max directories kept (least recently listed are dropped).
+        hits (int): Listings served from cache.
+        misses (int): Listings read from disk.
+
+    Methods:
+        list(directory: str) -> Trie[bool]:
+            Entries of directory (mapped to whether they're directories).
+    """
+
+    def __init__(self, ttl: float = 2.0, max_size: int = 64) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._listings: dict[str, tuple[float, Trie[bool]]] = {}
+
+    def list(self, directory: str) -> "Trie[bool]":
+        """Entries of directory (empty if it can't be listed)."""
+        now = time.monotonic()
+        cached = self._listings.pop(directory, None)
+
+        if cached is not None and now - cached[0] <= self.ttl:
+            self.hits += 1
+        else:
+            self.misses += 1
+            entries: Trie[bool] = Trie()
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        entries.insert(entry.name, entry.is_dir())
+            except OSError:
+                pass
+            cached = (now, entries)
+
+        self._listings[directory] = cached  # (most recent last)
+        while len(self._listings) > self.max_size:
+            del self._listings[next(iter(self._listings))]
+        return cached[1]
+
+
 class CommandCompleter(Completer):
-    """Auto-completion for CommandPalette."""
+    """Auto-completion for CommandPalette: command aliases and their arguments
+    (configuration names, saved chat titles, file paths and options).
+
+    Attributes:
+        aliases (Trie[Command]): Command aliases.
+        paths (PathCache): Cached directory listings.
+    """
+
+    def __init__(self) -> None:
+        self.aliases: Trie[Command] = Trie(CommandPalette.COMMANDS_BY_ALIAS.items())
+        self.paths = PathCache()
 
     def get_completions(self, document: Any, complete_event: Any) -> Generator:
         from intelliterm.config import config
 
-        word: str = document.current_line.replace(CommandPalette.TRIGGER, "")
-        num_words = len(word.split())
+        line: str = document.text_before_cursor
+
+        if not line.startswith(CommandPalette.TRIGGER):
+            return
 
-        if num_words == 0:
+        style = f"fg:ansi{config.settings().accent_color} bg:black"
+        alias, separator, text = line[1:].partition(" ")
+
+        if not separator:
             # First word (!word)
-            for command in CommandPalette.AVAILABLE_COMMANDS:
-                for alias in command.aliases:
-                    if alias.startswith(word):
-                        yield Completion(
-                            CommandPalette.TRIGGER + alias,
-                            start_position=document.get_start_of_document_position(),
-                            style=f"fg:ansi{config.get('accent_color')} bg:black",
-                            display_meta=(
-                                f"(aliased: {CommandPalette.TRIGGER + command.name})"
-                                if CommandPalette.is_secondary_alias(alias)
-                                else command.description
-                            ),
-                        )
+            for name, aliased in self.aliases.complete(alias):
+                yield Completion(
+                    CommandPalette.TRIGGER + name,
+                    start_position=-len(line),
+                    style=style,
+                    display_meta=(
+                        f"(aliased: {CommandPalette.TRIGGER + aliased.name})"
+                        if CommandPalette.is_secondary_alias(name)
+                        else aliased.description
+                    ),
+                )
+            return
+
+        command = CommandPalette.get_command(alias)
+
+        if command is None:
+            return
+
+        # (arguments)
+        match command.name:
+            case "config":
+                candidates = self.config_names(text)
+            case "load":
+                candidates = self.chat_titles(text)
+            case "file":
+                candidates = self.file_paths(text.rsplit(" ", 1)[-1])
+            case "index":
+                candidates = itertools.chain(
+                    self.options(command, text), self.file_paths(text)
+                )
+            case _:
+                candidates = self.options(command, text.rsplit(" ", 1)[-1])
+
+        for completion, start_position, display in candidates:
+            yield Completion(
+                completion,
+                start_position=start_position,
+                display=display,
+                style=style,
+            )
+
+    def options(self, command: Command, word: str) -> Iterator[tuple[str, int, str]]:
+        """Complete command options (ie: `code` for `!copy`)."""
+        options = [arg.name for arg in command.args or [] if arg.is_option]
+
+        for option in options:
+            if option.startswith(word):
+                yield option, -len(word), option
+
+    def config_names(self, text: str) -> Iterator[tuple[str, int, str]]:
+        """Complete configuration names (case-insensitive) and `!config` options."""
+        from intelliterm.config import config
+
+        command = CommandPalette.get_command("config")
+        assert command
+        yield from self.options(command, text)
+
+        active_name = config.active_name()
+        names: Trie[str] = Trie(
+            (name.lower(), name)
+            for name in config.config.sections()
+            if name not in ("CONFIG", active_name)
+        )
+        for _, name in names.complete(text.lower()):
+            yield name, -len(text), name
+
+    def chat_titles(self, text: str) -> Iterator[tuple[str, int, str]]:
+        """Complete titles of saved chats (titles may have spaces)."""
+        for file_name, _ in self.paths.list(SAVED_CHATS_DIR).complete(text):
+            if file_name.endswith(".json"):
+                yield file_name[:-5], -len(text), file_name[:-5]
+
+    def file_paths(self, word: str) -> Iterator[tuple[str, int, str]]:
+        """Complete path (ie: `src/ma` to `src/main.py`)."""
+        directory, partial = os.path.split(word)
+        entries = self.paths.list(os.path.expanduser(directory or os.curdir))
+
+        for name, is_dir in entries.complete(partial):
+            if name.startswith(".") and not partial.startswith("."):
+                continue  # (hidden)
+
+            suffix = os.sep if is_dir else ""
+            yield os.path.join(directory, name) + suffix, -len(word), name + suffix
 
 
+completer = CommandCompleter()
+stats.register_cache("toolbar", lru_info(toolbar))
+stats.register_cache("paths", lambda: (completer.paths.hits, completer.paths.misses))
 validator = Validator.from_callable(
     CommandPalette.is_valid_input,
     error_message="Invalid command",
@@ -1,8 +1,17 @@
 import os
 import random
+import stat
 import subprocess
+import tempfile
 from configparser import ConfigParser, SectionProxy
-from typing import Any
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # (ie: Windows)
+    fcntl = None  # type: ignore
 
 from prompt_toolkit.shortcuts import confirm
 from rich.columns import Columns
@@ -12,8 +21,154 @@ from intelliterm.command_palette import CommandPalette
 from intelliterm.console import console
 from intelliterm.constants import USER_DATA_DIR
 from intelliterm.notifications import notification
+from intelliterm.tracing import traced
+from intelliterm.types import Backend
 from intelliterm.utils import TIPS, logger, longest_line, pretty_dict
 
+REQUIRED_PROPERTIES = [
+    "backend",
+    "model",
+    "temperature",
+    "presence_penalty",
+    "frequency_penalty",
+    "accent_color",
+]
+
+# (property: default value)
+OPTIONAL_PROPERTIES = {
+    # Inputs (files, stdin) larger than this are processed in chunks
+    "large_input_bytes": "131072",
+    # Max tokens per chunk
+    "chunk_tokens": "3000",
+    # Max chunks processed concurrently
+    "chunk_concurrency": "4",
+    # Max total tokens of files input at once (ie: directories, globs)
+    "file_token_budget": "50000",
+    # Chunks of indexed files attached to each prompt (see !index)
+    "retrieval_top_k": "5",
+    # Wall-clock limit (in seconds) of code run with !run
+    "run_timeout": "60",
+    # Memory limit (in MiB) of code run with !run
+    "run_memory_mb": "1024",
+    # Run Python code in a warm interpreter (forked from a pre-started one)
+    "warm_python": "no",
+    # Modules the warm interpreter imports upfront (comma-separated)
+    "preload_modules": "",
+    # Keep chat in the terminal's scrollback (instead of clearing it every prompt)
+    "scrollback": "no",
+}
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Typed (parsed and validated) snapshot of a configuration.
+
+    Attributes:
+        name (str): Configuration (section) name.
+        backend (Backend): Model provider.
+        model (str): Model name.
+        temperature (float)
+        presence_penalty (float)
+        frequency_penalty (float)
+        accent_color (str): Color used to highlight the active configuration.
+        large_input_bytes (int): Inputs larger than this are processed in chunks.
+        chunk_tokens (int): Max tokens per chunk.
+        chunk_concurrency (int): Max chunks processed concurrently.
+        file_token_budget (int): Max total tokens of files input at once.
+        retrieval_top_k (int): Chunks of indexed files attached to each prompt.
+        run_timeout (int): Wall-clock limit (in seconds) of code runs.
+        run_memory_mb (int): Memory limit (in MiB) of code runs.
+        warm_python (bool): Run Python code in a warm interpreter.
+        preload_modules (tuple[str, ...]): Modules the warm interpreter imports.
+        scrollback (bool): Keep chat in the terminal's scrollback (no clearing).
+    """
+
+    name: str
+    backend: Backend
+    model: str
+    temperature: float
+    presence_penalty: float
+    frequency_penalty: float
+    accent_color: str
+    large_input_bytes: int
+    chunk_tokens: int
+    chunk_concurrency: int
+    file_token_budget: int
+    retrieval_top_k: int
+    run_timeout: int
+    run_memory_mb: int
+    warm_python: bool
+    preload_modules: tuple[str, ...]
+    scrollback: bool
+
+    @classmethod
+    def parse(cls, section: SectionProxy) -> "Settings":
+        """Parse configuration section.
+
+        Args:
+            section (SectionProxy): Configuration section.
+
+        Raises:
+            ValueError: If a property is missing or invalid.
+
+        Returns:
+            Settings
+        """
+        missing = [key for key in REQUIRED_PROPERTIES if key not in section]
+
+        if missing:
+            raise ValueError(f"{section.name}: missing {', '.join(missing)}")
+
+        try:
+            backend = Backend(section["backend"].upper())  # case-insensitive
+        except ValueError:
+            raise ValueError(
+                f"{section.name}: invalid backend {section['backend']} "
+                + f"(expected one of: {', '.join(b.value.lower() for b in Backend)})"
+            )
+
+        def parse_float(key: str) -> float:
+            try:
+                return float(section[key])
+            except ValueError:
+                raise ValueError(f"{section.name}: {key} must be a number")
+
+        def parse_positive_int(key: str) -> int:
+            value = section.get(key, OPTIONAL_PROPERTIES[key])
+            if not value.isdigit() or int(value) == 0:
+                raise ValueError(f"{section.name}: {key} must be a positive integer")
+            return int(value)
+
+        def parse_bool(key: str) -> bool:
+            value = section.get(key, OPTIONAL_PROPERTIES[key]).lower()
+            if value not in ConfigParser.BOOLEAN_STATES:
+                raise ValueError(f"{section.name}: {key} must be yes or no")
+            return ConfigParser.BOOLEAN_STATES[value]
+
+        def parse_list(key: str) -> tuple[str, ...]:
+            value = section.get(key, OPTIONAL_PROPERTIES[key])
+            return tuple(item.strip() for item in value.split(",") if item.strip())
+
+        return cls(
+            name=section.name,
+            backend=backend,
+            model=section["model"],
+            temperature=parse_float("temperature"),
+            presence_penalty=parse_float("presence_penalty"),
+            frequency_penalty=parse_float("frequency_penalty"),
+            accent_color=section["accent_color"],
+            large_input_bytes=parse_positive_int("large_input_bytes"),
+            chunk_tokens=parse_positive_int("chunk_tokens"),
+            chunk_concurrency=parse_positive_int("chunk_concurrency"),
+            file_token_budget=parse_positive_int("file_token_budget"),
+            retrieval_top_k=parse_positive_int("retrieval_top_k"),
+            run_timeout=parse_positive_int("run_timeout"),
+            run_memory_mb=parse_positive_int("run_memory_mb"),
+            warm_python=parse_bool("warm_python"),
+            preload_modules=parse_list("preload_modules"),
+            scrollback=parse_bool("scrollback"),
+        )
+
 
 class Config:
     """Intelliterm configurations manager.
@@ -23,8 +178,12 @@ class Config:
             Check if configuration file exists.
         default() -> ConfigParser:
             Get default configuration.
+        active_name() -> str:
+            Get name of active configuration.
         active() -> SectionProxy:
             Get active configuration.
+        settings() -> Settings:
+            Get typed snapshot of active configuration.
         show() -> None:
             Display active and available configurations.
         get(property: Optional[str] = None) -> str:
@@ -33,8 +192,20 @@ class Config:
             Edit configurations file.
         load() -> None:
             Load configurations file.
+        refresh() -> None:
+            Reload configurations file if it changed on disk.
+        validate() -> None:
+            Validate configurations and parse them into typed snapshots.
+        locked() -> Iterator[None]:
+            Hold an exclusive lock on the configurations file (across processes).
+        write(config: ConfigParser) -> None:
+            Atomically replace configurations file.
+        select(config_name: Optional[str]) -> bool:
+            Use a different configuration for this session (silently).
         use(config_name: str) -> None:
-            Use a different configuration.
+            Use a different configuration for this session.
+        save_active() -> None:
+            Save active configuration as default (in configurations file).
         reset() -> None:
             Reset to default configurations file.
     """
@@ -43,7 +214,18 @@ class Config:
 
     def __init__(self) -> None:
         self.config: ConfigParser = ConfigParser()
-        self.load()
+        self._settings: dict[str, Settings] = {}
+        self._mtime: Optional[float] = None
+        # Active configuration for this session (process) only, overrides the
+        # default one in the configurations file.
+        self._session_active: Optional[str] = None
+
+        try:
+            self.load()
+        except ValueError as e:
+            console.error(f"Invalid configuration ({Config.CONFIG_PATH})")
+            console.print(e)
+            quit()
 
     @staticmethod
     def exists() -> bool:
@@ -74,24 +256,46 @@ class Config:
 
         return default_config
 
+    def active_name(self) -> str:
+        """Get name of active configuration."""
+        self.refresh()
+
+        if self._session_active in self._settings:
+            return self._session_active
+        return self.config["CONFIG"]["active"]
+
     def active(self) -> SectionProxy:
         """Get active configuration."""
-        return self.config[self.config["CONFIG"]["active"]]
+        return self.config[self.active_name()]
+
+    def settings(self) -> Settings:
+        """Get typed snapshot of active configuration.
+
+        (Cheap enough to call on every keystroke, the configurations file is only
+        re-read when it changes on disk.)
+
+        Returns:
+            Settings
+        """
+        active_name = self.active_name()  # (refreshes settings)
+        return self._settings[active_name]
 
     def show(self) -> None:
         """Display active and available configurations."""
         panels: list[Panel] = []
 
+        settings = self.settings()
+
         for section in self.config:
             if section != "CONFIG" and section != "DEFAULT":
                 pretty_config = pretty_dict(
                     dict(self.config[section]),
-                    colors=section == self.active().name,
+                    colors=section == settings.name,
                 )
 
-                if section == self.active().name:
+                if section == settings.name:
                     content = (
-                        f"[{self.get('accent_color')}][bold]{section}[reset]"
+                        f"[{settings.accent_color}][bold]{section}[reset]"
                         + "\n"
                         + ("-" * longest_line(pretty_config) + "\n")
                         + pretty_config
@@ -100,7 +304,7 @@ class Config:
                     panels.append(
                         Panel(
                             content,
-                            border_style=self.get("accent_color"),
+                            border_style=settings.accent_color,
                             title="(active)",
                             title_align="right",
                         )
@@ -135,7 +339,9 @@ class Config:
                 )
 
     def get(self, property: str) -> str:
-        """Get property in active configuration.
+        """Get (raw, unparsed) property in active configuration.
+
+        Prefer `settings()` for typed values.
 
         Args:
             property (str): Property to get from active configuration.
@@ -148,57 +354,180 @@ class Config:
     def edit(self) -> None:
         """Edit configurations file."""
         subprocess.run([os.environ.get("EDITOR", "nano"), Config.CONFIG_PATH])
-        self.load()
+        self.refresh()
         self.show()
 
     def validate(self) -> None:
-        # TODO(finish)
-        required_values: dict[str, Any] = {"": {}}
+        """Validate configurations and parse them into typed snapshots.
+
+        Raises:
+            ValueError: If configurations are invalid.
+        """
+        if not self.config.has_option("CONFIG", "active"):
+            raise ValueError("Missing active configuration ([CONFIG] active = <name>)")
+
+        active = self.config["CONFIG"]["active"]
+
+        if active == "CONFIG" or not self.config.has_section(active):
+            raise ValueError(f"No configuration named {active} (set as active)")
+
+        settings: dict[str, Settings] = {}
+        errors: list[str] = []
 
-        for section, keys in required_values.items():
-            if section not in self.config:
-                raise Exception(f"Missing section {section} in config")
+        for section in self.config.sections():
+            if section != "CONFIG":
+                try:
+                    settings[section] = Settings.parse(self.config[section])
+                except ValueError as e:
+                    errors.append(str(e))
 
+        if errors:
+            raise ValueError("\n".join(errors))
+
+        self._settings = settings
+
+    @staticmethod
+    @contextmanager
+    def locked() -> Iterator[None]:
+        """Hold an exclusive lock on the configurations file (across processes)."""
+        os.makedirs(os.path.dirname(Config.CONFIG_PATH), exist_ok=True)
+
+        with open(Config.CONFIG_PATH + ".lock", "w") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def write(config: ConfigParser) -> None:
+        """Atomically replace configurations file (call while `locked()`).
+
+        Args:
+            config (ConfigParser): Configurations to write.
+        """
+        directory = os.path.dirname(Config.CONFIG_PATH)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".config.", text=True)
+
+        try:
+            with os.fdopen(fd, "w") as tmp_file:
+                config.write(tmp_file)
+                tmp_file.flush()
+                os.fsync(tmp_file.fileno())
+            if Config.exists():
+                os.chmod(tmp_path, stat.S_IMODE(os.stat(Config.CONFIG_PATH).st_mode))
+            os.replace(tmp_path, Config.CONFIG_PATH)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @traced("config.load")
     def load(self) -> None:
-        """Load configurations file."""
+        """Load configurations file.
+
+        Raises:
+            ValueError: If configurations are invalid.
+        """
         if not self.exists():
-            os.makedirs(os.path.dirname(Config.CONFIG_PATH), exist_ok=True)
-            with open(Config.CONFIG_PATH, "w+") as file:
-                self.default().write(file)
-                logger.info("Configurations file not found, set to default")
-        self.config.read(Config.CONFIG_PATH)
+            with self.locked():
+                if not self.exists():
+                    self.write(self.default())
+                    logger.info("Configurations file not found, set to default")
+
+        mtime = os.stat(Config.CONFIG_PATH).st_mtime
+        config = ConfigParser()
+        config.read(Config.CONFIG_PATH)
+
+        previous = self.config
+        self.config = config
+        self._mtime = mtime
+
+        try:
+            self.validate()
+        except ValueError:
+            self.config = previous  # keep last valid configurations
+            raise
+
+    def refresh(self) -> None:
+        """Reload configurations file if it changed on disk."""
+        try:
+            mtime: Optional[float] = os.stat(Config.CONFIG_PATH).st_mtime
+        except FileNotFoundError:
+            mtime = None
+
+        if mtime is None or mtime != self._mtime:
+            try:
+                self.load()
+            except ValueError as e:
+                console.error(f"Invalid configuration ({Config.CONFIG_PATH})")
+                console.print(e)
+                logger.info(f"Invalid configuration: {e}")
 
-    def use(self, config_name: str) -> None:
-        """Use a different configuration.
+    def select(self, config_name: Optional[str]) -> bool:
+        """Use a different configuration for this session (silently).
+
+        The configurations file is left untouched, so other running sessions keep
+        their own active configuration (see `save_active()` to persist it).
 
         Args:
-            config_name (str): Name of configuration to set as active.
+            config_name (Optional[str]): Name of configuration to set as active
+                (case-insensitive), or None to go back to the default one.
+
+        Returns:
+            bool: False if there is no configuration named `config_name`.
         """
+        if config_name is None:
+            self._session_active = None
+            return True
+
         config_name = config_name.upper()  # case-insensitive
+        self.refresh()
 
-        self.config.read(Config.CONFIG_PATH)
+        if config_name in self._settings:
+            self._session_active = config_name
+            return True
+        return False
 
-        if config_name != "CONFIG" and self.config.has_section(config_name):
-            self.config.set("CONFIG", "active", config_name)
+    def use(self, config_name: str) -> None:
+        """Use a different configuration for this session.
 
-            with open(Config.CONFIG_PATH, "w+") as config_file:
-                self.config.write(config_file)
-                self.load()
-                notification.emit(f"Switched to {self.active().name}")
-                logger.info(f"{self.active().name} {dict( self.active())}")
+        Args:
+            config_name (str): Name of configuration to set as active.
+        """
+        if self.select(config_name):
+            notification.emit(f"Switched to {self.active().name}")
+            logger.info(f"{self.active().name} {dict( self.active())}")
         else:
-            console.error(f"No configuration named {config_name}")
-            logger.info(f"No configuration named {config_name}")
+            console.error(f"No configuration named {config_name.upper()}")
+            logger.info(f"No configuration named {config_name.upper()}")
             self.show()
 
+    def save_active(self) -> None:
+        """Save active configuration as default (in configurations file)."""
+        config_name = self.active_name()
+
+        with self.locked():
+            # re-read, so concurrent edits by other sessions aren't overwritten
+            config = ConfigParser()
+            config.read(Config.CONFIG_PATH)
+            config.set("CONFIG", "active", config_name)
+            self.write(config)
+
+        self.refresh()
+        notification.emit(f"Saved {config_name} as default configuration")
+        logger.info(f"Saved {config_name} as default configuration")
+
     def reset(self) -> None:
         """Reset to default configurations file."""
         yes: bool = confirm("Reset to default configuration?")
 
         if yes:
-            with open(Config.CONFIG_PATH, "w+") as config_file:
-                self.default().write(config_file)
+            with self.locked():
+                self.write(self.default())
                 logger.info(f"{Config.CONFIG_PATH} reset to defaults")
+            self._session_active = None
             self.load()
             self.show()
 
@@ -1,7 +1,9 @@
 import os
 import re
-from typing import Any, Mapping, Optional, cast
+from contextlib import contextmanager
+from typing import IO, Any, Iterator, Mapping, Optional, cast
 
+from rich.color import ColorSystem
 from rich.console import Console as C
 from rich.style import StyleType
 from rich.theme import Theme
@@ -23,6 +25,8 @@ class Console(C):
             Prints the given objects to the console as an error.
         divider(*objects: Any) -> None:
             Prints a divider as wide as the terminal window.
+        redirect(file: IO[str], width: int, height: int, color: bool) -> Iterator[None]:
+            Temporarily render to another file (ie: a daemon client's socket).
     """
 
     def info(self, *objects: Any, sep: str = " ", end: str = "\n") -> None:
@@ -73,5 +77,51 @@ class Console(C):
         else:
             self.print("-" * os.get_terminal_size().columns)
 
+    @contextmanager
+    def redirect(
+        self,
+        file: IO[str],
+        width: int,
+        height: int,
+        color: bool,
+        truecolor: bool = False,
+    ) -> Iterator[None]:
+        """Temporarily render to another file (ie: a daemon client's socket).
+
+        Args:
+            file (IO[str]): File to render to.
+            width (int): Width of the client's terminal.
+            height (int): Height of the client's terminal.
+            color (bool): Client is a terminal (enables colors and live rendering).
+            truecolor (bool): Client terminal supports truecolor. Defaults to False.
+        """
+        saved = (
+            self.file,
+            self._width,
+            self._height,
+            self._force_terminal,
+            self._color_system,
+        )
+
+        self.file = file
+        self.width = width
+        self.height = height
+        self._force_terminal = color
+        self._color_system = (
+            (ColorSystem.TRUECOLOR if truecolor else ColorSystem.EIGHT_BIT)
+            if color
+            else None
+        )
+        try:
+            yield
+        finally:
+            (
+                self.file,
+                self._width,
+                self._height,
+                self._force_terminal,
+                self._color_system,
+            ) = saved
+
 
 console = Console(theme=Theme(cast(Mapping[str, StyleType] | None, COLORS)))
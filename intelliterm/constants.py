@@ -11,3 +11,7 @@ USER_DATA_DIR = platformdirs.user_data_dir(intelliterm.__name__, APP_AUTHOR)
 DOCUMENTS_DIR = platformdirs.user_documents_dir()
 SAVED_CHATS_DIR = os.path.join(DOCUMENTS_DIR, intelliterm.__name__, "chats")
 LOGS_DIR = os.path.join(DOCUMENTS_DIR, intelliterm.__name__, "logs")
+# (on disk: the default temporary directory is often in memory, ie: tmpfs)
+SPILL_DIR = os.path.join(USER_DATA_DIR, "spill")
+INDEX_DIR = os.path.join(USER_DATA_DIR, "index")
+DAEMON_SOCKET_PATH = os.path.join(USER_DATA_DIR, "daemon.sock")
@@ -0,0 +1,233 @@
+"""Storage of chat context: request messages, maintained as turns are added, and
+spill-to-disk of large turns, so long sessions stay bounded in memory.
+
+Contents of old, large turns (ie: file inputs) are moved out of memory to a
+segment file (temporary, on disk under SPILL_DIR, removed on exit) and only read
+back, through a memory map, while building a request that includes them.
+"""
+
+import mmap
+import os
+import tempfile
+import threading
+from typing import TYPE_CHECKING, BinaryIO, Optional
+
+from intelliterm.constants import SPILL_DIR
+
+if TYPE_CHECKING:
+    from intelliterm.prompt import Message, Prompt
+
+# Most recent turns are kept in memory, whatever their size
+KEEP_RECENT = 2
+# Older turns are spilled if their content is at least this many characters
+SPILL_MIN_CHARS = 16 * 1024
+
+
+class Segment:
+    """Append-only file of texts, read through a memory map.
+
+    Args:
+        directory (Optional[str]): Directory of the file (created if missing).
+            Defaults to None (default temporary directory).
+
+    Methods:
+        write(text: str) -> tuple[int, int]: Append text, returns its location.
+        read(offset: int, length: int) -> str: Read text at location.
+    """
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        self._directory = directory
+        self._file: Optional[BinaryIO] = None  # (created on first write)
+        self._size = 0
+        self._map: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> tuple[int, int]:
+        """Append text.
+
+        Args:
+            text (str)
+
+        Returns:
+            tuple[int, int]: Offset and length (in bytes) of text.
+        """
+        data = text.encode(errors="surrogatepass")
+
+        with self._lock:
+            if self._file is None:
+                if self._directory:
+                    os.makedirs(self._directory, exist_ok=True)
+                # (unlinked right away, so it's removed even if we crash)
+                self._file = tempfile.TemporaryFile(dir=self._directory)
+            self._file.write(data)
+            self._file.flush()
+
+            offset = self._size
+            self._size += len(data)
+        return offset, len(data)
+
+    def read(self, offset: int, length: int) -> str:
+        """Read text (written at offset).
+
+        Args:
+            offset (int)
+            length (int): Length (in bytes).
+
+        Returns:
+            str
+        """
+        if length == 0:
+            return ""
+
+        with self._lock:
+            assert self._file is not None
+
+            if self._map is None or len(self._map) < offset + length:
+                # (segment grew since it was mapped)
+                if self._map is not None:
+                    self._map.close()
+                self._map = mmap.mmap(
+                    self._file.fileno(), self._size, access=mmap.ACCESS_READ
+                )
+            data = self._map[offset : offset + length]
+        return data.decode(errors="surrogatepass")
+
+
+class ContextStore:
+    """Request messages of a context (in the format of each backend), updated as
+    turns are added, so building a request doesn't convert every turn again.
+
+    Keeps recent and small turns in memory, and spills contents of older, large
+    turns to a segment (their messages are built when a request is).
+
+    Attributes:
+        segment (Segment): Spilled contents (in SPILL_DIR).
+        keep_recent (int): Most recent turns kept in memory. Defaults to
+            KEEP_RECENT.
+        spill_min_chars (int): Min content size (in characters) of spilled turns.
+            Defaults to SPILL_MIN_CHARS.
+        attachment (Optional[str]): Added to the last turn of requests, without
+            being stored in context (ie: chunks of indexed files). Defaults to
+            None.
+
+    Methods:
+        of(context: list[Prompt]) -> ContextStore:
+            Store of a context (ie: built for a single request).
+        sync(context: list[Prompt]) -> None: Add messages of new turns.
+        trim(context: list[Prompt]) -> None: Spill turns that aged.
+        messages() -> list[Message]: Messages of all turns (OpenAI format).
+        system_and_turns() -> tuple[str, list[Message]]:
+            System prompt and messages of other turns (Anthropic format).
+    """
+
+    def __init__(
+        self,
+        keep_recent: int = KEEP_RECENT,
+        spill_min_chars: int = SPILL_MIN_CHARS,
+    ) -> None:
+        self.segment = Segment(SPILL_DIR)
+        self.keep_recent = keep_recent
+        self.spill_min_chars = spill_min_chars
+        self._checked = 0  # (turns checked already, at the start of context)
+        self.attachment: Optional[str] = None
+
+        # (messages are shared between formats)
+        self._messages: list["Message"] = []
+        self._turns: list["Message"] = []
+        self._turn_indices: list[Optional[int]] = []  # (of messages, in turns)
+        self._system: list[str] = []
+        self._system_prompt = ""
+        # (prompt, index in messages and in turns, of spilled turns)
+        self._spilled: list[tuple["Prompt", int, Optional[int]]] = []
+
+    @classmethod
+    def of(cls, context: list["Prompt"]) -> "ContextStore":
+        store = cls()
+        store.sync(context)
+        return store
+
+    def sync(self, context: list["Prompt"]) -> None:
+        """Add messages of turns added to context since last call (turns must not
+        change once added).
+
+        Args:
+            context (list[Prompt])
+        """
+        for i, prompt in enumerate(context[len(self._messages) :], len(self._messages)):
+            if prompt.is_spilled and prompt.role != "system":
+                # (ie: turns of another branch, read back for requests)
+                message: "Message" = {"role": prompt.role, "content": ""}
+                self._spilled.append((prompt, i, len(self._turns)))
+            else:
+                message = prompt.get_message()
+            self._messages.append(message)
+
+            if prompt.role == "system":
+                self._turn_indices.append(None)
+                self._system.append(message["content"])
+                self._system_prompt = " ".join(self._system)
+            else:
+                self._turn_indices.append(len(self._turns))
+                self._turns.append(message)
+
+    def trim(self, context: list["Prompt"]) -> None:
+        """Spill contents of large turns that are not among the most recent ones
+        (only checks turns that aged since last call).
+
+        Args:
+            context (list[Prompt])
+        """
+        end = max(len(context) - self.keep_recent, 0)
+
+        for i, prompt in enumerate(context[self._checked : end], self._checked):
+            if prompt.is_spilled or len(prompt.content) < self.spill_min_chars:
+                continue
+
+            prompt.spill(self.segment)
+            if i < len(self._messages) and prompt.role != "system":
+                # (drop content from memory, it's read back for requests)
+                self._messages[i] = {"role": prompt.role, "content": ""}
+                self._turns[self._turn_indices[i] or 0] = self._messages[i]
+                self._spilled.append((prompt, i, self._turn_indices[i]))
+        self._checked = max(self._checked, end)
+
+    def messages(self) -> list["Message"]:
+        """Messages of all turns (OpenAI format).
+
+        Returns:
+            list[Message]: Not to be modified (shared by requests).
+        """
+        if not self._spilled and self.attachment is None:
+            return self._messages
+
+        messages = self._messages.copy()
+        for prompt, i, _ in self._spilled:
+            messages[i] = prompt.get_message()
+        self._attach(messages)
+        return messages
+
+    def system_and_turns(self) -> tuple[str, list["Message"]]:
+        """System prompt and messages of other turns (Anthropic format).
+
+        Returns:
+            tuple[str, list[Message]]: Messages are not to be modified.
+        """
+        if not self._spilled and self.attachment is None:
+            return self._system_prompt, self._turns
+
+        turns = self._turns.copy()
+        for prompt, _, j in self._spilled:
+            turns[j or 0] = prompt.get_message()
+        self._attach(turns)
+        return self._system_prompt, turns
+
+    def _attach(self, messages: list["Message"]) -> None:
+        """Add attachment to the last message (a copy, stored one is unchanged)."""
+        if self.attachment is None or not messages:
+            return
+
+        last = messages[-1]
+        messages[-1] = {
+            "role": last["role"],
+            "content": f"{last['content']}\n\n{self.attachment}",
+        }
@@ -0,0 +1,332 @@
+"""Warm daemon serving oneshot prompts over a Unix domain socket.
+
+`intelliterm --daemon` keeps imports, tokenizers, configurations and backend
+connections warm; `ai` then forwards oneshot prompts to it (see `forward`) instead
+of paying for a cold start on every call.
+
+The client's stdin is passed to the daemon (as a file descriptor), which reads it
+as it would in-process, in chunks. Invocations are served one at a time: if the
+daemon is busy, the client completes its prompt in-process instead of waiting.
+
+Only the standard library is imported at module level (the client side must stay
+cheap to import).
+"""
+
+import io
+import json
+import os
+import shutil
+import socket
+import socketserver
+import sys
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, TextIO
+
+from intelliterm.constants import DAEMON_SOCKET_PATH
+from intelliterm.tracing import TRACE_ENV
+
+# Set to skip the daemon (ie: always complete prompts in-process).
+NO_DAEMON_ENV = "INTELLITERM_NO_DAEMON"
+
+# Sent by the daemon once it accepted an invocation (within ACCEPT_TIMEOUT).
+ACCEPTED = b"\1"
+ACCEPT_TIMEOUT = 0.2  # (seconds)
+
+# Marks the end of a response; followed by the exit code.
+END_OF_RESPONSE = b"\0"
+
+# Arguments that only make sense in-process.
+LOCAL_ARGS = {
+    "-h",
+    "--help",
+    "-v",
+    "-V",
+    "--version",
+    "--daemon",
+    "--trace",
+    "--profile",
+}
+ONESHOT_ARGS = {"-m", "--mini", "--oneshot"}
+
+# Environment of the client applied while serving its request (instead of the
+# daemon's, from when it was started). The socket is only accessible to its user.
+FORWARDED_ENV = ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "EDITOR")
+
+
+def should_forward(args: list[str]) -> bool:
+    """Check if invocation should be forwarded to a running daemon.
+
+    Only oneshot invocations (`-m` or piped stdin) are forwarded, interactive
+    chats always run in-process.
+
+    Args:
+        args (list[str]): CLI parameters.
+
+    Returns:
+        bool
+    """
+    if os.environ.get(NO_DAEMON_ENV) or not os.path.exists(DAEMON_SOCKET_PATH):
+        return False
+    if os.environ.get(TRACE_ENV):
+        return False  # (trace this process)
+    if LOCAL_ARGS.intersection(args):
+        return False
+    return not sys.stdin.isatty() or bool(ONESHOT_ARGS.intersection(args))
+
+
+def forward(args: list[str]) -> Optional[int]:
+    """Forward invocation to a running daemon and stream its response to stdout.
+
+    Args:
+        args (list[str]): CLI parameters.
+
+    Returns:
+        Optional[int]: Exit code, or None if no daemon is listening (or it's busy
+            with another invocation).
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        client.connect(DAEMON_SOCKET_PATH)
+        client.settimeout(ACCEPT_TIMEOUT)
+        accepted = client.recv(len(ACCEPTED)) == ACCEPTED
+        client.settimeout(None)
+    except OSError:  # (including timeouts)
+        accepted = False
+
+    if not accepted:
+        client.close()
+        return None  # stale socket or busy daemon, complete in-process
+
+    size = shutil.get_terminal_size()
+    # (stdin is passed as is, not read here)
+    stdin_fds = [] if sys.stdin.isatty() else [sys.stdin.fileno()]
+    request = {
+        "args": args,
+        "stdin": bool(stdin_fds),
+        "encoding": sys.stdin.encoding,
+        "cwd": os.getcwd(),
+        "width": size.columns,
+        "height": size.lines,
+        "color": sys.stdout.isatty(),
+        "truecolor": os.environ.get("COLORTERM") in ("truecolor", "24bit"),
+        "env": {name: os.environ.get(name) for name in FORWARDED_ENV},
+    }
+
+    with client:
+        header = json.dumps(request).encode() + b"\n"
+        sent = socket.send_fds(client, [header], stdin_fds)
+        if sent < len(header):
+            client.sendall(header[sent:])
+        client.shutdown(socket.SHUT_WR)
+
+        output = sys.stdout.buffer
+        exit_code = b""
+        ended = False
+
+        while chunk := client.recv(io.DEFAULT_BUFFER_SIZE):
+            if ended:
+                exit_code += chunk
+                continue
+            if END_OF_RESPONSE in chunk:
+                chunk, exit_code = chunk.split(END_OF_RESPONSE, 1)
+                ended = True
+            output.write(chunk)
+            output.flush()
+
+    return int(exit_code) if exit_code.strip() else 1
+
+
+@contextmanager
+def working_dir(path: str) -> Iterator[None]:
+    """Temporarily change working directory (ie: to the client's)."""
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+
+
+@contextmanager
+def environment(env: dict[str, Optional[str]]) -> Iterator[None]:
+    """Temporarily set (or unset, if None) environment variables (ie: the
+    client's)."""
+    previous = {name: os.environ.get(name) for name in env}
+
+    def apply(values: dict[str, Optional[str]]) -> None:
+        for name, value in values.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    apply(env)
+    try:
+        yield
+    finally:
+        apply(previous)
+
+
+def serve_request(request: dict[str, Any], stdin: Optional[TextIO]) -> None:
+    """Complete a forwarded oneshot invocation.
+
+    Args:
+        request (dict[str, Any]): Forwarded request (see `forward`).
+        stdin (Optional[TextIO]): Client's stdin (None if it's a terminal).
+    """
+    from intelliterm.chat import Chat
+    from intelliterm.config import config
+    from intelliterm.console import console
+    from intelliterm.main import complete_args, complete_stdin, parse_args, use_config
+
+    args = parse_args(request["args"])
+
+    if not use_config(args):
+        raise SystemExit(2)
+
+    try:
+        chat = Chat(oneshot=True, autocopy=args.autocopy)
+
+        if stdin is None:
+            if not complete_args(chat, args):
+                console.error("Empty input")
+        else:
+            complete_stdin(chat, args, stdin)
+    finally:
+        config.select(None)  # (configuration is per invocation)
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """Handles a single forwarded invocation."""
+
+    def receive(self) -> tuple[Optional[dict[str, Any]], list[int]]:
+        """Receive request (header line), and the client's stdin (if passed).
+
+        Returns:
+            tuple[Optional[dict[str, Any]], list[int]]: Request (None if client
+                gave up waiting, see `forward`), file descriptors passed.
+        """
+        try:
+            self.wfile.write(ACCEPTED)
+            data, fds, _, _ = socket.recv_fds(self.request, io.DEFAULT_BUFFER_SIZE, 1)
+        except OSError:
+            return None, []
+
+        while data and not data.endswith(b"\n"):
+            chunk = self.request.recv(io.DEFAULT_BUFFER_SIZE)
+            if not chunk:
+                break
+            data += chunk
+        return (json.loads(data) if data.endswith(b"\n") else None), fds
+
+    def handle(self) -> None:
+        from intelliterm.console import console
+        from intelliterm.utils import logger
+
+        request, fds = self.receive()
+
+        if request is None:
+            for fd in fds:
+                os.close(fd)
+            return
+
+        stdin = (
+            open(fds[0], encoding=request["encoding"], errors="replace")
+            if fds
+            else None
+        )
+        output = io.TextIOWrapper(
+            self.wfile,  # type: ignore
+            encoding="utf-8",
+            write_through=True,
+        )
+        exit_code = 0
+
+        try:
+            with console.redirect(
+                output,
+                width=request["width"],
+                height=request["height"],
+                color=request["color"],
+                truecolor=request["truecolor"],
+            ), working_dir(request["cwd"]), environment(request["env"]):
+                try:
+                    serve_request(request, stdin)
+                except SystemExit as e:
+                    exit_code = e.code if isinstance(e.code, int) else 1
+                except (BrokenPipeError, ConnectionResetError):
+                    raise
+                except Exception as e:
+                    logger.exception(e)
+                    console.print(e)
+                    exit_code = 1
+
+            output.write(END_OF_RESPONSE.decode() + str(exit_code))
+            output.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            logger.info("Daemon client disconnected")
+        finally:
+            if stdin:
+                stdin.close()
+
+
+class Daemon(socketserver.UnixStreamServer):
+    """Unix socket server completing forwarded invocations.
+
+    Requests are served one at a time, on a single thread: chats and the console
+    are module-level singletons, and backend SDKs pool their connections per
+    thread. Clients connecting while a request is served don't wait for it (see
+    `ACCEPT_TIMEOUT`).
+    """
+
+
+def is_running() -> bool:
+    """Check if a daemon is listening on `DAEMON_SOCKET_PATH`."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(DAEMON_SOCKET_PATH)
+            return True
+        except OSError:
+            return False
+
+
+def warm_up() -> None:
+    """Import and initialize everything a oneshot completion needs."""
+    from intelliterm.client import Backend, Client
+    from intelliterm.prompt import Prompt
+
+    Client(Backend.ANTHROPIC)
+
+    try:
+        Prompt(content="").token_count()  # load tokenizer
+    except Exception:
+        pass  # (ie: offline, tokenizer not cached yet)
+
+
+def serve() -> None:
+    """Run daemon (until interrupted)."""
+    from intelliterm.console import console
+    from intelliterm.utils import logger
+
+    if os.path.exists(DAEMON_SOCKET_PATH):
+        if is_running():
+            console.error(f"Daemon already running ({DAEMON_SOCKET_PATH})")
+            return
+        os.remove(DAEMON_SOCKET_PATH)  # stale
+
+    warm_up()
+    os.makedirs(os.path.dirname(DAEMON_SOCKET_PATH), exist_ok=True)
+
+    with Daemon(DAEMON_SOCKET_PATH, DaemonRequestHandler) as server:
+        os.chmod(DAEMON_SOCKET_PATH, 0o600)
+        console.info(f"Daemon listening on {DAEMON_SOCKET_PATH}")
+        logger.info(f"Daemon listening on {DAEMON_SOCKET_PATH}")
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(DAEMON_SOCKET_PATH)
+            logger.info("Daemon stopped")
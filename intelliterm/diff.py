@@ -0,0 +1,175 @@
+import fnmatch
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
+
+# Hunks longer than this are truncated
+MAX_HUNK_LINES = 200
+
+# Lockfiles and generated files (their diffs are noise for commit messages)
+IGNORED_FILES = [
+    "package-lock.json",
+    "npm-shrinkwrap.json",
+    "yarn.lock",
+    "pnpm-lock.yaml",
+    "poetry.lock",
+    "Pipfile.lock",
+    "uv.lock",
+    "Cargo.lock",
+    "Gemfile.lock",
+    "composer.lock",
+    "go.sum",
+    "*.min.js",
+    "*.min.css",
+    "*.map",
+    "*.snap",
+    "*_pb2.py",
+    "*_pb2.pyi",
+    "*.pb.go",
+    "*.generated.*",
+]
+IGNORED_DIRS = {"node_modules", "vendor", "dist", "build", "__pycache__"}
+
+# Header lines kept (others, ie: `index 1a2b..3c4d`, are noise)
+HEADER_PREFIXES = (
+    "diff --git",
+    "new file mode",
+    "deleted file mode",
+    "rename from",
+    "rename to",
+    "Binary files",
+)
+
+DIFF_REGEX = re.compile(r"^diff --git a/(.*) b/(.*)$")
+
+
+@dataclass
+class FileDiff:
+    """Changes to a single file in a git diff.
+
+    Attributes:
+        path (str): Path to file (after change).
+        header (list[str]): Header lines (ie: `diff --git ...`, `+++ b/...`).
+        hunks (list[list[str]]): Hunks (lines, starting with `@@ ...`).
+    """
+
+    path: str
+    header: list[str] = field(default_factory=list)
+    hunks: list[list[str]] = field(default_factory=list)
+
+    @property
+    def is_binary(self) -> bool:
+        binary_prefixes = ("Binary files", "GIT binary patch")
+        return any(line.startswith(binary_prefixes) for line in self.header)
+
+    def is_ignored(self) -> bool:
+        """Check if file is a lockfile, generated or binary."""
+        parts = self.path.split("/")
+
+        if self.is_binary or IGNORED_DIRS.intersection(parts[:-1]):
+            return True
+        return any(fnmatch.fnmatch(parts[-1], pattern) for pattern in IGNORED_FILES)
+
+    def text(self, max_hunk_lines: int = MAX_HUNK_LINES) -> str:
+        """Compact diff text, with huge hunks truncated.
+
+        Args:
+            max_hunk_lines (int): Max lines kept per hunk.
+
+        Returns:
+            str: Diff text.
+        """
+        lines = [line for line in self.header if line.startswith(HEADER_PREFIXES)]
+
+        for hunk in self.hunks:
+            lines.extend(hunk[: max_hunk_lines + 1])
+            if len(hunk) > max_hunk_lines + 1:
+                lines.append(f"... ({len(hunk) - max_hunk_lines - 1} more lines)\n")
+        return "".join(lines)
+
+
+def parse_diff(lines: Iterable[str]) -> Iterator[FileDiff]:
+    """Parse a git diff into per-file diffs.
+
+    Lines are consumed lazily (ie: one file's diff is held in memory at a time).
+
+    Args:
+        lines (Iterable[str]): Diff lines (including line endings).
+
+    Yields:
+        FileDiff: Changes to a file.
+    """
+    file_diff: Optional[FileDiff] = None
+
+    for line in lines:
+        if not line.endswith("\n"):
+            line += "\n"
+        match = DIFF_REGEX.match(line.rstrip("\n"))
+
+        if match:
+            if file_diff:
+                yield file_diff
+            file_diff = FileDiff(path=match.group(2), header=[line])
+        elif file_diff is None:
+            continue  # (ie: leading commit info of `git show`)
+        elif line.startswith("@@"):
+            file_diff.hunks.append([line])
+        elif file_diff.hunks:
+            file_diff.hunks[-1].append(line)
+        else:
+            file_diff.header.append(line)
+            if line.startswith("+++ b/"):
+                file_diff.path = line[6:].rstrip("\n")
+
+    if file_diff:
+        yield file_diff
+
+
+def chunk_files(
+    texts: Iterable[str],
+    max_tokens: int,
+    model: str,
+) -> Iterator[str]:
+    """Group per-file diffs into chunks of at most `max_tokens` tokens, without
+    splitting files (unless a single file's diff is too large).
+
+    Args:
+        texts (Iterable[str]): Per-file diff texts.
+        max_tokens (int): Max tokens per chunk.
+        model (str): Model (tokenizer) to count tokens for.
+
+    Yields:
+        str: Chunks.
+    """
+    from intelliterm.chunking import chunk_text
+    from intelliterm.prompt import count_tokens
+
+    chunk: list[str] = []
+    chunk_tokens = 0
+
+    for text in texts:
+        tokens = count_tokens(text, model)
+
+        if chunk and chunk_tokens + tokens > max_tokens:
+            yield "".join(chunk)
+            chunk, chunk_tokens = [], 0
+
+        if tokens > max_tokens:
+            yield from chunk_text(text.splitlines(keepends=True), max_tokens, model)
+        else:
+            chunk.append(text)
+            chunk_tokens += tokens
+
+    if chunk:
+        yield "".join(chunk)
+
+
+def summarize_ignored(paths: list[str], max_paths: int = 20) -> str:
+    """List files left out of a diff (ie: `Also changed (not shown): ...`)."""
+    if not paths:
+        return ""
+
+    names = ", ".join(os.path.basename(path) for path in paths[:max_paths])
+    more = f" and {len(paths) - max_paths} more" if len(paths) > max_paths else ""
+    return f"Also changed (lockfiles, generated or binary, not shown): {names}{more}\n"
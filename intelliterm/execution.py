@@ -0,0 +1,268 @@
+import asyncio
+import os
+import shutil
+import signal
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from intelliterm.console import console
+from intelliterm.utils import logger
+
+try:
+    import resource
+except ImportError:  # (ie: Windows)
+    resource = None  # type: ignore
+
+SHELLS = {
+    "bash": "bash",
+    "zsh": "zsh",
+    "sh": "sh",
+    "shell": os.environ.get("SHELL", "sh"),
+    "console": os.environ.get("SHELL", "sh"),
+}
+PYTHON_LANGUAGES = ("python", "python3", "py")
+NODE_LANGUAGES = ("javascript", "js", "typescript", "ts")
+# Output captured per run (the tail is kept)
+MAX_OUTPUT_CHARS = 8000
+# Seconds between SIGTERM and SIGKILL
+KILL_GRACE = 2.0
+READ_SIZE = 4096
+
+
+@dataclass
+class RunResult:
+    """Result of running a code block.
+
+    Attributes:
+        language (str)
+        output (str): Combined stdout and stderr (tail, if too long).
+        exit_code (Optional[int]): None if the process was killed.
+        took (float): Wall-clock time (in seconds).
+        timed_out (bool): Killed after exceeding the time limit.
+        interrupted (bool): Cancelled by the user (Ctrl-C).
+        truncated (bool): Output was longer than captured.
+    """
+
+    language: str
+    output: str
+    exit_code: Optional[int]
+    took: float
+    timed_out: bool = False
+    interrupted: bool = False
+    truncated: bool = False
+
+    def status(self) -> str:
+        if self.timed_out:
+            return f"timed out after {self.took:.1f}s"
+        if self.interrupted:
+            return "interrupted"
+        return f"exit code {self.exit_code}, took {self.took:.1f}s"
+
+    def as_context(self) -> str:
+        """Describe result (for the model to see it)."""
+        truncated = " (truncated to its end)" if self.truncated else ""
+        return (
+            f"Output of running the {self.language} code ({self.status()})"
+            + f"{truncated}:\n```\n{self.output.rstrip()}\n```"
+        )
+
+
+def python() -> str:
+    """Python interpreter code is run with: the user's `python3` (with their
+    packages), not the one running intelliterm (ie: in a pipx environment)."""
+    return shutil.which("python3") or "python3"
+
+
+def command(language: str, code: str, memory_mb: int) -> Optional[list[str]]:
+    """Command running code (None if language is not supported)."""
+    language = language.lower()
+
+    if language in SHELLS:
+        return [SHELLS[language], "-c", code]
+    if language in PYTHON_LANGUAGES:
+        return [python(), "-c", code]
+    if language in NODE_LANGUAGES:
+        # (V8 reserves address space upfront, limit its heap instead)
+        return ["node", f"--max-old-space-size={memory_mb}", "-e", code]
+    return None
+
+
+def limit_memory(memory_mb: int, language: str) -> Optional[Callable[[], None]]:
+    """Function limiting memory (address space) of the child process."""
+    if resource is None or language.lower() in NODE_LANGUAGES:
+        return None
+
+    def preexec() -> None:
+        limit = memory_mb * 2**20
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    return preexec
+
+
+def kill(pid: int, sig: signal.Signals = signal.SIGKILL) -> bool:
+    """Signal process group (ie: process and its children).
+
+    Returns:
+        bool: False if there is no such process (anymore).
+    """
+    try:
+        os.killpg(pid, sig)
+        return True
+    except ProcessLookupError:
+        return False
+
+
+async def terminate(pid: int, exited: "asyncio.Future[int]") -> None:
+    """Terminate process group, killing it if it doesn't exit in time."""
+    if kill(pid, signal.SIGTERM):
+        try:
+            await asyncio.wait_for(asyncio.shield(exited), KILL_GRACE)
+        except asyncio.TimeoutError:
+            kill(pid)
+
+
+async def supervise(
+    language: str,
+    pid: int,
+    stdout: asyncio.StreamReader,
+    stderr: asyncio.StreamReader,
+    exited: "asyncio.Future[int]",
+    timeout: float,
+) -> RunResult:
+    """Stream output of a running process (in its own process group) live,
+    enforcing the time limit and handling cancellation (Ctrl-C).
+
+    Args:
+        language (str)
+        pid (int): Process (group) ID.
+        stdout (asyncio.StreamReader)
+        stderr (asyncio.StreamReader)
+        exited (asyncio.Future[int]): Resolves to the exit code.
+        timeout (float): Wall-clock limit (in seconds).
+
+    Returns:
+        RunResult
+    """
+    start = time.time()
+    output: list[str] = []
+    output_size = 0
+    truncated = False
+
+    async def pipe(stream: asyncio.StreamReader, style: str) -> None:
+        nonlocal output_size, truncated
+
+        while data := await stream.read(READ_SIZE):
+            text = data.decode(errors="replace")
+            console.out(text, style=style, end="", highlight=False)
+            output.append(text)
+            output_size += len(text)
+
+            while output_size - len(output[0]) >= MAX_OUTPUT_CHARS:
+                output_size -= len(output.pop(0))
+                truncated = True
+
+    result = RunResult(language=language, output="", exit_code=None, took=0)
+    gathered = asyncio.gather(
+        pipe(stdout, "none"),
+        pipe(stderr, "danger"),
+        asyncio.shield(exited),
+    )
+    # (retrieve exception of cancelled pipes, so it's not reported as unhandled)
+    gathered.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    try:
+        await asyncio.wait_for(gathered, timeout)
+        result.exit_code = exited.result()
+    except asyncio.TimeoutError:
+        result.timed_out = True
+        await terminate(pid, exited)
+    except asyncio.CancelledError:
+        # Ctrl-C
+        result.interrupted = True
+        await terminate(pid, exited)
+
+    await exited  # (reap)
+    result.took = time.time() - start
+    result.output = "".join(output)[-MAX_OUTPUT_CHARS:]
+    result.truncated = truncated or output_size > MAX_OUTPUT_CHARS
+    return result
+
+
+async def run_async(
+    language: str,
+    args: list[str],
+    timeout: float,
+    memory_mb: int,
+) -> RunResult:
+    """Run command, streaming its output live.
+
+    Args:
+        language (str)
+        args (list[str]): Command.
+        timeout (float): Wall-clock limit (in seconds).
+        memory_mb (int): Memory limit (in MiB).
+
+    Returns:
+        RunResult
+    """
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,  # (own process group, killed as a whole)
+        preexec_fn=limit_memory(memory_mb, language),
+    )
+    assert process.stdout and process.stderr
+
+    return await supervise(
+        language,
+        process.pid,
+        process.stdout,
+        process.stderr,
+        asyncio.ensure_future(process.wait()),
+        timeout,
+    )
+
+
+def run(
+    language: str,
+    code: str,
+    timeout: float,
+    memory_mb: int,
+    warm: bool = False,
+) -> Optional[RunResult]:
+    """Run code in a subprocess (time and memory limited, cancellable with Ctrl-C).
+
+    Args:
+        language (str)
+        code (str)
+        timeout (float): Wall-clock limit (in seconds).
+        memory_mb (int): Memory limit (in MiB).
+        warm (bool): Run Python code in the warm interpreter pool (if running).
+            Defaults to False.
+
+    Returns:
+        Optional[RunResult]: None if language is not supported (or its runtime
+            is not installed).
+    """
+    args = command(language, code, memory_mb)
+
+    if args is None or shutil.which(args[0]) is None:
+        return None
+
+    if warm and language.lower() in PYTHON_LANGUAGES:
+        from intelliterm.warm_pool import PreloadError, pool
+
+        if pool.is_started():
+            try:
+                return asyncio.run(pool.run_async(code, timeout, memory_mb))
+            except PreloadError as e:
+                console.warning(f"Failed to preload modules ({e}), running cold")
+                pool.stop()
+            except (OSError, ConnectionError) as e:
+                logger.warning(f"Warm interpreter failed ({e}), running cold")
+                pool.stop()
+
+    return asyncio.run(run_async(language, args, timeout, memory_mb))
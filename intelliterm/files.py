@@ -0,0 +1,629 @@
+import codecs
+import glob
+import itertools
+import mmap
+import os
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterable, Iterator, NamedTuple, Optional, Union
+
+# Bytes sniffed to detect binary files and encodings
+SNIFF_SIZE = 8192
+# Bytes decoded (or scanned for line breaks) at once
+BLOCK_SIZE = 1 << 20
+# Rough bytes per token (for estimates before reading files)
+BYTES_PER_TOKEN = 4
+MAX_WORKERS = 8
+
+ALWAYS_IGNORED = {".git", ".hg", ".svn"}
+
+# (checked in order: the UTF-32 LE BOM starts with the UTF-16 LE BOM)
+BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+TEXT_BYTES = bytes({7, 8, 9, 10, 12, 13, 27} | set(range(0x20, 0x100)) - {0x7F})
+
+# `<path>:<start>-<end>`, `<path>:<start>-`, `<path>:<line>` or `<path>:-<N>` (tail)
+RANGE_REGEX = re.compile(r"^(.+):(\d+-\d*|-?\d+)$")
+
+Buffer = Union[mmap.mmap, bytes]
+
+
+class LineRange(NamedTuple):
+    """Range of lines (1-based, inclusive).
+
+    A negative start selects the last `-start` lines (ie: `tail -n`).
+
+    Attributes:
+        start (int): First line (or number of last lines, if negative).
+        end (Optional[int]): Last line. Defaults to None (end of file).
+    """
+
+    start: int
+    end: Optional[int] = None
+
+    def __str__(self) -> str:
+        if self.start < 0:
+            return str(self.start)
+        if self.end == self.start:
+            return str(self.start)
+        return f"{self.start}-{self.end or ''}"
+
+
+@dataclass
+class FileInput:
+    """File read as (part of) a prompt.
+
+    Attributes:
+        path (str): Path to file (as displayed).
+        content (str): File content.
+        size (int): Size (in bytes).
+        tokens (int): Number of tokens in content.
+        line_range (Optional[LineRange]): Lines read (if not the whole file).
+    """
+
+    path: str
+    content: str
+    size: int
+    tokens: int
+    line_range: Optional[LineRange] = None
+
+    @property
+    def name(self) -> str:
+        """Path (with line range, if any)."""
+        return f"{self.path}:{self.line_range}" if self.line_range else self.path
+
+    @property
+    def lines(self) -> int:
+        content = self.content
+        return content.count("\n") + int(bool(content) and content[-1] != "\n")
+
+    def label(self) -> str:
+        """File content, labeled with its path (for prompts)."""
+        language = os.path.splitext(self.path)[1][1:].lower()
+        return f"{self.name}:\n```{language}\n{self.content.rstrip()}\n```"
+
+
+def parse_spec(spec: str) -> tuple[str, Optional[LineRange]]:
+    """Parse a file input spec (ie: `big.log:1000-2000`, `big.log:-100`).
+
+    Args:
+        spec (str): Path, optionally followed by a line range.
+
+    Returns:
+        tuple[str, Optional[LineRange]]: Path, line range (None for whole file).
+    """
+    match = RANGE_REGEX.match(spec)
+
+    if not match or os.path.exists(os.path.expanduser(spec)):
+        return spec, None
+
+    path, lines = match.groups()
+
+    if lines.startswith("-"):
+        return path, LineRange(int(lines))
+    if "-" in lines:
+        start, end = lines.split("-")
+        return path, LineRange(max(int(start), 1), int(end) if end else None)
+    return path, LineRange(max(int(lines), 1), max(int(lines), 1))
+
+
+class GitIgnore:
+    """Matches paths against the patterns of a `.gitignore` file.
+
+    Attributes:
+        base (str): Directory containing the `.gitignore` file (patterns are
+            relative to it).
+        rules (list[tuple[re.Pattern, bool, bool]]): (pattern, negated, dir only).
+    """
+
+    def __init__(self, base: str, lines: list[str]) -> None:
+        self.base = base
+        self.rules: list[tuple[re.Pattern, bool, bool]] = []
+
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+
+            if not line or line.startswith("#"):
+                continue
+
+            negated = line.startswith("!")
+            line = line[1:] if negated else line
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            line = line.lstrip("/")
+
+            regex = GitIgnore.translate(line)
+            if not anchored:
+                regex = "(?:.*/)?" + regex  # (matches at any depth)
+            self.rules.append((re.compile(regex + "$"), negated, dir_only))
+
+    @staticmethod
+    def translate(pattern: str) -> str:
+        """Translate gitignore glob pattern to regex."""
+        regex = ""
+        i = 0
+
+        while i < len(pattern):
+            if pattern.startswith("**/", i):
+                regex += "(?:.*/)?"
+                i += 3
+            elif pattern.startswith("**", i):
+                regex += ".*"
+                i += 2
+            elif pattern[i] == "*":
+                regex += "[^/]*"
+                i += 1
+            elif pattern[i] == "?":
+                regex += "[^/]"
+                i += 1
+            elif pattern[i] == "[" and "]" in pattern[i + 1 :]:
+                end = pattern.index("]", i + 1)
+                regex += "[" + pattern[i + 1 : end].replace("!", "^", 1) + "]"
+                i = end + 1
+            else:
+                regex += re.escape(pattern[i])
+                i += 1
+        return regex
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["GitIgnore"]:
+        """Load `.gitignore` in directory (if any)."""
+        path = os.path.join(directory, ".gitignore")
+
+        if not os.path.isfile(path):
+            return None
+
+        with open(path, "r", errors="replace") as file:
+            return cls(directory, file.readlines())
+
+    def match(self, path: str, is_dir: bool) -> Optional[bool]:
+        """Check if path is ignored.
+
+        Returns:
+            Optional[bool]: None if no pattern matches path.
+        """
+        relative = os.path.relpath(path, self.base).replace(os.sep, "/")
+        ignored: Optional[bool] = None
+
+        for regex, negated, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relative):
+                ignored = not negated  # (last matching pattern wins)
+        return ignored
+
+
+def is_ignored(path: str, is_dir: bool, ignores: list[GitIgnore]) -> bool:
+    """Check if path is ignored by any `.gitignore` (innermost wins)."""
+    if os.path.basename(path) in ALWAYS_IGNORED:
+        return True
+
+    for ignore in reversed(ignores):
+        ignored = ignore.match(path, is_dir)
+        if ignored is not None:
+            return ignored
+    return False
+
+
+def parent_ignores(directory: str) -> list[GitIgnore]:
+    """Load `.gitignore` files from directory's parents, up to the repository root."""
+    ignores: list[GitIgnore] = []
+    current = os.path.abspath(directory)
+
+    while True:
+        parent = os.path.dirname(current)
+        if os.path.isdir(os.path.join(current, ".git")) or parent == current:
+            break
+        current = parent
+        ignore = GitIgnore.load(current)
+        if ignore:
+            ignores.insert(0, ignore)
+    return ignores
+
+
+def walk(directory: str) -> list[str]:
+    """List files in directory (recursively), skipping `.gitignore`d paths."""
+    files: list[str] = []
+
+    def _walk(current: str, ignores: list[GitIgnore]) -> None:
+        ignore = GitIgnore.load(current)
+        ignores = ignores + [ignore] if ignore else ignores
+
+        try:
+            entries = sorted(os.scandir(current), key=lambda entry: entry.name)
+        except OSError:
+            return
+
+        for entry in entries:
+            is_dir = entry.is_dir(follow_symlinks=False)
+
+            if is_ignored(entry.path, is_dir, ignores):
+                continue
+            if is_dir:
+                _walk(entry.path, ignores)
+            elif entry.is_file():
+                files.append(entry.path)
+
+    _walk(directory, parent_ignores(directory))
+    return files
+
+
+def is_glob(pattern: str) -> bool:
+    return glob.has_magic(pattern)
+
+
+def split_paths(options: list[str]) -> tuple[list[str], list[str]]:
+    """Split leading paths (or glob patterns) from the rest of the options (ie:
+    `!file src/ *.md explain this` -> `["src/", "*.md"], ["explain", "this"]`).
+
+    Args:
+        options (list[str])
+
+    Returns:
+        tuple[list[str], list[str]]: Paths, remaining options.
+    """
+    for i, option in enumerate(options):
+        path, _ = parse_spec(option)
+        if not (is_glob(path) or os.path.exists(os.path.expanduser(path))):
+            return options[:i], options[i:]
+    return options, []
+
+
+def glob_base(pattern: str) -> str:
+    """Directory a glob pattern matches paths in (its leading part without magic,
+    ie: `src` of `src/**/*.py`)."""
+    parts = pattern.split(os.sep)
+    base = list(itertools.takewhile(lambda part: not is_glob(part), parts[:-1]))
+    return os.sep.join(base) or (os.sep if pattern.startswith(os.sep) else "")
+
+
+def expand(patterns: list[str]) -> list[str]:
+    """Expand paths, directories and glob patterns into file paths.
+
+    Directories are walked concurrently. Like walked paths, paths matched by glob
+    patterns (below the directory they're matched in) are skipped if
+    `.gitignore`d.
+
+    Args:
+        patterns (list[str]): Paths, directories or glob patterns.
+
+    Returns:
+        list[str]: File paths (without duplicates, in order).
+    """
+    # (`.gitignore` files applying to paths in each directory)
+    directory_ignores: dict[str, list[GitIgnore]] = {}
+
+    def _ignores(directory: str) -> list[GitIgnore]:
+        if directory not in directory_ignores:
+            ignore = GitIgnore.load(directory)
+            directory_ignores[directory] = parent_ignores(directory) + (
+                [ignore] if ignore else []
+            )
+        return directory_ignores[directory]
+
+    def _ignored(path: str, base: str) -> bool:
+        """Check if path, or a parent of it below `base`, is ignored."""
+        path = os.path.abspath(path)
+
+        while path != base and os.path.dirname(path) != path:
+            directory = os.path.dirname(path)
+            if is_ignored(path, os.path.isdir(path), _ignores(directory)):
+                return True
+            path = directory
+        return False
+
+    def _expand(pattern: str) -> list[str]:
+        pattern = os.path.expanduser(pattern)
+        if is_glob(pattern):
+            base = os.path.abspath(glob_base(pattern))
+            paths = [
+                path
+                for path in sorted(glob.glob(pattern, recursive=True))
+                if not _ignored(path, base)
+            ]
+        else:
+            paths = [pattern]
+        files: list[str] = []
+
+        for path in paths:
+            if os.path.isdir(path):
+                files.extend(walk(path))
+            elif os.path.isfile(path):
+                files.append(path)
+        return files
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        expanded = executor.map(_expand, patterns)
+        return list(dict.fromkeys(path for paths in expanded for path in paths))
+
+
+def detect_encoding(sample: bytes) -> str:
+    """Detect encoding of (the start of) a file from its BOM, falling back to
+    UTF-8, then Windows-1252 and Latin-1 (which decodes anything).
+    """
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+
+    for encoding in ("utf-8", "cp1252"):
+        try:
+            sample.decode(encoding)
+            return encoding
+        except UnicodeDecodeError as e:
+            if encoding == "utf-8" and e.start >= len(sample) - 4:
+                # (a multi-byte character may be cut off at the end of the sample)
+                return encoding
+    return "latin-1"
+
+
+def is_ascii_compatible(encoding: str) -> bool:
+    """Check if line breaks can be found in encoded bytes (ie: `b"\\n"`)."""
+    return not encoding.startswith(("utf-16", "utf-32"))
+
+
+def is_binary(path: str) -> bool:
+    """Sniff file content to check if it's binary."""
+    with open(path, "rb") as file:
+        sample = file.read(SNIFF_SIZE)
+
+    if any(sample.startswith(bom) for bom, _ in BOMS):
+        return False  # (UTF-16/32 text contains null bytes)
+    if b"\0" in sample:
+        return True
+    # (mostly control characters)
+    return len(sample.translate(None, TEXT_BYTES)) > len(sample) * 0.3
+
+
+@contextmanager
+def mapped(path: str) -> Iterator[Buffer]:
+    """Memory-map file (read-only)."""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield b""  # (empty files can't be mapped)
+            return
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                buffer.madvise(mmap.MADV_SEQUENTIAL)
+            yield buffer
+
+
+def release(buffer: Buffer, start: int, end: int) -> None:
+    """Drop mapped pages in [start, end) from memory (they are re-read from the
+    file if needed), so scanning a file keeps resident memory bounded.
+    """
+    if isinstance(buffer, mmap.mmap) and hasattr(mmap, "MADV_DONTNEED"):
+        start -= start % mmap.PAGESIZE
+        if end > start:
+            buffer.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+
+def skip_lines(buffer: Buffer, lines: int, position: int = 0) -> int:
+    """Offset of the start of the line `lines` lines after position (or the end
+    of the buffer, if there are fewer lines).
+    """
+    size = len(buffer)
+
+    while lines > 0 and position < size:
+        block = buffer[position : position + BLOCK_SIZE]
+        count = block.count(b"\n")
+
+        if count < lines:
+            lines -= count
+            release(buffer, position, position + len(block))
+            position += len(block)
+        else:
+            offset = 0
+            for _ in range(lines):
+                offset = block.index(b"\n", offset) + 1
+            return position + offset
+    return position if lines == 0 else size
+
+
+def byte_span(buffer: Buffer, line_range: Optional[LineRange]) -> tuple[int, int]:
+    """Find byte offsets [start, end) of a line range (in an ASCII-compatible
+    encoding), without decoding the file.
+    """
+    size = len(buffer)
+
+    if line_range is None:
+        return 0, size
+
+    if line_range.start < 0:
+        # tail: search line breaks backwards from the end
+        position = size - 1 if buffer[size - 1 : size] == b"\n" else size
+        for _ in range(-line_range.start):
+            position = buffer.rfind(b"\n", 0, position)
+            if position < 0:
+                return 0, size
+        return position + 1, size
+
+    start = skip_lines(buffer, line_range.start - 1)
+    if line_range.end is None:
+        return start, size
+    return start, skip_lines(buffer, line_range.end - line_range.start + 1, start)
+
+
+def decode_lines(
+    buffer: Buffer,
+    encoding: str,
+    start: int = 0,
+    end: Optional[int] = None,
+) -> Iterator[str]:
+    """Decode buffer incrementally (block by block), yielding lines."""
+    end = len(buffer) if end is None else end
+    if start > 0 and encoding == "utf-8-sig":
+        encoding = "utf-8"  # (BOM is only at the start)
+
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    pending = ""
+    position = start
+
+    while position < end:
+        # (blocks are aligned to BLOCK_SIZE, so released pages are whole pages)
+        block_end = min(end, (position // BLOCK_SIZE + 1) * BLOCK_SIZE)
+        with memoryview(buffer)[position:block_end] as block:
+            pending += decoder.decode(block)
+        release(buffer, position, block_end)
+        position = block_end
+
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def iter_lines(path: str, line_range: Optional[LineRange] = None) -> Iterator[str]:
+    """Stream (decoded) lines of a memory-mapped file.
+
+    Memory stays bounded regardless of file size: only the requested lines are
+    decoded, one block at a time, and scanned pages are released.
+
+    Args:
+        path (str): Path to file.
+        line_range (Optional[LineRange]): Lines to read. Defaults to None (all).
+
+    Yields:
+        str: Lines (including line endings).
+    """
+    with mapped(path) as buffer:
+        encoding = detect_encoding(buffer[:SNIFF_SIZE])
+
+        if is_ascii_compatible(encoding):
+            start, end = byte_span(buffer, line_range)
+            yield from decode_lines(buffer, encoding, start, end)
+            return
+
+        # (line breaks can't be searched for in bytes, select decoded lines)
+        lines: Iterable[str] = decode_lines(buffer, encoding)
+        if line_range and line_range.start < 0:
+            lines = deque(lines, maxlen=-line_range.start)
+        elif line_range:
+            lines = itertools.islice(lines, line_range.start - 1, line_range.end)
+        yield from lines
+
+
+def read_text(path: str, line_range: Optional[LineRange] = None) -> str:
+    """Read (decoded) text of a memory-mapped file.
+
+    Only the requested lines are decoded, straight from the mapped pages (ie: no
+    intermediate copy of the file is made).
+
+    Args:
+        path (str): Path to file.
+        line_range (Optional[LineRange]): Lines to read. Defaults to None (all).
+
+    Returns:
+        str: Text.
+    """
+    with mapped(path) as buffer:
+        encoding = detect_encoding(buffer[:SNIFF_SIZE])
+
+        if not is_ascii_compatible(encoding):
+            return "".join(iter_lines(path, line_range))
+
+        start, end = byte_span(buffer, line_range)
+        if start > 0 and encoding == "utf-8-sig":
+            encoding = "utf-8"
+        with memoryview(buffer)[start:end] as view:
+            return str(view, encoding, "replace")
+
+
+def input_size(path: str, line_range: Optional[LineRange] = None) -> int:
+    """Size (in bytes) of the requested lines of a file."""
+    if line_range is None:
+        return os.path.getsize(path)
+
+    with mapped(path) as buffer:
+        if not is_ascii_compatible(detect_encoding(buffer[:SNIFF_SIZE])):
+            return len(buffer)
+        start, end = byte_span(buffer, line_range)
+        return end - start
+
+
+def read(
+    patterns: list[str],
+    token_budget: int,
+    model: Optional[str] = None,
+) -> tuple[list[FileInput], list[str]]:
+    """Read files (concurrently) matching paths, directories or glob patterns.
+
+    Binary files are skipped, as are files that would exceed the token budget.
+
+    Args:
+        patterns (list[str]): Paths (optionally with line ranges, ie:
+            `big.log:1000-2000`), directories or glob patterns.
+        token_budget (int): Max total tokens.
+        model (Optional[str]): Model (tokenizer) to count tokens for.
+
+    Returns:
+        tuple[list[FileInput], list[str]]: Files read, paths skipped.
+    """
+    from intelliterm.prompt import count_tokens
+
+    specs = [parse_spec(pattern) for pattern in patterns]
+    line_ranges = {os.path.expanduser(path): lines for path, lines in specs if lines}
+    paths = expand([path for path, _ in specs])
+    skipped: list[str] = []
+
+    # Select files (in order) by estimated size, so files that are over budget
+    # are never read.
+    selected: list[tuple[str, int]] = []
+    estimate = 0
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        binary = list(executor.map(is_binary, paths))
+
+    for path, is_binary_file in zip(paths, binary):
+        if is_binary_file:
+            skipped.append(path)  # (not counted against the budget)
+            continue
+
+        size = input_size(path, line_ranges.get(path))
+        if estimate + size // BYTES_PER_TOKEN > token_budget:
+            skipped.append(path)
+        else:
+            estimate += size // BYTES_PER_TOKEN
+            selected.append((path, size))
+
+    def _read(path_size: tuple[str, int]) -> FileInput:
+        path, size = path_size
+        content = read_text(path, line_ranges.get(path))
+        return FileInput(
+            path=os.path.relpath(path),
+            content=content,
+            size=size,
+            tokens=count_tokens(content, model),
+            line_range=line_ranges.get(path),
+        )
+
+    files: list[FileInput] = []
+    total_tokens = 0
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for (path, _), file_input in zip(selected, executor.map(_read, selected)):
+            if total_tokens + file_input.tokens > token_budget:
+                skipped.append(path)
+            else:
+                total_tokens += file_input.tokens
+                files.append(file_input)
+
+    return files, skipped
+
+
+def labeled(files: list[FileInput]) -> str:
+    """Combine files into a single prompt, each labeled with its path."""
+    return "\n\n".join(file_input.label() for file_input in files)
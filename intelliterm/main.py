@@ -1,13 +1,15 @@
 import argparse
+import glob
+import io
+import itertools
 import logging
 import os
 import sys
-from typing import NoReturn, Optional
+from typing import TYPE_CHECKING, NoReturn, Optional, TextIO
 
-from intelliterm import __version__
-from intelliterm.chat import Chat
-from intelliterm.console import console
-from intelliterm.prompt import SPECIAL_PROMPTS, Prompt
+from intelliterm import __version__, daemon
+from intelliterm.profiling import PHASES, PROFILERS, profiler
+from intelliterm.tracing import START_NS, now_us, tracer
 from intelliterm.utils import (
     intelliterm,
     is_git_diff,
@@ -16,6 +18,11 @@ from intelliterm.utils import (
     setup_logging,
 )
 
+# Heavy modules (SDKs, rendering) are imported lazily, so `ai` stays cheap to
+# start when forwarding to a running daemon.
+if TYPE_CHECKING:
+    from intelliterm.chat import Chat
+
 __author__ = "Yulian Kraynyak"
 __copyright__ = "Yulian Kraynyak"
 __license__ = "MIT"
@@ -25,27 +32,40 @@ _logger = logging.getLogger(__name__)
 
 class ArgParser(argparse.ArgumentParser):
     def error(self, message: str) -> NoReturn:
+        from intelliterm.console import console
+
         console.print(f"{intelliterm.__name__}: {message}\n")
 
-        if "file" in message:
+        if "--file" in message:
             self.print_file_usage()
         else:
             self.print_usage()
         self.exit(2)
 
     def print_file_usage(self) -> None:
+        from intelliterm.console import console
+
         console.print(
             f"usage: [green]{self.prog}",
             "[reset]-f/--file",
-            "[arg]<path>[reset]",
+            "[arg]<path|dir|glob>[reset]",
+            "[-f/--file ...]",
         )
 
     @staticmethod
-    def validate_file(path: str) -> str:
-        if not os.path.isfile(path):
-            raise argparse.ArgumentTypeError(f"[danger]{path} [reset]is not a file")
-        else:
-            return path
+    def validate_file(spec: str) -> str:
+        from intelliterm.files import parse_spec
+
+        path, _ = parse_spec(spec)
+
+        if glob.has_magic(path):
+            if not glob.glob(os.path.expanduser(path), recursive=True):
+                raise argparse.ArgumentTypeError(
+                    f"[danger]{path} [reset]does not match any file"
+                )
+        elif not os.path.exists(os.path.expanduser(path)):
+            raise argparse.ArgumentTypeError(f"[danger]{path} [reset]does not exist")
+        return spec
 
 
 def parse_args(args: list[str]) -> argparse.Namespace:
@@ -73,12 +93,14 @@ def parse_args(args: list[str]) -> argparse.Namespace:
         type=str,
         metavar="STR",
     )
-    parser.add_argument(  # TODO(unfinished)
+    parser.add_argument(
         "-f",
         "--file",
         dest="file",
-        help="input a file",
+        action="append",
+        help="input a file (or lines, ie: FILE:10-20), directory or glob (repeatable)",
         type=ArgParser.validate_file,
+        metavar="PATH",
     )
     parser.add_argument(
         "-m",
@@ -100,10 +122,144 @@ def parse_args(args: list[str]) -> argparse.Namespace:
         nargs="?",
         help="autocopy response to clipboard",
     )
+    parser.add_argument(
+        "--config",
+        dest="config",
+        metavar="NAME",
+        help="use configuration NAME for this session (case-insensitive)",
+    )
+    parser.add_argument(
+        "--daemon",
+        dest="daemon",
+        action="store_true",
+        default=False,
+        help=f"run a warm {intelliterm.__name__} daemon serving oneshot prompts",
+    )
+    parser.add_argument(
+        "--trace",
+        dest="trace",
+        metavar="FILE",
+        help="write a performance trace to FILE (Chrome trace event format)",
+    )
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        choices=PROFILERS,
+        const=PROFILERS[0],
+        nargs="?",
+        help="profile this run, writing a profile and its summary to the logs",
+    )
+    parser.add_argument(
+        "--profile-phase",
+        dest="profile_phase",
+        choices=PHASES,
+        default=PHASES[0],
+        help="phase to profile: whole run (default) or responses (completion "
+        + "and rendering)",
+    )
 
     return parser.parse_args(args)
 
 
+def complete_args(chat: "Chat", args: argparse.Namespace) -> bool:
+    """Call model to complete prompt from CLI arguments (ie: `ai <prompt>`
+    and `ai -f <path>`).
+
+    Args:
+        chat (Chat)
+        args (argparse.Namespace): CLI parameters namespace.
+
+    Returns:
+        bool: False if no prompt was passed.
+    """
+    from intelliterm.prompt import Prompt
+
+    prompt: Optional[Prompt] = None
+
+    if args.prompt:
+        # $ ai <prompt>
+        prompt = Prompt(content=" ".join(args.prompt))
+
+    if args.file:
+        # $ ai -f/--file <path> [-f/--file <path> ...]
+        _logger.info(f"Inputting files {args.file}")
+        chat.file(args.file, prompt or Prompt())
+        return True
+
+    if prompt is None or len(prompt.content.strip()) == 0:
+        return False
+
+    chat.ask(prompt)
+    return True
+
+
+def complete_stdin(chat: "Chat", args: argparse.Namespace, stdin: TextIO) -> None:
+    """Call model to complete prompt from stdin (ie: `<stdin> | ai`).
+
+    Args:
+        chat (Chat)
+        args (argparse.Namespace): CLI parameters namespace.
+        stdin (TextIO): Input stream (only read at once if small enough).
+    """
+    from intelliterm.config import config
+    from intelliterm.console import console
+    from intelliterm.prompt import Prompt
+
+    threshold = config.settings().large_input_bytes
+    head = stdin.read(threshold + 1)
+
+    if len(head) > threshold:
+        head += stdin.readline()  # (complete last line)
+
+    lines = itertools.chain(io.StringIO(head), stdin)
+
+    if not args.prompt and is_git_diff(head):
+        # $ git diff | ai
+        chat.oneshot(True)
+        chat.commit_message(lines)
+        return
+
+    if len(head) > threshold:
+        # large input, stream the rest in chunks
+        if not args.prompt:
+            chat.oneshot(True)
+
+        task = " ".join(args.prompt)
+        chat.ingest(lines, Prompt(content=task), source="stdin")
+        return
+
+    if args.prompt:
+        prompt = Prompt(content=" ".join(args.prompt) + head.strip())
+        chat.ask(prompt)
+    else:
+        prompt = Prompt(content=head.strip())
+
+        if len(prompt.content) > 0:
+            chat.oneshot(True)
+            chat.ask(prompt)
+        else:
+            console.error("Empty input")
+
+
+def use_config(args: argparse.Namespace) -> bool:
+    """Use configuration passed via `--config` (if any) for this session.
+
+    Args:
+        args (argparse.Namespace): CLI parameters namespace.
+
+    Returns:
+        bool: False if there is no such configuration.
+    """
+    from intelliterm.config import config
+    from intelliterm.console import console
+
+    if config.select(args.config):
+        return True
+
+    console.error(f"No configuration named {args.config.upper()}")
+    return False
+
+
 def main(_args: list[str]) -> None:
     setup_dirs()
     setup_logging()
@@ -111,50 +267,47 @@ def main(_args: list[str]) -> None:
     logger.info(f"Starting {intelliterm.__name__}")
 
     args = parse_args(_args)
+
+    if args.trace:
+        tracer.start(args.trace)
+
+    if args.profile:
+        profiler.start(args.profile, args.profile_phase)
+
+    if args.daemon:
+        daemon.serve()
+        return
+
+    from intelliterm.chat import Chat
+    from intelliterm.console import console
+
+    if not use_config(args):
+        return
+
     chat = Chat(oneshot=args.oneshot, autocopy=args.autocopy)
+    tracer.complete("startup", START_NS / 1000, now_us())
 
     if sys.stdin.isatty():
         # is NOT stdin
-        prompt: Optional[Prompt] = None
-
-        if args.prompt:
-            # $ ai <prompt>
-            prompt = Prompt(content=" ".join(args.prompt))
-
-        if args.file:
-            # $ ai -f/--file <file>
-            with open(args.file, "r") as file:
-                prompt = Prompt(
-                    content=file.read() + prompt.content if prompt else "",
-                    is_file=True,
-                )
-                _logger.error(f"Inputting file {args.file}")
-
-        if prompt is None or len(prompt.content.strip()) == 0:
+        if not complete_args(chat, args):
             # $ ai
             console.clear()
             chat.listen()
-        else:
-            chat.ask(prompt)
+            return
     else:
         # <stdin> | ai
-        # Call model to complete prompt from stdin
-        if args.prompt:
-            prompt = Prompt(content=" ".join(args.prompt) + sys.stdin.read().strip())
-            chat.ask(prompt)
-        else:
-            prompt = Prompt(content=sys.stdin.read().strip())
+        complete_stdin(chat, args, sys.stdin)
 
-            if len(prompt.content) > 0:
-                if is_git_diff(prompt.content):
-                    prompt.content = SPECIAL_PROMPTS["GIT_DIFF"] + prompt.content
-                chat.oneshot(True)
-                chat.ask(prompt)
-            else:
-                console.error("Empty input")
+    if not chat.is_oneshot():
+        chat.listen()
 
 
 def run() -> None:
+    if daemon.should_forward(sys.argv[1:]):
+        exit_code = daemon.forward(sys.argv[1:])
+
+        if exit_code is not None:
+            sys.exit(exit_code)
     main(sys.argv[1:])
 
 
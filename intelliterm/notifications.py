@@ -1,30 +1,93 @@
-from time import sleep
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
 from intelliterm.console import console
 
 
 class Notification:
-    def __init__(self) -> None:
-        self._message: str = ""
-        self._read: bool = True
-
-    @property
-    def message(self) -> str:
-        self._read = True
-        return self._message
-
-    @message.setter
-    def message(self, message: str) -> None:
-        self._message = message
-
-    @property
-    def read(self) -> bool:
-        return self._read
-
-    def emit(self, message: str) -> None:
-        self.message = message
-        sleep(0.01)     # TODO(refactor): currently a workaround for bottom_toolbar
-        self._read = False
-        console.info(message)
+    """Notification bus.
+
+    Messages can be emitted from any thread (ie: by background workers) without
+    blocking: they're queued and shown in turn (each for its duration) by
+    subscribed displays (ie: the bottom toolbar), which are refreshed as messages
+    change. Messages are printed instead when no display is shown.
+
+    Attributes:
+        duration (float): Seconds a message is shown for (by default).
+
+    Methods:
+        subscribe(listener: Callable[[], bool]) -> None:
+            Subscribe display refresh (returns False if display is not shown).
+        emit(message: str, duration: Optional[float] = None) -> None:
+            Queue message.
+        current() -> Optional[str]:
+            Message to show now (None if there's none).
+    """
+
+    def __init__(self, duration: float = 3.0, max_queued: int = 5) -> None:
+        self.duration = duration
+        # (oldest messages are dropped if too many are queued)
+        self._queue: deque[tuple[str, float]] = deque(maxlen=max_queued)
+        self._current: Optional[tuple[str, float]] = None  # (message, expires at)
+        self._listeners: list[Callable[[], bool]] = []
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, listener: Callable[[], bool]) -> None:
+        """Subscribe display refresh (called on new/expired messages, from any
+        thread, so it must be thread-safe).
+
+        Args:
+            listener (Callable[[], bool]): Refreshes display, returning False if
+                display is not shown.
+        """
+        self._listeners.append(listener)
+
+    def emit(self, message: str, duration: Optional[float] = None) -> None:
+        """Queue message (printed, if no display is shown).
+
+        Args:
+            message (str)
+            duration (Optional[float]): Seconds message is shown for. Defaults to
+                None (ie: `duration`).
+        """
+        with self._lock:
+            self._queue.append(
+                (message, self.duration if duration is None else duration)
+            )
+
+        if not self._refresh():
+            console.info(message)
+
+    def current(self) -> Optional[str]:
+        """Message to show now (expired messages are replaced by queued ones)."""
+        with self._lock:
+            now = time.monotonic()
+
+            if self._current and self._current[1] <= now:
+                self._current = None
+
+            if self._current is None and self._queue:
+                message, duration = self._queue.popleft()
+                self._current = (message, now + duration)
+                self._schedule_refresh(duration)
+
+            return self._current[0] if self._current else None
+
+    def _schedule_refresh(self, delay: float) -> None:
+        """Refresh displays when current message expires."""
+        if self._timer:
+            self._timer.cancel()
+
+        self._timer = threading.Timer(delay, self._refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _refresh(self) -> bool:
+        """Refresh displays (returns False if none is shown)."""
+        return any([listener() for listener in self._listeners])
 
 
 notification = Notification()
@@ -0,0 +1,204 @@
+"""Profiling of a run (`--profile`), to attach to reports of slow startup/rendering.
+
+Profiles are written to `LOGS_DIR` as a dump (cProfile stats, or collapsed stacks
+for the sampling profiler, ie: for flamegraph.pl or https://speedscope.app) and a
+text summary of the top functions.
+"""
+
+import atexit
+import cProfile
+import datetime
+import io
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from types import FrameType
+from typing import Iterator, Optional
+
+import intelliterm
+from intelliterm.constants import LOGS_DIR
+
+PROFILERS = ("cprofile", "sampling")
+# Phases that can be profiled alone (instead of the whole run)
+PHASES = ("run", "response")
+
+# Functions listed in summaries
+TOP_N = 30
+# Seconds between samples (of sampling profiler)
+SAMPLE_INTERVAL = 0.005
+
+
+class Sampler:
+    """Sampling profiler: samples the stack of a thread at an interval (from a
+    background thread), so profiled code runs at full speed.
+
+    Attributes:
+        stacks (Counter[str]): Samples per collapsed stack (`outer;...;inner`).
+
+    Methods:
+        enable() -> None
+        disable() -> None
+        summary(top: int) -> str: Functions with the most samples.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL) -> None:
+        self.stacks: Counter[str] = Counter()
+        self._interval = interval
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def enable(self) -> None:
+        self._thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def disable(self) -> None:
+        self._stop.set()
+
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+
+    def summary(self, top: int = TOP_N) -> str:
+        """Functions with the most samples (in themselves, and in total).
+
+        Args:
+            top (int): Number of functions listed. Defaults to TOP_N.
+
+        Returns:
+            str
+        """
+        own: Counter[str] = Counter()
+        total: Counter[str] = Counter()
+
+        for stack, count in self.stacks.items():
+            functions = stack.split(";")
+            own[functions[-1]] += count
+            for function in set(functions):
+                total[function] += count
+
+        num_samples = sum(self.stacks.values()) or 1
+        summary = f"{num_samples} samples, every {self._interval * 1000:g} ms\n"
+
+        for title, counter in (("self", own), ("total", total)):
+            summary += f"\n{'samples':>8} {'%':>6}  function ({title})\n"
+            for function, count in counter.most_common(top):
+                summary += f"{count:>8} {count / num_samples:>6.1%}  {function}\n"
+        return summary
+
+
+def collapse(frame: Optional[FrameType]) -> str:
+    """Collapsed stack of frame (outermost first, `;`-separated)."""
+    functions: list[str] = []
+
+    while frame is not None:
+        code = frame.f_code
+        file = os.path.basename(code.co_filename)
+        functions.append(f"{code.co_name} ({file}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(functions))
+
+
+class Profiler:
+    """Profiles the run, or one of its phases (see PHASES).
+
+    Attributes:
+        kind (Optional[str]): Profiler used (see PROFILERS), None if disabled.
+        phase (str): Phase profiled.
+
+    Methods:
+        start(kind: str, phase: str = "run") -> None: Enable profiling.
+        profile(phase: str) -> AbstractContextManager:
+            Profile block, if it's the phase profiled.
+        stop() -> Optional[str]: Write profile, returns path of summary.
+            (called on exit)
+    """
+
+    def __init__(self) -> None:
+        self.kind: Optional[str] = None
+        self.phase = "run"
+        self._profiler: Optional[cProfile.Profile | Sampler] = None
+
+    def start(self, kind: str, phase: str = "run") -> None:
+        """Enable profiling (right away, for the whole run), until exit.
+
+        Args:
+            kind (str): Profiler (see PROFILERS).
+            phase (str): Phase to profile (see PHASES). Defaults to "run".
+        """
+        self.kind = kind
+        self.phase = phase
+        self._profiler = cProfile.Profile() if kind == "cprofile" else Sampler()
+
+        if phase == "run":
+            self._profiler.enable()
+        atexit.register(self._stop_at_exit)
+
+    def profile(self, phase: str) -> AbstractContextManager:
+        if self._profiler is None or phase != self.phase:
+            return nullcontext()
+        return self._profile(self._profiler)
+
+    @contextmanager
+    def _profile(self, profiler: cProfile.Profile | Sampler) -> Iterator[None]:
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+
+    def _stop_at_exit(self) -> None:
+        path = self.stop()
+
+        if path:
+            print(f"Profile written to {path}", file=sys.stderr)
+
+    def stop(self) -> Optional[str]:
+        """Write profile (dump and summary) to LOGS_DIR.
+
+        Returns:
+            Optional[str]: Path of summary (None if not profiling).
+        """
+        profiler, self._profiler = self._profiler, None
+
+        if profiler is None:
+            return None
+
+        profiler.disable()
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        path = os.path.join(
+            LOGS_DIR, f"{intelliterm.__name__}_profile_{self.kind}_{timestamp}"
+        )
+
+        if isinstance(profiler, cProfile.Profile):
+            profiler.dump_stats(f"{path}.prof")
+            summary = io.StringIO()
+            stats = pstats.Stats(profiler, stream=summary)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_N)
+            stats.sort_stats(pstats.SortKey.TIME).print_stats(TOP_N)
+            text = summary.getvalue()
+        else:
+            with open(f"{path}.folded", "w") as file:
+                file.writelines(
+                    f"{stack} {count}\n" for stack, count in profiler.stacks.items()
+                )
+            text = profiler.summary()
+
+        with open(f"{path}.txt", "w") as file:
+            file.write(text)
+        return f"{path}.txt"
+
+
+profiler = Profiler()
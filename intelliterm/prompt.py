@@ -2,17 +2,20 @@
 
 import json
 import platform
-import re
+from functools import lru_cache
 from typing import Any, Literal, Optional, TypedDict, cast
 
 import pyperclip
 import tiktoken
 
 import intelliterm
-from intelliterm.code import Code
+from intelliterm.code import Code, CodeExtractor
 from intelliterm.config import config
+from intelliterm.context_store import Segment
 from intelliterm.console import console
 from intelliterm.notifications import notification
+from intelliterm.stats import lru_info, stats
+from intelliterm.tracing import traced
 
 bio = {
     "os": platform.system(),
@@ -45,11 +48,61 @@ SPECIAL_PROMPTS = {
         Generate a commit message, max 50 characters, in conventional format:
         """.strip(),
     "CHAT_TITLE": """Summarize this in a maximum of 20 characters""",
+    "CHUNK_MAP": """
+        Below is part {part} of {source}, which is too large to process at once.
+        Extract everything from this part that is relevant to the following task,
+        be concise and do not complete the task itself yet.
+        Task: {task}
+        Part {part}:
+        """.strip(),
+    "CHUNK_REDUCE": """
+        Below are notes extracted, in order, from consecutive parts of {source}.
+        Using only these notes, complete the following task.
+        Task: {task}
+        Notes:
+        """.strip(),
+    "CHUNK_TASK": """Summarize it""",
+    "GIT_DIFF_MAP": """
+        Below is part {part} of a git diff, which is too large to process at once.
+        Summarize its changes in one short line per file (path: what changed and,
+        if apparent, why). Do not write a commit message yet.
+        Part {part}:
+        """.strip(),
+    "GIT_DIFF_REDUCE": """
+        Below are summaries of the changes, per file, of a git diff.
+        {task}
+        Summaries:
+        """.strip(),
 }
 
 Role = Literal["system", "assistant", "user"]
 
 
+@lru_cache(maxsize=None)
+def get_encoding(model: str) -> tiktoken.Encoding:
+    """Get (cached) tokenizer encoding for model."""
+    return tiktoken.encoding_for_model(
+        model if model.startswith("gpt") else DEFAULT_ENCODING
+    )
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Count number of tokens in text.
+
+    Args:
+        text (str)
+        model (Optional[str]): Model (tokenizer) to count tokens for.
+            Defaults to active configuration's model.
+
+    Returns:
+        int: Number of tokens in text.
+    """
+    return len(get_encoding(model or config.settings().model).encode(text))
+
+
+stats.register_cache("encodings", lru_info(get_encoding))
+
+
 class Message(TypedDict, total=False):
     content: Any  # TODO: add multi-modal support
     role: Role
@@ -60,8 +113,11 @@ class Prompt:
 
     Attributes:
         role (Role): Role to assume. Defaults to "user".
-        content (str): Prompt content.
+        content (str): Prompt content (read back, if spilled).
+        is_spilled (bool): Content was spilled to disk (see `context_store`).
         is_file (bool): File input flag.
+        took (float): Seconds response took.
+        stats (Optional[dict[str, Any]]): Measurement of response (see `stats`).
 
     Methods:
         copy(options: Optional[list[str]] = None) -> None:
@@ -70,10 +126,33 @@ class Prompt:
             Transform to OpenAI Chat Completion message.
         token_count() -> int:
             Count number of tokens in prompt content.
-        get_code() -> Optional[Code]:
-            Extract code from prompt content.
+        spill(segment: Segment) -> None:
+            Move content out of memory, to segment.
+        append(delta: str) -> None:
+            Append streamed delta to prompt content.
+        finish() -> None:
+            Mark prompt content as complete.
+        parse_code() -> list[Code]:
+            Return code blocks in prompt content.
     """
 
+    # Serialized attributes
+    FIELDS = ("is_file", "content", "role", "took", "stats")
+
+    # (no per-instance dict, long chats hold many prompts)
+    __slots__ = (
+        "is_file",
+        "_content",
+        "_deltas",
+        "role",
+        "took",
+        "stats",
+        "_code",
+        "_code_current",
+        "_token_count",
+        "_spilled",
+    )
+
     def __init__(
         self,
         is_file: bool = False,
@@ -81,32 +160,80 @@ class Prompt:
         role: Role = "user",
         took: Optional[float] = None,
     ) -> None:
+        self._code = CodeExtractor()
+        self._code_current = True  # (extractor was fed content)
+        self._token_count: Optional[tuple[str, int]] = None  # (model, count)
+        self._spilled: Optional[tuple[Segment, int, int]] = None
+        self._deltas: list[str] = []  # (streamed, joined to content when read)
         self.is_file: bool = is_file
         self.content: str = content
         self.role: Role = role
         self.took: float = 0
+        self.stats: Optional[dict[str, Any]] = None
+
+    @property
+    def content(self) -> str:
+        if self._spilled is not None:
+            segment, offset, length = self._spilled
+            return segment.read(offset, length)
+        if self._deltas:
+            self._content += "".join(self._deltas)
+            self._deltas = []
+        return self._content
+
+    @content.setter
+    def content(self, content: str) -> None:
+        self._content = content
+        self._deltas = []
+        self._spilled = None
+        self._code_current = not content
+        self._token_count = None
+
+    @property
+    def is_spilled(self) -> bool:
+        return self._spilled is not None
+
+    def spill(self, segment: Segment) -> None:
+        """Move content out of memory, to segment (it's read back when accessed).
+
+        Args:
+            segment (Segment)
+        """
+        if self._spilled is None:
+            self._spilled = (segment, *segment.write(self.content))
+            self._content = ""
 
     def serialize(self) -> dict[str, Any]:
-        return self.__dict__
+        return {field: getattr(self, field) for field in Prompt.FIELDS}
+
+    @classmethod
+    def from_dict(cls, dict: dict[str, Any]) -> "Prompt":
+        """Prompt from serialized attributes (see `serialize`)."""
+        prompt = cls()
+
+        for field in Prompt.FIELDS:
+            if field in dict:
+                setattr(prompt, field, dict[field])
+        return prompt
 
     @classmethod
     def deserialize(cls, json_str: str) -> "Prompt":
         dict = json.loads(json_str)
         return cast(Prompt, dict)
 
+    @traced("prompt.token_count")
     def token_count(self) -> int:
-        """Count number of tokens in prompt content.
+        """Count number of tokens in prompt content (cached, so spilled content
+        isn't read back to be counted again).
 
         Returns:
             int: Number of tokens in prompt content.
         """
-        encoding = tiktoken.encoding_for_model(
-            config.get("model")
-            if config.get("model").startswith("gpt")
-            else DEFAULT_ENCODING
-        )
-        num_tokens = len(encoding.encode(self.content))
-        return num_tokens
+        model = config.settings().model
+
+        if self._token_count is None or self._token_count[0] != model:
+            self._token_count = (model, count_tokens(self.content, model))
+        return self._token_count[1]
 
     def copy(self, options: Optional[list[str]] = None) -> None:
         """Copy prompt content or code to clipboard.
@@ -147,17 +274,40 @@ class Prompt:
     def get_message(self) -> Message:
         return {"role": self.role, "content": self.content}
 
+    def append(self, delta: str) -> None:
+        """Append streamed delta to prompt content (extracting code blocks as soon
+        as they are complete).
+
+        Deltas are buffered, and joined once content is read (not copied into it
+        on each delta).
+
+        Args:
+            delta (str)
+        """
+        if self._spilled is not None:
+            self._content, self._spilled = self.content, None
+        self._deltas.append(delta)
+        self._token_count = None
+        self._code.feed(delta)
+        self._code_current = True
+
+    def finish(self) -> None:
+        """Mark prompt content as complete (ie: streaming is done)."""
+        if self._code_current:
+            self._code.feed("", final=True)
+
     def parse_code(self) -> list[Code]:
-        """Extract code blocks from prompt content.
+        """Return code blocks in prompt content.
+
+        Blocks are extracted while content is streamed (see `append`), otherwise
+        once, on first call.
 
         Returns:
             list[Code]
         """
-        found_code_blocks = re.findall(r"```(\w+)\n([\s\S]*?)\n```", self.content)
-        code_blocks: list[Code] = []
-
-        for found in found_code_blocks:
-            language = found[0]
-            code = found[1]
-            code_blocks.append(Code(language, code))
-        return code_blocks
+        if not self._code_current:
+            # content was set (not streamed), extract from scratch
+            self._code = CodeExtractor()
+            self._code.feed(self.content, final=True)
+            self._code_current = True
+        return self._code.blocks
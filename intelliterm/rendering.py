@@ -0,0 +1,207 @@
+"""Rendering of (streamed) responses and echoed inputs, at bounded cost.
+
+Streamed responses are split into blocks (paragraphs, lists, code blocks): each
+block is printed once, as soon as it's complete, and only the block in progress is
+re-rendered live (instead of re-rendering the whole response on every delta).
+"""
+
+from types import TracebackType
+from typing import Optional
+
+from rich.console import Console, ConsoleOptions, Group, RenderableType, RenderResult
+from rich.live import Live
+from rich.markdown import Markdown
+from rich.segment import Segment
+from rich.text import Text
+
+from intelliterm.code import FENCE_REGEX
+from intelliterm.constants import CODE_THEME
+from intelliterm.files import BYTES_PER_TOKEN
+from intelliterm.tracing import tracer
+from intelliterm.utils import format_size
+
+# Inputs larger than this are echoed as a summary (instead of in full)
+ECHO_MAX_CHARS = 4000
+ECHO_MAX_LINES = 40
+
+
+class Block:
+    """Markdown block, without leading blank lines (blocks of a streamed response
+    are printed separated by a single blank line).
+
+    Attributes:
+        content (str): Markdown.
+    """
+
+    def __init__(self, content: str) -> None:
+        self.content = content
+
+    def __rich_console__(
+        self, console: Console, options: ConsoleOptions
+    ) -> RenderResult:
+        markdown = Markdown(self.content, code_theme=CODE_THEME)
+        lines = console.render_lines(markdown, options, pad=False)
+
+        # (blank, ie: before a list, but not padding of a code block)
+        while lines and all(
+            not segment.text.strip() and not (segment.style and segment.style.bgcolor)
+            for segment in lines[0]
+        ):
+            lines.pop(0)
+
+        for line in lines:
+            yield from line
+            yield Segment.line()
+
+
+class MarkdownStream:
+    """Renders markdown streamed in deltas (use as context manager).
+
+    Complete blocks are printed (once) above the live display, which only renders
+    the block in progress; code blocks longer than `max_live_lines` are printed in
+    parts. Cost of rendering each delta is bounded by the size of a block, instead
+    of growing with the whole response.
+
+    Attributes:
+        console (Console)
+        footer (Optional[RenderableType]): Rendered (live) below the response.
+        max_live_lines (int): Max lines of a code block rendered live.
+
+    Methods:
+        append(delta: str) -> None: Render delta.
+    """
+
+    def __init__(
+        self,
+        console: Console,
+        footer: Optional[RenderableType] = None,
+        max_live_lines: Optional[int] = None,
+    ) -> None:
+        self.console = console
+        self.footer = footer
+        self.max_live_lines = max_live_lines or max(console.height - 4, 8)
+        self._tail = ""  # (content not printed yet)
+        self._scanned = 0  # (end of last complete line of tail)
+        self._fence = ""  # (opening line of code block in progress)
+        self._fence_marker = ""  # (its backticks or tildes, ie: "````")
+        self._fence_start = 0  # (start of code lines in tail)
+        self._boundary = 0  # (end of tail's complete blocks, pending next line)
+        self._live = Live(
+            console=console,
+            transient=False,
+            refresh_per_second=40,
+            vertical_overflow="visible",
+        )
+
+    def __enter__(self) -> "MarkdownStream":
+        self._render()
+        self._live.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self._live.update(Block(self._tail))  # (final render, without footer)
+        self._live.stop()
+
+    def append(self, delta: str) -> None:
+        """Render delta (printing blocks it completed)."""
+        self._tail += delta
+
+        while (end := self._tail.find("\n", self._scanned) + 1) > 0:
+            removed = self._scan(self._tail[self._scanned : end], end)
+            self._scanned = end - removed
+
+        self._render()
+
+    def _scan(self, line: str, end: int) -> int:
+        """Scan complete line (ending at `end` in tail), printing blocks it completes.
+
+        Returns:
+            int: Number of characters printed (ie: removed from the start of tail).
+        """
+        stripped = line.strip()
+
+        if self._fence:
+            # (closed by the same character, at least as many times, like opened)
+            marker = self._fence_marker
+            if stripped.startswith(marker) and not stripped.strip(marker[0]):
+                is_top_level = not self._fence[0].isspace()
+                self._fence = self._fence_marker = ""
+                return self._commit(end) if is_top_level else 0
+
+            if self._tail.count("\n", self._fence_start, end) > self.max_live_lines:
+                # (long code block, print its complete lines)
+                fence = self._fence
+                self._print(self._tail[:end] + marker + "\n", separate=False)
+                self._tail = fence + self._tail[end:]
+                self._fence_start = len(fence)
+                return end - len(fence)
+            return 0
+
+        if not stripped:
+            if self._tail[: end - len(line)].strip():
+                self._boundary = end
+            return 0
+
+        removed = 0
+
+        if self._boundary:
+            if line[0].isspace():
+                self._boundary = 0  # (indented continuation of previous block)
+            else:
+                removed = self._commit(self._boundary)
+
+        match = FENCE_REGEX.match(line.rstrip("\n"))
+        if match:
+            self._fence, self._fence_marker = line, match.group(1)
+            self._fence_start = end - removed
+        return removed
+
+    def _commit(self, end: int) -> int:
+        """Print tail up to `end` (complete blocks), returns number of characters."""
+        self._boundary = 0
+        self._print(self._tail[:end])
+        self._tail = self._tail[end:]
+        return end
+
+    def _print(self, content: str, separate: bool = True) -> None:
+        with tracer.span("render.block", chars=len(content)):
+            self._live.console.print(Block(content))
+            if separate:
+                self._live.console.print()
+
+    def _render(self) -> None:
+        with tracer.span("render.frame", chars=len(self._tail)):
+            block = Block(self._tail)
+            self._live.update(
+                Group(block, self.footer) if self.footer is not None else block
+            )
+
+
+def echo(content: str) -> RenderableType:
+    """Input to echo: markdown, or a summary if it's too large to render at once.
+
+    Args:
+        content (str)
+
+    Returns:
+        RenderableType
+    """
+    num_lines = content.count("\n") + (not content.endswith("\n"))
+
+    if len(content) <= ECHO_MAX_CHARS and num_lines <= ECHO_MAX_LINES:
+        return Markdown(content, code_theme=CODE_THEME)
+
+    first_line = content.lstrip().split("\n", 1)[0][:80]
+    size = len(content.encode(errors="replace"))
+    summary = Text(f"{first_line}…\n", style="reset")
+    summary.append(
+        f"({format_size(size)}, {num_lines} lines, "
+        + f"~{size // BYTES_PER_TOKEN} tokens)",
+        style="black",
+    )
+    return summary
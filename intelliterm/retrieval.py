@@ -0,0 +1,310 @@
+"""Local lexical index (BM25) of project files, so prompts are sent with the parts
+of files relevant to them, instead of whole files.
+
+Files are split in chunks of lines. The index holds the term frequencies of each
+chunk (not its content, which is read back from the file when retrieved), is
+saved under INDEX_DIR and is updated incrementally: only files whose mtime or
+size changed are chunked again.
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Iterable, NamedTuple, Optional
+
+from intelliterm import files
+from intelliterm.constants import INDEX_DIR
+from intelliterm.files import LineRange
+
+# Max lines (and characters) per chunk
+CHUNK_LINES = 40
+CHUNK_CHARS = 4000
+# Larger files are not indexed (ie: logs, data files)
+MAX_FILE_BYTES = 1 << 20
+# BM25 parameters (term frequency saturation, length normalization)
+K1 = 1.2
+B = 0.75
+# Bumped when the format of saved indexes changes (they are rebuilt)
+VERSION = 1
+
+# Words (ie: identifiers), and their parts (ie: `get`, `response` of `getResponse`)
+WORD_REGEX = re.compile(r"[A-Za-z0-9_]+")
+PART_REGEX = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|[0-9]+")
+
+
+def terms(text: str) -> list[str]:
+    """Split text into (lowercase) terms: words, and parts of compound words.
+
+    Args:
+        text (str)
+
+    Returns:
+        list[str]: Terms (with duplicates, in order).
+    """
+    result: list[str] = []
+
+    for word in WORD_REGEX.findall(text):
+        if len(word) > 1:
+            result.append(word.lower())
+        parts = PART_REGEX.findall(word)
+        if len(parts) > 1:
+            result.extend(part.lower() for part in parts if len(part) > 1)
+    return result
+
+
+def chunk_lines(lines: Iterable[str]) -> Iterable[tuple[int, int, str]]:
+    """Group lines into chunks of at most CHUNK_LINES lines (or CHUNK_CHARS
+    characters, unless a single line is longer).
+
+    Args:
+        lines (Iterable[str]): Lines (including line endings).
+
+    Yields:
+        tuple[int, int, str]: First and last line (1-based), text of chunk.
+    """
+    chunk: list[str] = []
+    chars = 0
+    start = 1
+
+    for number, line in enumerate(lines, 1):
+        if chunk and (len(chunk) == CHUNK_LINES or chars + len(line) > CHUNK_CHARS):
+            yield start, number - 1, "".join(chunk)
+            chunk, chars, start = [], 0, number
+        chunk.append(line)
+        chars += len(line)
+
+    if chunk:
+        yield start, start + len(chunk) - 1, "".join(chunk)
+
+
+class Chunk(NamedTuple):
+    """Indexed chunk of a file.
+
+    Attributes:
+        path (str): Path to file (relative to the indexed directory).
+        start (int): First line (1-based).
+        end (int): Last line (inclusive).
+        length (int): Number of terms.
+    """
+
+    path: str
+    start: int
+    end: int
+    length: int
+
+
+@dataclass
+class Hit:
+    """Chunk relevant to a query.
+
+    Attributes:
+        chunk (Chunk)
+        score (float): BM25 score.
+        content (str): Lines of chunk.
+    """
+
+    chunk: Chunk
+    score: float
+    content: str
+
+    @property
+    def name(self) -> str:
+        return f"{self.chunk.path}:{self.chunk.start}-{self.chunk.end}"
+
+    def label(self) -> str:
+        """Content, labeled with its path and lines (for prompts)."""
+        language = os.path.splitext(self.chunk.path)[1][1:].lower()
+        return f"{self.name}:\n```{language}\n{self.content.rstrip()}\n```"
+
+
+class Index:
+    """BM25 index of the text files in a directory (skipping `.gitignore`d paths).
+
+    Attributes:
+        root (str): Indexed directory (absolute).
+        path (str): Path the index is saved to.
+        files (dict[str, dict[str, Any]]): Indexed files (relative paths), with
+            their mtime, size and chunks (first/last line, term frequencies).
+
+    Methods:
+        load(root: str) -> Index: Saved index of directory (or an empty one).
+        update() -> tuple[int, int]: Index files that changed.
+        save() -> None: Save index.
+        search(query: str, k: int) -> list[Hit]: Chunks most relevant to query.
+        num_chunks() -> int: Number of indexed chunks.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = os.path.abspath(os.path.expanduser(root))
+        digest = hashlib.sha1(self.root.encode()).hexdigest()[:16]
+        self.path = os.path.join(INDEX_DIR, f"{digest}.json")
+        self.files: dict[str, dict[str, Any]] = {}
+
+        # (built from files, when searched after an update)
+        self._chunks: list[Chunk] = []
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        self._average_length = 0.0
+        self._stale = True
+
+    @classmethod
+    def load(cls, root: str) -> "Index":
+        """Saved index of directory (or an empty one).
+
+        Args:
+            root (str): Directory.
+
+        Returns:
+            Index
+        """
+        index = cls(root)
+
+        try:
+            with open(index.path) as file:
+                saved = json.load(file)
+        except (OSError, ValueError):
+            return index
+
+        if saved.get("version") == VERSION and saved.get("root") == index.root:
+            index.files = saved["files"]
+        return index
+
+    def save(self) -> None:
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        temporary = f"{self.path}.tmp"
+
+        with open(temporary, "w") as file:
+            saved = {"version": VERSION, "root": self.root, "files": self.files}
+            json.dump(saved, file)
+        os.replace(temporary, self.path)  # (never left half written)
+
+    def update(self) -> tuple[int, int]:
+        """Index files that were added or changed (by mtime or size) since last
+        update, and drop files that were removed (saving the index if any).
+
+        Returns:
+            tuple[int, int]: Number of files indexed, and removed.
+        """
+        changed: list[tuple[str, os.stat_result]] = []
+        found: set[str] = set()
+
+        for path in files.walk(self.root):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if stat.st_size > MAX_FILE_BYTES:
+                continue
+
+            relative = os.path.relpath(path, self.root)
+            found.add(relative)
+            entry = self.files.get(relative)
+
+            if entry is None or (entry["mtime"], entry["size"]) != (
+                stat.st_mtime_ns,
+                stat.st_size,
+            ):
+                changed.append((relative, stat))
+
+        removed = [path for path in self.files if path not in found]
+        for path in removed:
+            del self.files[path]
+
+        def _index(item: tuple[str, os.stat_result]) -> Optional[dict[str, Any]]:
+            relative, stat = item
+            path = os.path.join(self.root, relative)
+
+            try:
+                chunks = (
+                    []  # (binary files are kept, so they are not sniffed again)
+                    if files.is_binary(path)
+                    else [
+                        [start, end, Counter(terms(text))]
+                        for start, end, text in chunk_lines(files.iter_lines(path))
+                    ]
+                )
+            except OSError:
+                return None  # (ie: removed since walked)
+            return {"mtime": stat.st_mtime_ns, "size": stat.st_size, "chunks": chunks}
+
+        with ThreadPoolExecutor(max_workers=files.MAX_WORKERS) as executor:
+            for (relative, _), entry in zip(changed, executor.map(_index, changed)):
+                if entry is not None:
+                    self.files[relative] = entry
+
+        if changed or removed:
+            self._stale = True
+            self.save()
+        return len(changed), len(removed)
+
+    def num_chunks(self) -> int:
+        return sum(len(entry["chunks"]) for entry in self.files.values())
+
+    def _build(self) -> None:
+        """Build postings (chunks, and term frequencies, of each term)."""
+        self._chunks = []
+        self._postings = {}
+
+        for path, entry in sorted(self.files.items()):
+            for start, end, frequencies in entry["chunks"]:
+                i = len(self._chunks)
+                self._chunks.append(
+                    Chunk(path, start, end, sum(frequencies.values()))
+                )
+                for term, frequency in frequencies.items():
+                    self._postings.setdefault(term, []).append((i, frequency))
+
+        total = sum(chunk.length for chunk in self._chunks)
+        self._average_length = total / len(self._chunks) if self._chunks else 0
+        self._stale = False
+
+    def search(self, query: str, k: int) -> list[Hit]:
+        """Chunks most relevant to query (by BM25 score), read from their files.
+
+        Args:
+            query (str)
+            k (int): Max chunks.
+
+        Returns:
+            list[Hit]: Most relevant first.
+        """
+        if self._stale:
+            self._build()
+
+        num_chunks = len(self._chunks)
+        scores: dict[int, float] = {}
+
+        for term in set(terms(query)):
+            postings = self._postings.get(term, [])
+            if not postings:
+                continue
+
+            df = len(postings)
+            idf = math.log(1 + (num_chunks - df + 0.5) / (df + 0.5))
+            for i, frequency in postings:
+                norm = 1 - B + B * self._chunks[i].length / self._average_length
+                scores[i] = scores.get(i, 0) + idf * frequency * (K1 + 1) / (
+                    frequency + K1 * norm
+                )
+
+        hits: list[Hit] = []
+        for i, score in heapq.nlargest(k, scores.items(), key=lambda item: item[1]):
+            chunk = self._chunks[i]
+            content = self.read(chunk)
+            if content is not None:
+                hits.append(Hit(chunk, score, content))
+        return hits
+
+    def read(self, chunk: Chunk) -> Optional[str]:
+        """Lines of chunk (None if its file can't be read anymore)."""
+        try:
+            return files.read_text(
+                os.path.join(self.root, chunk.path), LineRange(chunk.start, chunk.end)
+            )
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,255 @@
+"""Performance statistics of responses (latency, time to first token, throughput),
+collected while responses are streamed and summarized by `!stats`.
+
+Measurements are kept for the session and saved with each response, so saved
+chats can be summarized too, without any extra API call.
+"""
+
+import json
+import math
+import os
+import threading
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from rich.console import Group, RenderableType
+from rich.table import Table
+from rich.text import Text
+
+from intelliterm.constants import SAVED_CHATS_DIR
+from intelliterm.utils import format_size
+
+# Upper bounds (in seconds) of latency histogram buckets (last one is unbounded)
+LATENCY_BUCKETS = (0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+BARS = " ▁▂▃▄▅▆▇█"
+PERCENTILES = (50, 90, 99)
+
+# Returns hits and misses of a cache
+CacheInfo = Callable[[], tuple[int, int]]
+
+
+@dataclass
+class Measurement:
+    """Measurement of a streamed response.
+
+    Attributes:
+        config (str): Name of configuration used.
+        model (str)
+        latency (float): Seconds from request to last token.
+        ttft (Optional[float]): Seconds to first token (None if there was none).
+        tokens_sent (int): Tokens in context.
+        tokens_received (int): Tokens in response.
+    """
+
+    config: str
+    model: str
+    latency: float
+    ttft: Optional[float]
+    tokens_sent: int
+    tokens_received: int
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Output throughput (once the first token arrived)."""
+        streamed = self.latency - (self.ttft or 0)
+        return self.tokens_received / streamed if streamed > 0 else None
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, dict: dict[str, Any]) -> "Measurement":
+        return cls(**{field: dict[field] for field in cls.__dataclass_fields__})
+
+
+class Stats:
+    """Statistics of the session.
+
+    Attributes:
+        measurements (list[Measurement]): Measurements of responses.
+        bytes_written (int): Bytes written to disk (ie: saved chats).
+
+    Methods:
+        record(measurement: Measurement) -> None
+        record_write(size: int) -> None
+        register_cache(name: str, info: CacheInfo) -> None:
+            Register cache (to report its hit rate).
+        cache_rates() -> dict[str, Optional[float]]:
+            Hit rates of registered caches (None if unused).
+    """
+
+    def __init__(self) -> None:
+        self.measurements: list[Measurement] = []
+        self.bytes_written = 0
+        self._caches: dict[str, CacheInfo] = {}
+        self._lock = threading.Lock()
+
+    def record(self, measurement: Measurement) -> None:
+        with self._lock:
+            self.measurements.append(measurement)
+
+    def record_write(self, size: int) -> None:
+        with self._lock:
+            self.bytes_written += size
+
+    def register_cache(self, name: str, info: CacheInfo) -> None:
+        """Register cache (to report its hit rate).
+
+        Args:
+            name (str)
+            info (CacheInfo): Returns hits and misses of cache.
+        """
+        self._caches[name] = info
+
+    def cache_rates(self) -> dict[str, Optional[float]]:
+        rates: dict[str, Optional[float]] = {}
+
+        for name, info in self._caches.items():
+            hits, misses = info()
+            rates[name] = hits / (hits + misses) if hits + misses else None
+        return rates
+
+
+stats = Stats()
+
+
+def lru_info(function: Any) -> CacheInfo:
+    """Hits and misses of a `functools.lru_cache` decorated function."""
+    return lambda: function.cache_info()[:2]  # type: ignore
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Percentile of values (nearest rank).
+
+    Args:
+        values (list[float]): Sorted values (not empty).
+        p (float): Percentile (0-100).
+
+    Returns:
+        float
+    """
+    rank = math.ceil(p / 100 * len(values))
+    return values[max(rank, 1) - 1]
+
+
+def histogram(values: Iterable[float], buckets: tuple[float, ...]) -> list[int]:
+    """Count values per bucket (by upper bound, plus an unbounded last one).
+
+    Args:
+        values (Iterable[float])
+        buckets (tuple[float, ...]): Sorted upper bounds.
+
+    Returns:
+        list[int]: Counts (one more than `buckets`).
+    """
+    counts = [0] * (len(buckets) + 1)
+
+    for value in values:
+        counts[next((i for i, b in enumerate(buckets) if value <= b), -1)] += 1
+    return counts
+
+
+def sparkline(counts: list[int]) -> str:
+    top = max(counts, default=0) or 1
+    return "".join(BARS[math.ceil(count / top * (len(BARS) - 1))] for count in counts)
+
+
+def load_saved() -> Iterator[Measurement]:
+    """Measurements saved with responses of saved chats (ie: for all chats)."""
+    if not os.path.isdir(SAVED_CHATS_DIR):
+        return
+
+    for file_name in sorted(os.listdir(SAVED_CHATS_DIR)):
+        if not file_name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(SAVED_CHATS_DIR, file_name)) as file:
+                context = json.load(file)["_context"]
+        except (OSError, ValueError, KeyError):
+            continue
+
+        for prompt in context:
+            try:
+                yield Measurement.from_dict(prompt["stats"])
+            except (KeyError, TypeError):
+                pass  # (not a response, or saved without measurement)
+
+
+def saved_size() -> int:
+    """Bytes of saved chats on disk."""
+    if not os.path.isdir(SAVED_CHATS_DIR):
+        return 0
+    with os.scandir(SAVED_CHATS_DIR) as entries:
+        return sum(entry.stat().st_size for entry in entries if entry.is_file())
+
+
+def summarize(
+    measurements: list[Measurement],
+    bytes_written: int,
+    cache_rates: dict[str, Optional[float]],
+) -> RenderableType:
+    """Summary of measurements per configuration, as a table.
+
+    Args:
+        measurements (list[Measurement])
+        bytes_written (int)
+        cache_rates (dict[str, Optional[float]]): Hit rates of caches.
+
+    Returns:
+        RenderableType
+    """
+
+    def spread(values: list[float], format: str) -> str:
+        if not values:
+            return "-"
+        values = sorted(values)
+        return " / ".join(format.format(percentile(values, p)) for p in PERCENTILES)
+
+    by_config: dict[str, list[Measurement]] = {}
+
+    for measurement in measurements:
+        by_config.setdefault(measurement.config, []).append(measurement)
+
+    buckets = ", ".join(f"{b:g}" for b in LATENCY_BUCKETS)
+    table = Table(
+        border_style="black",
+        header_style="bold",
+        caption=" / ".join(f"p{p}" for p in PERCENTILES)
+        + f" · histogram buckets: ≤ {buckets}, > {LATENCY_BUCKETS[-1]:g}s",
+        caption_style="black",
+    )
+    table.add_column("config")
+    table.add_column("n", justify="right")
+    table.add_column("histogram")
+    table.add_column("latency", justify="right")
+    table.add_column("ttft", justify="right")
+    table.add_column("tokens/s", justify="right")
+    table.add_column("sent", justify="right")
+    table.add_column("received", justify="right")
+
+    for name, group in sorted(by_config.items()):
+        latencies = [m.latency for m in group]
+        table.add_row(
+            name,
+            str(len(group)),
+            sparkline(histogram(latencies, LATENCY_BUCKETS)),
+            spread(latencies, "{:.2f}s"),
+            spread([m.ttft for m in group if m.ttft is not None], "{:.2f}s"),
+            spread(
+                [m.tokens_per_second for m in group if m.tokens_per_second],
+                "{:.0f}",
+            ),
+            str(sum(m.tokens_sent for m in group)),
+            str(sum(m.tokens_received for m in group)),
+        )
+
+    caches = ", ".join(
+        f"{name} {'-' if rate is None else f'{rate:.0%}'}"
+        for name, rate in cache_rates.items()
+    )
+    footer = Text(
+        f"written: {format_size(bytes_written)}"
+        + (f" · cache hits: {caches}" if caches else ""),
+        style="black",
+    )
+    return Group(table, footer)
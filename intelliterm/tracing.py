@@ -0,0 +1,164 @@
+"""Performance tracing, exported as Chrome trace events (ie: to load the trace in
+https://ui.perfetto.dev or chrome://tracing).
+
+Enabled with `--trace FILE` or `INTELLITERM_TRACE=FILE`; the trace is written when
+the process exits. When disabled, spans are a shared no-op context manager, so
+tracing costs an attribute lookup per traced call.
+"""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import AbstractContextManager, nullcontext
+from types import TracebackType
+from typing import Any, Callable, Optional, TypeVar
+
+TRACE_ENV = "INTELLITERM_TRACE"
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# (start of process, as far as Python code can tell)
+START_NS = time.perf_counter_ns()
+NULL_SPAN: AbstractContextManager[None] = nullcontext()
+
+
+def now_us() -> float:
+    return time.perf_counter_ns() / 1000
+
+
+class Span:
+    """Traced duration (use as context manager), recorded as a complete event.
+
+    Attributes:
+        name (str)
+        args (dict[str, Any]): Shown with the event (ie: sizes).
+    """
+
+    def __init__(self, tracer: "Tracer", name: str, args: dict[str, Any]) -> None:
+        self.name = name
+        self.args = args
+        self._tracer = tracer
+        self._start = 0.0
+
+    def __enter__(self) -> "Span":
+        self._start = now_us()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        if exc_type:
+            self.args["error"] = exc_type.__name__
+        self._tracer.complete(self.name, self._start, now_us(), **self.args)
+
+
+class Tracer:
+    """Collects trace events (from any thread) and writes them on exit.
+
+    Attributes:
+        path (Optional[str]): File trace is written to (None if disabled).
+
+    Methods:
+        start(path: str) -> None: Enable tracing (to file at path).
+        span(name: str, **args: Any) -> AbstractContextManager:
+            Trace duration of a block.
+        instant(name: str, **args: Any) -> None: Trace a point in time.
+        complete(name: str, start: float, end: float, **args: Any) -> None:
+            Trace a duration that already passed (timestamps in µs).
+        write() -> None: Write trace (as Chrome trace event JSON).
+    """
+
+    def __init__(self) -> None:
+        self.path: Optional[str] = None
+        self._events: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def start(self, path: str) -> None:
+        if self.path is None:
+            atexit.register(self.write)
+        self.path = path
+
+    def span(self, name: str, **args: Any) -> AbstractContextManager:
+        if self.path is None:
+            return NULL_SPAN
+        return Span(self, name, args)
+
+    def instant(self, name: str, **args: Any) -> None:
+        if self.path is not None:
+            self._record({"name": name, "ph": "i", "s": "t", "ts": now_us()}, args)
+
+    def complete(self, name: str, start: float, end: float, **args: Any) -> None:
+        if self.path is not None:
+            self._record(
+                {"name": name, "ph": "X", "ts": start, "dur": end - start}, args
+            )
+
+    def _record(self, event: dict[str, Any], args: dict[str, Any]) -> None:
+        event.update(
+            cat=event["name"].split(".", 1)[0],
+            pid=os.getpid(),
+            tid=threading.get_ident(),
+        )
+        if args:
+            event["args"] = args
+
+        with self._lock:
+            self._events.append(event)
+
+    def write(self) -> None:
+        """Write trace (as Chrome trace event JSON)."""
+        if self.path is None:
+            return
+
+        with self._lock:
+            events = list(self._events)
+
+        thread_names = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "tid": thread.ident,
+                "args": {"name": thread.name},
+            }
+            for thread in threading.enumerate()
+        ]
+
+        with open(os.path.expanduser(self.path), "w") as file:
+            json.dump(
+                {"traceEvents": thread_names + events, "displayTimeUnit": "ms"},
+                file,
+                default=str,  # (ie: enums in args)
+            )
+
+
+tracer = Tracer()
+
+if os.environ.get(TRACE_ENV):
+    tracer.start(os.environ[TRACE_ENV])
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Decorator tracing calls of function (as spans named `name`)."""
+
+    def decorator(function: F) -> F:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if tracer.path is None:
+                return function(*args, **kwargs)
+            with Span(tracer, name, {}):
+                return function(*args, **kwargs)
+
+        return wrapper  # type: ignore
+
+    return decorator
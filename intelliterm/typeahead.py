@@ -0,0 +1,132 @@
+"""Type-ahead: input typed while a response is streaming.
+
+Keystrokes are read in a background thread (with the terminal in cbreak mode, so
+Ctrl-C still interrupts), echoed below the streamed response and collected into
+lines, so the next prompts can be composed (and queued) before the response ends.
+"""
+
+import codecs
+import os
+import select
+import sys
+import threading
+from collections import deque
+from types import TracebackType
+from typing import Any, Callable, Optional
+
+from rich.console import Group, RenderableType
+from rich.text import Text
+
+try:
+    import termios
+    import tty
+except ImportError:  # (ie: Windows)
+    termios = None  # type: ignore
+
+# Seconds between checks for stop (while waiting for keystrokes)
+POLL_INTERVAL = 0.05
+BACKSPACE = ("\x7f", "\b")
+KILL_LINE = "\x15"  # (Ctrl-U)
+
+
+class TypeAhead:
+    """Collects input typed while a response is streaming (use as context manager).
+
+    Args:
+        on_line (Optional[Callable[[str], bool]]): Called (from the reading thread)
+            with each line entered, returns True if it handled the line (otherwise,
+            line is queued in `lines`).
+        text (str): Line typed so far (ie: typed ahead of a previous response).
+            Defaults to "".
+
+    Attributes:
+        lines (deque[str]): Lines entered (not handled by `on_line`).
+        text (str): Line being typed.
+
+    Methods:
+        feed(text: str) -> None:
+            Handle typed text (ie: keystrokes).
+    """
+
+    def __init__(
+        self, on_line: Optional[Callable[[str], bool]] = None, text: str = ""
+    ) -> None:
+        self.lines: deque[str] = deque()
+        self.text = text
+        self._on_line = on_line
+        self._escape = ""  # (escape sequence being read, ie: arrow keys)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._attrs: Optional[list[Any]] = None
+
+    def __enter__(self) -> "TypeAhead":
+        if termios is None or not sys.stdin.isatty():
+            return self
+
+        fd = sys.stdin.fileno()
+        self._attrs = termios.tcgetattr(fd)
+        tty.setcbreak(fd)
+
+        self._thread = threading.Thread(target=self._read, args=(fd,), daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self._stop.set()
+
+        if self._thread:
+            self._thread.join()
+        if self._attrs:
+            termios.tcsetattr(sys.stdin.fileno(), termios.TCSADRAIN, self._attrs)
+
+    def __rich__(self) -> RenderableType:
+        if not self.text and not self.lines:
+            return Group()  # (renders nothing)
+
+        queued = f" ({len(self.lines)} queued)" if self.lines else ""
+        text = Text(f"\n> {self.text}", style="bold")
+        text.append(queued, style="black")
+        return text
+
+    def _read(self, fd: int) -> None:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+
+        while not self._stop.is_set():
+            ready, _, _ = select.select([fd], [], [], POLL_INTERVAL)
+
+            if ready:
+                data = os.read(fd, 1024)
+                if not data:
+                    return
+                self.feed(decoder.decode(data))
+
+    def feed(self, text: str) -> None:
+        """Handle typed text (ie: keystrokes).
+
+        Args:
+            text (str)
+        """
+        for char in text:
+            if self._escape:
+                self._escape += char
+                # (sequences end with a letter or `~`, ie: `\x1b[A`, `\x1b[3~`)
+                if len(self._escape) > 2 and (char.isalpha() or char == "~"):
+                    self._escape = ""
+            elif char == "\x1b":
+                self._escape = char
+            elif char in ("\r", "\n"):
+                line, self.text = self.text, ""
+
+                if line.strip() and not (self._on_line and self._on_line(line)):
+                    self.lines.append(line)
+            elif char in BACKSPACE:
+                self.text = self.text[:-1]
+            elif char == KILL_LINE:
+                self.text = ""
+            elif char.isprintable():
+                self.text += char
@@ -1,9 +1,15 @@
+from enum import Enum
 from typing import Literal, TypedDict
 
 
 AutoCopy = Literal['off', 'all', 'code']
 
 
+class Backend(Enum):
+    OPENAI = "OPENAI"
+    ANTHROPIC = "ANTHROPIC"
+
+
 class Colors(TypedDict):
     """Color definitions (for type hints).
     """
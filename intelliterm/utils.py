@@ -1,13 +1,17 @@
-import datetime
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 import re
+from typing import Optional
 
 import intelliterm
 from intelliterm.constants import (
     LOGS_DIR,
     SAVED_CHATS_DIR,
 )
+from intelliterm.files import BYTES_PER_TOKEN
 
 
 TIPS = {
@@ -20,21 +24,164 @@ TIPS = {
 }
 
 
+# Log files (one per process, as rotating a file shared by processes isn't safe:
+# one would rename it from under the others), rotated when larger than
+# LOG_MAX_BYTES or older than LOG_MAX_AGE
+LOG_PREFIX = f"{intelliterm.__name__}."
+LOG_MAX_BYTES = 1024 * 1024
+LOG_MAX_AGE = 24 * 60 * 60  # (seconds)
+# Rotated log files kept (per process)
+LOG_BACKUPS = 5
+# Processes whose log files are kept once they ended (most recently written first)
+LOG_MAX_RUNS = 20
+# Logged messages (ie: prompts) are truncated to this many characters
+LOG_MAX_CHARS = 2000
+
+
+class LogFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """Log file handler, rotating the file by age and by size (keeping `backups`
+    rotated files).
+    """
+
+    def __init__(
+        self, filename: str, max_bytes: int, max_age: int, backups: int
+    ) -> None:
+        super().__init__(
+            filename,
+            when="S",
+            interval=max_age,
+            backupCount=backups,
+            encoding="utf-8",
+            delay=True,
+        )
+        self.max_bytes = max_bytes
+
+    def rotation_filename(self, default_name: str) -> str:
+        # (named by time of rotation, so rotating by size more than once a second
+        # would replace the previous file)
+        name, i = default_name, 0
+
+        while os.path.exists(name):
+            i += 1
+            name = f"{default_name}.{i}"
+        return name
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if super().shouldRollover(record):
+            return True
+        try:
+            return os.path.getsize(self.baseFilename) >= self.max_bytes
+        except OSError:
+            return False
+
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """Queues records as they are, so they're formatted (and written) by the
+    listener's thread, off the hot path.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class LogFormatter(logging.Formatter):
+    """Formatter truncating long messages (to LOG_MAX_CHARS)."""
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = shorten(record.message)
+        return super().formatMessage(record)
+
+
+def shorten(text: str, max_chars: int = LOG_MAX_CHARS) -> str:
+    """Truncate text (ie: a large payload to log) to `max_chars` characters."""
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}… ({len(text)} chars)"
+
+
 def setup_logging() -> None:
     """Setup logging.
+
+    Records are queued (logging doesn't block) and written to the rotated log
+    file of this process by a background thread.
     """
     log_format = (
         "[%(asctime)s] %(levelname)s:%(name)s.%(module)s:%(funcName)s: " + "%(message)s"
     )
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filename = os.path.join(LOGS_DIR, f"{intelliterm.__name__}_logs_{timestamp}.log")
-    logging.basicConfig(
-        level=logging.INFO,
-        filename=filename,
-        format=log_format,
-        datefmt="%Y-%m-%d %H:%M:%S",
+    path = os.path.join(LOGS_DIR, f"{LOG_PREFIX}{os.getpid()}.log")
+    handler = LogFileHandler(path, LOG_MAX_BYTES, LOG_MAX_AGE, LOG_BACKUPS)
+    handler.setFormatter(LogFormatter(log_format, datefmt="%Y-%m-%d %H:%M:%S"))
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, handler)
+    listener.start()
+    atexit.register(listener.stop)  # (writes queued records)
+
+    logging.basicConfig(level=logging.INFO, handlers=[LogQueueHandler(records)])
+    remove_old_logs()
+    remove_legacy_logs()
+
+
+def remove_old_logs(keep: int = LOG_MAX_RUNS) -> None:
+    """Remove log files of ended processes, but those of the `keep` most recently
+    written (files of running processes, ie: the daemon, are never removed)."""
+    runs: dict[str, list[tuple[float, str]]] = {}
+
+    with os.scandir(LOGS_DIR) as entries:
+        for entry in entries:
+            if entry.name.startswith(LOG_PREFIX):
+                # (`intelliterm.<pid>.log`, and its rotated files)
+                pid = entry.name[len(LOG_PREFIX) :].split(".")[0]
+                try:
+                    runs.setdefault(pid, []).append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass  # (ie: removed by another process)
+
+    ended = sorted(
+        (logs for pid, logs in runs.items() if not is_running(pid)),
+        key=max,
+        reverse=True,
     )
 
+    for logs in ended[keep:]:
+        for _, path in logs:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def is_running(pid: str) -> bool:
+    """Check if process is running (False if `pid` isn't one, ie: old log name)."""
+    if not pid.isdigit() or int(pid) <= 0:
+        return False
+    if os.name == "nt":
+        return True  # (signal 0 would terminate it)
+
+    try:
+        os.kill(int(pid), 0)
+    except PermissionError:
+        return True  # (of another user)
+    except OSError:
+        return False
+    return True
+
+
+def remove_legacy_logs(keep: int = LOG_BACKUPS) -> None:
+    """Remove log files of previous versions (one per run), but the latest `keep`."""
+    legacy_prefix = f"{intelliterm.__name__}_logs_"
+
+    with os.scandir(LOGS_DIR) as entries:
+        legacy = sorted(
+            entry.path for entry in entries if entry.name.startswith(legacy_prefix)
+        )
+
+    for path in legacy[: max(len(legacy) - keep, 0)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
 
 logger = logging.getLogger(intelliterm.__name__)
 
@@ -67,20 +214,44 @@ def longest_line(s: str) -> int:
     return max(len(line) for line in s.split("\n"))
 
 
-def get_file_info(path: str) -> dict[str, str]:
+def format_size(size: int) -> str:
+    """Format size (in bytes) as human-readable string (ie: `1.5 KiB`)."""
+    value = float(size)
+    for unit in ("B", "KiB", "MiB"):
+        if value < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GiB"
+
+
+def get_file_info(path: str, content: Optional[str] = None) -> dict[str, str]:
     """Get file information for file at path.
     
     Args:
         path (str): Path to file.
+        content (Optional[str]): File content (if already read). Without it, the
+            token count is estimated from the file size. Defaults to None.
             
     Returns:
         dict[str, str]: Dictionary containing file info.
     """
-    return {
+    size = os.path.getsize(path)
+    info = {
         "path": path,
         "type": os.path.splitext(path)[1][1:].lower(),
+        "size": format_size(size),
     }
 
+    if content is None:
+        info["tokens"] = f"~{size // BYTES_PER_TOKEN}"
+    else:
+        from intelliterm.prompt import count_tokens
+
+        lines = content.count("\n") + int(bool(content) and content[-1] != "\n")
+        info["lines"] = str(lines)
+        info["tokens"] = str(count_tokens(content))
+    return info
+
 
 def is_git_diff(content: str) -> bool:
     """Check if content of string is a git diff.
@@ -0,0 +1,202 @@
+"""Warm interpreter pool for running Python code.
+
+A long-lived interpreter (the "zygote", see `intelliterm.zygote`) starts in the
+background, imports the configured modules once and then waits. Each run is a fork
+of it: the fork starts in milliseconds with modules already imported, and, being a
+copy, always starts from the same pristine state (ie: nothing leaks between runs).
+
+The zygote runs on the same interpreter as cold runs (see
+`intelliterm.execution.python`), so code behaves the same either way.
+"""
+
+import asyncio
+import atexit
+import json
+import os
+import socket
+import subprocess
+from typing import IO, Optional
+
+from intelliterm import zygote
+from intelliterm.execution import RunResult, python, supervise
+
+
+class PreloadError(ImportError):
+    """Raised when modules to preload failed to be imported (the interpreter
+    exited)."""
+
+
+class WarmPool:
+    """Client of a warm (forking) Python interpreter.
+
+    Attributes:
+        preload (tuple[str, ...]): Modules the interpreter imported upfront.
+        error (Optional[str]): Why the interpreter failed to start (ie: modules
+            it failed to import), not restarted with the same modules then.
+
+    Methods:
+        start(preload: tuple[str, ...] = ()) -> None: Start interpreter (in the
+            background, if not running yet).
+        is_running() -> bool
+        is_started() -> bool
+        stop() -> None
+        run_async(code: str, timeout: float, memory_mb: int) -> RunResult:
+            Run code in a fork of the interpreter.
+    """
+
+    def __init__(self) -> None:
+        self.preload: tuple[str, ...] = ()
+        self.error: Optional[str] = None
+        self._process: Optional[subprocess.Popen] = None
+        self._socket: Optional[socket.socket] = None
+        self._replies: Optional[IO[bytes]] = None
+        self._ready = False
+
+    def start(self, preload: tuple[str, ...] = ()) -> None:
+        """Start interpreter (returns immediately, modules are imported in the
+        background). Restarted if modules to preload changed.
+
+        Args:
+            preload (tuple[str, ...]): Modules to import upfront.
+        """
+        if preload == self.preload and (self.is_running() or self.error):
+            return
+        self.stop()
+
+        self.preload, self.error = preload, None
+        self._socket, child_socket = socket.socketpair()
+
+        with child_socket:
+            fd = child_socket.fileno()
+            try:
+                self._process = subprocess.Popen(
+                    [python(), zygote.__file__, str(fd), *preload],
+                    pass_fds=(fd,),
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    start_new_session=True,  # (not interrupted by Ctrl-C)
+                )
+            except OSError as e:
+                self.error = str(e)  # (ie: python3 is not installed)
+                self._socket.close()
+                self._socket = None
+                return
+
+        self._replies = self._socket.makefile("rb")
+
+    def is_running(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def is_started(self) -> bool:
+        """Check if interpreter was started (and not stopped since), even if it
+        exited (its reply, ie: why, is read by the next run)."""
+        return self._process is not None
+
+    def stop(self) -> None:
+        """Stop interpreter (it exits once its control socket is closed)."""
+        if self._replies and self._socket:
+            self._replies.close()
+            self._socket.close()
+        if self._process:
+            try:
+                self._process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+
+        self._process = self._socket = self._replies = None
+        self._ready = False
+
+    def _reply(self) -> int:
+        return int(self._readline())
+
+    def _readline(self) -> bytes:
+        assert self._replies
+        line = self._replies.readline()
+
+        if not line:
+            raise ConnectionError("Warm interpreter exited")
+        return line
+
+    def _wait_ready(self) -> None:
+        """Wait for modules to be imported (once).
+
+        Raises:
+            PreloadError: If some failed to be.
+        """
+        if self._ready:
+            return
+
+        errors = json.loads(self._readline())
+        if errors:
+            self.error = "; ".join(errors)
+            raise PreloadError(self.error)
+        self._ready = True
+
+    async def run_async(self, code: str, timeout: float, memory_mb: int) -> RunResult:
+        """Run code in a fork of the interpreter, streaming its output live.
+
+        Args:
+            code (str)
+            timeout (float): Wall-clock limit (in seconds).
+            memory_mb (int): Memory limit (in MiB).
+
+        Returns:
+            RunResult
+
+        Raises:
+            OSError: If the interpreter is not running (anymore).
+            PreloadError: If modules to preload failed to be imported.
+        """
+        if not self._socket:
+            raise ConnectionError("Warm interpreter is not running")
+        self._wait_ready()
+
+        data = code.encode()
+        header = {"cwd": os.getcwd(), "memory_mb": memory_mb, "size": len(data)}
+        stdout_read, stdout_write = os.pipe()
+        stderr_read, stderr_write = os.pipe()
+
+        try:
+            socket.send_fds(
+                self._socket,
+                [json.dumps(header).encode() + b"\n"],
+                [stdout_write, stderr_write],
+            )
+            self._socket.sendall(data)
+        except OSError:
+            os.close(stdout_read)
+            os.close(stderr_read)
+            raise
+        finally:
+            os.close(stdout_write)
+            os.close(stderr_write)
+
+        loop = asyncio.get_running_loop()
+        transports = []
+
+        async def reader(fd: int) -> asyncio.StreamReader:
+            stream = asyncio.StreamReader()
+            transport, _ = await loop.connect_read_pipe(
+                lambda: asyncio.StreamReaderProtocol(stream), os.fdopen(fd, "rb", 0)
+            )
+            transports.append(transport)
+            return stream
+
+        try:
+            pid = self._reply()
+            stdout, stderr = await reader(stdout_read), await reader(stderr_read)
+            # (reply with exit code is blocking, wait for it in a thread)
+            exited = loop.run_in_executor(None, self._reply)
+            return await supervise("python", pid, stdout, stderr, exited, timeout)
+        finally:
+            for transport in transports:
+                transport.close()
+            if len(transports) < 2:
+                os.close(stderr_read)
+                if not transports:
+                    os.close(stdout_read)
+
+
+pool = WarmPool()
+atexit.register(pool.stop)
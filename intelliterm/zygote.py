@@ -0,0 +1,144 @@
+"""Zygote of the warm interpreter pool (see `intelliterm.warm_pool`).
+
+Started as `<python3> zygote.py <fd> [modules...]`, with the interpreter code
+blocks are run with (not necessarily the one running intelliterm, so only the
+standard library is imported). `<fd>` is its end of a control socket. Once
+modules are imported, it replies with the list of those that failed to be (as a
+JSON line). Per run, it then receives a header line (`{"cwd": ..., "memory_mb":
+..., "size": ...}`) with the pipes to write output to attached, then the code; it
+replies with the run's pid, and (when done) its exit code, each on its own line.
+"""
+
+import gc
+import importlib
+import json
+import os
+import socket
+import sys
+import traceback
+import types
+
+try:
+    import resource
+except ImportError:  # (ie: Windows)
+    resource = None  # type: ignore
+
+# Max size of the header line
+HEADER_SIZE = 4096
+
+
+def execute(code: bytes) -> int:
+    """Execute code as `__main__` (like `python -c`), returning exit code."""
+    main = types.ModuleType("__main__")
+    sys.modules["__main__"] = main
+    sys.argv = ["-c"]
+
+    try:
+        exec(compile(code, "<string>", "exec"), main.__dict__)
+        return 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except BaseException as e:
+        # (skip this frame, like `python -c` would)
+        assert e.__traceback__
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        return 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+
+def fork(control: socket.socket, header: dict, fds: list[int], code: bytes) -> int:
+    """Fork a run (child never returns).
+
+    Returns:
+        int: Child pid.
+    """
+    pid = os.fork()
+
+    if pid:
+        for fd in fds:
+            os.close(fd)
+        return pid
+
+    exit_code = 1
+    try:
+        os.setsid()  # (own process group, killed as a whole)
+        control.close()
+        os.dup2(fds[0], 1)
+        os.dup2(fds[1], 2)
+        for fd in fds:
+            os.close(fd)
+
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.close(devnull)
+
+        if resource is not None:
+            limit = header["memory_mb"] * 2**20
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+        os.chdir(header["cwd"])
+        sys.stdout.reconfigure(line_buffering=True)  # type: ignore
+        exit_code = execute(code)
+    finally:
+        os._exit(exit_code)
+
+
+def serve(control: socket.socket) -> None:
+    """Serve runs (one at a time) until control socket is closed."""
+    replies = control.makefile("wb", buffering=0)
+
+    while True:
+        data, fds, _, _ = socket.recv_fds(control, HEADER_SIZE, 2)
+
+        if not data:
+            return
+
+        line, _, code = data.partition(b"\n")
+        header = json.loads(line)
+
+        while len(code) < header["size"]:
+            chunk = control.recv(header["size"] - len(code))
+            if not chunk:
+                return
+            code += chunk
+
+        pid = fork(control, header, fds, code)
+        replies.write(f"{pid}\n".encode())
+
+        _, status = os.waitpid(pid, 0)
+        replies.write(f"{os.waitstatus_to_exitcode(status)}\n".encode())
+
+
+def main(args: list[str]) -> None:
+    """Import modules, reply with the errors of those that failed to (then exit),
+    or an empty list (then serve runs)."""
+    # (run as a script, not `-c`: import from the working directory, not ours)
+    sys.path[0] = ""
+    control = socket.socket(fileno=int(args[0]))
+    errors: list[str] = []
+
+    for module in args[1:]:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            errors.append(f"{module}: {type(e).__name__}: {e}")
+
+    try:
+        control.sendall(json.dumps(errors).encode() + b"\n")
+        if errors:
+            return
+
+        # (keep preloaded objects out of collections, so forks share their pages)
+        gc.freeze()
+        serve(control)
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
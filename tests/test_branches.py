@@ -0,0 +1,57 @@
+from unittest import TestCase
+
+from intelliterm.branches import MAIN, BranchTree
+from intelliterm.prompt import Prompt
+
+
+class TestBranchTree(TestCase):
+    def setUp(self) -> None:
+        self.turns = [Prompt(content=f"turn {i}") for i in range(4)]
+        self.tree = BranchTree(self.turns)
+
+    def test_fork_shares_turns(self) -> None:
+        name = self.tree.fork(2)
+        self.assertEqual(name, self.tree.current)
+
+        retry = Prompt(content="retry")
+        self.tree.append([retry])
+        context = self.tree.context()
+
+        self.assertEqual(self.turns[:2] + [retry], context)
+        self.assertIs(self.turns[1], context[1])  # (not copied)
+        self.assertEqual([retry], self.tree.branches[name].turns)
+        self.assertEqual(self.turns, self.tree.checkout(MAIN))
+
+    def test_fork_within_shared_turns(self) -> None:
+        first = self.tree.fork(3, "first")
+        second = self.tree.fork(1, "second")
+
+        # (forked from main, as "first" only shares its turns)
+        self.assertEqual(MAIN, self.tree.branches[second].parent)
+        self.assertEqual(MAIN, self.tree.branches[first].parent)
+        self.assertEqual(self.turns[:1], self.tree.context())
+
+        with self.assertRaises(ValueError):
+            self.tree.fork(0, "first")
+
+    def test_serialized_once(self) -> None:
+        self.tree.fork(2, "retry")
+        self.tree.append([Prompt(content="retried"), Prompt(content="response")])
+        context = self.tree.context()
+
+        dict = self.tree.serialize()
+        self.assertEqual(
+            [["turn 2", "turn 3"], []],  # (others are in context)
+            [
+                [prompt["content"] for prompt in branch["turns"]]
+                for branch in dict["branches"]
+            ],
+        )
+
+        tree = BranchTree.from_dict(dict, context)
+        self.assertEqual("retry", tree.current)
+        self.assertIs(context[0], tree.context(MAIN)[0])  # (shared once loaded)
+        self.assertEqual(
+            [prompt.content for prompt in self.turns],
+            [prompt.content for prompt in tree.context(MAIN)],
+        )
@@ -40,3 +40,83 @@ class TestChat(TestCase):
                             prompt.content,
                             contents_json["_context"][i]["content"],
                         )
+
+    @mock.patch("intelliterm.chat.notification")
+    def test_load_keeps_session(self, notification: Any) -> None:
+        saved = Chat()
+        saved.context([Prompt(content="saved")])
+
+        with TemporaryDirectory() as test_dir:
+            with open(os.path.join(test_dir, "saved.json"), "w") as file:
+                file.write(json.dumps(saved.serialize()))
+
+            self.chat.autocopy = "code"
+            self.chat._queue.append("typed ahead")
+            index = self.chat._index = mock.Mock()
+
+            with mock.patch("intelliterm.chat.SAVED_CHATS_DIR", test_dir):
+                self.chat.load("saved")
+
+        self.assertEqual(saved.chat_id, self.chat.chat_id)
+        self.assertEqual(
+            [p.content for p in saved._context], [p.content for p in self.chat._context]
+        )
+        self.assertEqual("saved", self.chat._store.messages()[-1]["content"])
+        self.assertEqual(
+            ("code", ["typed ahead"], index),
+            (self.chat.autocopy, list(self.chat._queue), self.chat._index),
+        )
+
+    @mock.patch.object(Chat, "info", return_value="")
+    @mock.patch("intelliterm.chat.console")
+    @mock.patch("intelliterm.chat.Client")
+    def test_ask_without_chunks_if_retrieval_fails(
+        self, client: Any, console: Any, info: Any
+    ) -> None:
+        self.chat._index = mock.Mock()
+        self.chat._index.update.side_effect = PermissionError("denied")
+        attachments: list[Any] = []
+
+        def get_response(*args: Any, **kwargs: Any) -> str:
+            attachments.append(self.chat._store.attachment)
+            return "response"
+
+        client.return_value.get_response.side_effect = get_response
+        client.return_value.measurement = None
+
+        self.chat.ask(Prompt(content="question"))
+
+        self.assertEqual([None], attachments)
+        self.assertEqual("response", self.chat._context[-1].content)
+        console.warning.assert_called_once()
+
+    @mock.patch.object(Chat, "ask")
+    def test_retry(self, ask: Any) -> None:
+        self.chat.context(Prompt(content="response", role="assistant"))
+        context = self.chat._context
+
+        self.chat.retry([])
+
+        self.assertEqual(context[:3], self.chat._context)
+        self.assertEqual("three", ask.call_args.args[0].content)
+
+        # (saved with its branches, and loaded back)
+        self.chat.context(ask.call_args.args[0])
+        chat = Chat.deserialize(json.dumps(self.chat.serialize()))
+        chat.checkout("main")
+        self.assertEqual(
+            [prompt.content for prompt in context],
+            [prompt.content for prompt in chat._context],
+        )
+
+    def test_independent_commands_run_on_main_thread(self) -> None:
+        self.assertFalse(self.chat.handle_independent("a prompt"))
+        self.assertTrue(self.chat.handle_independent("!help"))
+        self.assertTrue(self.chat.handle_independent("!version"))
+
+        failing = mock.patch.object(Chat, "handle", side_effect=[ValueError, None])
+        with failing as handle, mock.patch("intelliterm.chat.console") as console:
+            self.chat.run_independent()  # (errors are reported, not raised)
+
+        self.assertEqual(2, handle.call_count)
+        console.error.assert_called_once()
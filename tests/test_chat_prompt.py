@@ -9,3 +9,50 @@ class TestPrompt(TestCase):
         num_tokens = dummy_prompt.token_count()
 
         self.assertEqual(7, num_tokens)
+
+    def test_code_extracted_while_streaming(self) -> None:
+        content = "intro\n```python\nprint(1)\n\nprint(2)\n```\ntext\n~~~\nls | wc\n~~~"
+        response = Prompt(role="assistant")
+
+        for i in range(0, len(content), 3):
+            response.append(content[i : i + 3])
+            if i == 39:
+                # first block available as soon as it's closed (ie: mid-stream)
+                self.assertEqual("```\ntex", response.content[-7:])
+                self.assertEqual(
+                    ["print(1)\n\nprint(2)"],
+                    [code.code for code in response.parse_code()],
+                )
+        response.finish()
+
+        blocks = response.parse_code()
+        self.assertEqual(["python", ""], [code.language for code in blocks])
+        self.assertEqual("ls | wc", blocks[1].code)
+        self.assertEqual(
+            [code.code for code in blocks],
+            [content[code.start : code.end] for code in blocks],  # type: ignore
+        )
+
+    def test_appended_deltas(self) -> None:
+        response = Prompt(role="assistant")
+
+        for delta in ["a", "b", "c"]:
+            response.append(delta)
+        self.assertEqual(["a", "b", "c"], response._deltas)  # (not joined yet)
+        self.assertEqual("abc", response.content)
+
+        response.append("d")
+        self.assertEqual("abcd", response.content)
+
+        response.append("e")
+        response.content = "set"
+        self.assertEqual("set", response.content)
+
+    def test_code_extracted_once_from_set_content(self) -> None:
+        prompt = Prompt(content="```js\nconsole.log(1)\n```")
+
+        self.assertEqual("console.log(1)", prompt.parse_code()[0].code)
+        self.assertIs(prompt.parse_code(), prompt.parse_code())
+
+        prompt.content = "no code"
+        self.assertEqual([], prompt.parse_code())
@@ -0,0 +1,53 @@
+import threading
+import time
+from typing import Any
+from unittest import TestCase, mock
+
+from intelliterm.chunking import chunk_text, map_chunks
+
+
+class WordEncoding:
+    """Tokenizer stub (1 word = 1 token)."""
+
+    def encode(self, text: str) -> list[str]:
+        return text.split(" ") if text else []
+
+    def decode(self, tokens: list[str]) -> str:
+        return " ".join(tokens)
+
+
+@mock.patch("intelliterm.prompt.get_encoding", lambda model: WordEncoding())
+@mock.patch("intelliterm.chunking.get_encoding", lambda model: WordEncoding())
+class TestChunking(TestCase):
+    def test_chunk_text(self) -> None:
+        lines = ["one two\n", "three\n", "four five six\n", "seven\n"]
+        chunks = list(chunk_text(iter(lines), max_tokens=3, model="gpt"))
+
+        self.assertEqual(["one two\nthree\n", "four five six\n", "seven\n"], chunks)
+
+    def test_chunk_text_splits_long_lines(self) -> None:
+        chunks = list(chunk_text(["a b c d e"], max_tokens=2, model="gpt"))
+
+        self.assertEqual(["a b", "c d", "e"], chunks)
+
+    def test_map_chunks(self) -> None:
+        lock = threading.Lock()
+        running = 0
+        max_running = 0
+
+        def process(part: int, chunk: str) -> str:
+            nonlocal running, max_running
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+            time.sleep(0.01 * (part % 3))
+            with lock:
+                running -= 1
+            return f"{part}:{chunk}"
+
+        done: list[Any] = []
+        results = map_chunks(process, (str(i) for i in range(20)), 4, done.append)
+
+        self.assertEqual([f"{i + 1}:{i}" for i in range(20)], results)
+        self.assertLessEqual(max_running, 4)
+        self.assertEqual(list(range(1, 21)), done)
@@ -1,8 +1,18 @@
 from collections import defaultdict
+from pathlib import Path
+from typing import Any
 
 import pytest
+from prompt_toolkit.document import Document
 
-from intelliterm.command_palette import Command, CommandPalette
+from intelliterm.command_palette import (
+    Command,
+    CommandCompleter,
+    CommandPalette,
+    PathCache,
+    Trie,
+    toolbar,
+)
 
 
 class TestCommandPalette:
@@ -59,3 +69,54 @@ class TestCommandPalette:
         }
 
         assert not overlaps, f"Overlapping aliases: {overlaps}"
+
+    def test_toolbar(self) -> None:
+        toolbar.cache_clear()
+
+        assert "<strong>GPT3</strong>" in toolbar("", "GPT3").value
+        assert "Unknown command" in toolbar("!bla", "GPT3").value
+        assert "<strong>!config</strong>" in toolbar("!config", "GPT3").value
+        assert toolbar("!config", "GPT3") is toolbar("!config", "GPT3")  # cached
+
+
+class TestCommandCompleter:
+    def complete(self, text: str) -> list[str]:
+        completer = CommandCompleter()
+        return [c.text for c in completer.get_completions(Document(text), None)]
+
+    def test_trie(self) -> None:
+        trie = Trie([("cfg", 1), ("config", 2), ("copy", 3), ("c", 4)])
+
+        assert [("c", 4), ("cfg", 1), ("config", 2), ("copy", 3)] == sorted(
+            trie.complete("c")
+        )
+        assert [("config", 2)] == list(trie.complete("con"))
+        assert [] == list(trie.complete("x"))
+
+    def test_complete_aliases(self) -> None:
+        assert ["!config", "!copy"] == sorted(self.complete("!co"))
+        assert [] == self.complete("co")  # (not a command)
+
+    def test_complete_options(self) -> None:
+        assert ["code"] == self.complete("!copy c")
+        assert "edit" in self.complete("!config e")
+
+    def test_complete_paths(self, tmp_path: Path, monkeypatch: Any) -> None:
+        (tmp_path / "src").mkdir()
+        (tmp_path / "src" / "main.py").write_text("")
+        (tmp_path / ".env").write_text("")
+        monkeypatch.chdir(tmp_path)
+
+        assert ["src/"] == self.complete("!file s")
+        assert ["src/main.py"] == self.complete("!f README.md src/m")
+        assert [".env"] == self.complete("!f .")
+
+    def test_path_cache(self, tmp_path: Path) -> None:
+        cache = PathCache(ttl=60)
+        assert [] == list(cache.list(str(tmp_path)).complete(""))
+
+        (tmp_path / "new.txt").write_text("")
+        assert [] == list(cache.list(str(tmp_path)).complete(""))  # cached
+
+        cache.ttl = 0
+        assert ["new.txt"] == [n for n, _ in cache.list(str(tmp_path)).complete("")]
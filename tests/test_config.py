@@ -0,0 +1,100 @@
+import os
+from configparser import ConfigParser
+from tempfile import TemporaryDirectory
+from unittest import TestCase, mock
+
+from intelliterm.config import Config
+from intelliterm.types import Backend
+
+
+class TestConfig(TestCase):
+    def setUp(self) -> None:
+        self.test_dir = TemporaryDirectory()
+        self.config_path = os.path.join(self.test_dir.name, "config.ini")
+        self.patch = mock.patch.object(Config, "CONFIG_PATH", self.config_path)
+        self.patch.start()
+        self.config = Config()
+
+    def tearDown(self) -> None:
+        self.patch.stop()
+        self.test_dir.cleanup()
+
+    def write(self, content: str) -> None:
+        with open(self.config_path, "w") as file:
+            file.write(content)
+        # make sure mtime changes (filesystem timestamps can be coarse)
+        mtime = (self.config._mtime or 0) + 1
+        os.utime(self.config_path, (mtime, mtime))
+
+    def test_default_settings(self) -> None:
+        settings = self.config.settings()
+
+        self.assertEqual("GPT3", settings.name)
+        self.assertEqual(Backend.OPENAI, settings.backend)  # case-insensitive
+        self.assertEqual(0.0, settings.temperature)
+
+    def test_reload_on_change(self) -> None:
+        self.write(
+            "[DEFAULT]\nbackend = anthropic\nmodel = claude\ntemperature = 0.5\n"
+            + "presence_penalty = 0\nfrequency_penalty = 0\naccent_color = red\n"
+            + "[OPUS]\n[CONFIG]\nactive = OPUS\n"
+        )
+        settings = self.config.settings()
+
+        self.assertEqual("OPUS", settings.name)
+        self.assertEqual(Backend.ANTHROPIC, settings.backend)
+        self.assertEqual(0.5, settings.temperature)
+
+    def test_cached_until_change(self) -> None:
+        with mock.patch.object(Config, "load") as load:
+            self.config.settings()
+            self.config.settings()
+            load.assert_not_called()
+
+    def test_invalid_keeps_last_valid(self) -> None:
+        self.write("[GPT3]\ntemperature = hot\n[CONFIG]\nactive = GPT3\n")
+
+        with mock.patch("intelliterm.config.console"):
+            settings = self.config.settings()
+
+        self.assertEqual("GPT3", settings.name)
+        self.assertEqual(0.0, settings.temperature)
+
+    def test_validate(self) -> None:
+        invalid = [
+            "[GPT3]\nmodel = gpt-4\n[CONFIG]\nactive = GPT3\n",  # missing properties
+            "[CONFIG]\nactive = GPT4\n",  # missing active section
+        ]
+
+        for content in invalid:
+            self.config.config = ConfigParser()
+            self.config.config.read_string(content)
+
+            with self.assertRaises(ValueError):
+                self.config.validate()
+
+    def test_select_is_session_local(self) -> None:
+        with open(self.config_path) as file:
+            before = file.read()
+
+        self.assertTrue(self.config.select("gpt4"))
+        self.assertEqual("GPT4", self.config.settings().name)
+        self.assertFalse(self.config.select("missing"))
+        self.assertEqual("GPT4", self.config.settings().name)
+
+        with open(self.config_path) as file:
+            self.assertEqual(before, file.read())  # file untouched
+
+        self.config.select(None)
+        self.assertEqual("GPT3", self.config.settings().name)
+
+    def test_save_active(self) -> None:
+        self.config.select("gpt4")
+
+        with mock.patch("intelliterm.config.notification"):
+            self.config.save_active()
+
+        other_session = Config()
+        self.assertEqual("GPT4", other_session.settings().name)
+        tmp_files = [f for f in os.listdir(self.test_dir.name) if ".config." in f]
+        self.assertEqual([], tmp_files)  # atomically replaced
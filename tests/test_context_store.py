@@ -0,0 +1,102 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from intelliterm.context_store import ContextStore, Segment
+from intelliterm.prompt import Prompt
+
+
+class TestSegment(TestCase):
+    def test_read_written(self) -> None:
+        segment = Segment()
+        texts = ["first", "", "ünïcødé 👽", "x" * 100_000]
+        locations = []
+
+        for text in texts:
+            locations.append(segment.write(text))
+            # (read while segment grows)
+            self.assertEqual(text, segment.read(*locations[-1]))
+
+        self.assertEqual(texts, [segment.read(*location) for location in locations])
+
+
+@mock.patch("intelliterm.prompt.count_tokens", lambda text, model=None: len(text))
+class TestContextStore(TestCase):
+    def test_old_large_turns_spilled(self) -> None:
+        store = ContextStore(keep_recent=2, spill_min_chars=10)
+        context = [Prompt(content="system", role="system")]
+        contents = ["large input " * 10, "small", "```sh\nls\n```\n" * 2, "recent"]
+
+        for content in contents:
+            context.append(Prompt(content=content))
+            store.trim(context)
+
+        self.assertEqual(
+            [False, True, False, False, False],
+            [prompt.is_spilled for prompt in context],
+        )
+        store.trim(context + [Prompt(), Prompt()])
+        self.assertTrue(context[3].is_spilled)
+
+        self.assertEqual(contents, [prompt.content for prompt in context[1:]])
+        self.assertEqual(["ls", "ls"], [code.code for code in context[3].parse_code()])
+
+    def test_spilled_content_replaced(self) -> None:
+        prompt = Prompt(content="x" * 20)
+        self.assertEqual(20, prompt.token_count())
+
+        prompt.spill(Segment())
+        with mock.patch.object(Segment, "read") as read:
+            self.assertEqual(20, prompt.token_count())  # (cached)
+            read.assert_not_called()
+
+        prompt.content = "new"
+        self.assertFalse(prompt.is_spilled)
+        self.assertEqual(("new", 3), (prompt.content, prompt.token_count()))
+
+    def test_messages_synced(self) -> None:
+        store = ContextStore(keep_recent=1, spill_min_chars=10)
+        context = [Prompt(content="system", role="system"), Prompt(content="hi")]
+        store.sync(context)
+        messages = store.messages()
+
+        context.append(Prompt(content="large response " * 10, role="assistant"))
+        context.append(Prompt(content="next"))
+        store.sync(context)
+        self.assertIs(messages, store.messages())  # (only new turns added)
+
+        store.trim(context)
+        self.assertTrue(context[2].is_spilled)
+        self.assertEqual([p.get_message() for p in context], store.messages())
+        self.assertEqual(
+            ("system", [p.get_message() for p in context[1:]]),
+            store.system_and_turns(),
+        )
+        self.assertEqual("", messages[2]["content"])  # (not held in memory)
+
+    def test_prompt_slotted(self) -> None:
+        with self.assertRaises(AttributeError):
+            Prompt().unknown = True  # type: ignore
+
+    def test_attachment_not_stored(self) -> None:
+        store = ContextStore()
+        context = [Prompt(content="system", role="system"), Prompt(content="hi")]
+        store.sync(context)
+
+        store.attachment = "chunks"
+        self.assertEqual("hi\n\nchunks", store.messages()[-1]["content"])
+        self.assertEqual("hi\n\nchunks", store.system_and_turns()[1][-1]["content"])
+
+        store.attachment = None
+        self.assertEqual("hi", store.messages()[-1]["content"])
+        self.assertEqual("hi", context[-1].content)
+
+    def test_segment_on_disk(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            with mock.patch("intelliterm.context_store.SPILL_DIR", directory):
+                store = ContextStore()
+            store.segment.write("spilled")
+
+            # (created in directory, and unlinked right away)
+            self.assertEqual(directory, store.segment._directory)
+            self.assertEqual([], os.listdir(directory))
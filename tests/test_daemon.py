@@ -0,0 +1,145 @@
+import io
+import os
+import threading
+from tempfile import TemporaryDirectory
+from typing import Any, Optional, TextIO
+from unittest import TestCase, mock
+
+from intelliterm import daemon
+from intelliterm.console import console
+
+
+class TestDaemon(TestCase):
+    def test_should_forward(self) -> None:
+        with TemporaryDirectory() as test_dir:
+            socket_path = os.path.join(test_dir, "daemon.sock")
+
+            with mock.patch("intelliterm.daemon.DAEMON_SOCKET_PATH", socket_path):
+                # no daemon
+                self.assertFalse(daemon.should_forward(["-m", "hi"]))
+
+                open(socket_path, "w").close()
+
+                with mock.patch("sys.stdin.isatty", return_value=True):
+                    self.assertTrue(daemon.should_forward(["-m", "hi"]))
+                    self.assertFalse(daemon.should_forward(["hi"]))  # interactive
+                    self.assertFalse(daemon.should_forward(["-m", "--version"]))
+
+                with mock.patch.dict(os.environ, {daemon.NO_DAEMON_ENV: "1"}):
+                    self.assertFalse(daemon.should_forward(["-m", "hi"]))
+
+    def test_forward(self) -> None:
+        def serve_request(request: dict[str, Any], stdin: Optional[TextIO]) -> None:
+            console.print(" ".join(request["args"]), end="")
+            raise SystemExit(3)
+
+        with TemporaryDirectory() as test_dir:
+            socket_path = os.path.join(test_dir, "daemon.sock")
+            server = daemon.Daemon(socket_path, daemon.DaemonRequestHandler)
+            thread = threading.Thread(target=server.handle_request)
+            thread.start()
+
+            stdout = io.TextIOWrapper(io.BytesIO())
+
+            with (
+                mock.patch("intelliterm.daemon.DAEMON_SOCKET_PATH", socket_path),
+                mock.patch("intelliterm.daemon.serve_request", serve_request),
+                mock.patch("sys.stdin.isatty", return_value=True),
+                mock.patch("sys.stdout", stdout),
+            ):
+                exit_code = daemon.forward(["-m", "hello"])
+
+            thread.join()
+            server.server_close()
+
+            self.assertEqual(3, exit_code)
+            self.assertEqual(b"-m hello", stdout.buffer.getvalue())  # type: ignore
+
+    def test_forward_env(self) -> None:
+        def serve_request(request: dict[str, Any], stdin: Optional[TextIO]) -> None:
+            env = request["env"]
+            console.print(env["EDITOR"], env["OPENAI_API_KEY"])
+
+        with TemporaryDirectory() as test_dir:
+            socket_path = os.path.join(test_dir, "daemon.sock")
+            server = daemon.Daemon(socket_path, daemon.DaemonRequestHandler)
+            thread = threading.Thread(target=server.handle_request)
+            thread.start()
+
+            stdout = io.TextIOWrapper(io.BytesIO())
+
+            with (
+                mock.patch("intelliterm.daemon.DAEMON_SOCKET_PATH", socket_path),
+                mock.patch("intelliterm.daemon.serve_request", serve_request),
+                mock.patch("sys.stdin.isatty", return_value=True),
+                mock.patch("sys.stdout", stdout),
+                mock.patch.dict(os.environ, {"EDITOR": "vim"}),
+            ):
+                os.environ.pop("OPENAI_API_KEY", None)
+                daemon.forward(["-m", "hello"])
+
+            thread.join()
+            server.server_close()
+
+            self.assertEqual(b"vim None\n", stdout.buffer.getvalue())  # type: ignore
+
+    def test_forward_stdin(self) -> None:
+        def serve_request(request: dict[str, Any], stdin: Optional[TextIO]) -> None:
+            assert stdin
+            console.print(stdin.readline(), end="")  # (read as it's streamed)
+            console.print(stdin.read(), end="")
+
+        read_fd, write_fd = os.pipe()
+
+        with TemporaryDirectory() as test_dir, open(read_fd) as stdin:
+            socket_path = os.path.join(test_dir, "daemon.sock")
+            server = daemon.Daemon(socket_path, daemon.DaemonRequestHandler)
+            thread = threading.Thread(target=server.handle_request)
+            thread.start()
+
+            with open(write_fd, "w") as pipe:
+                pipe.write("line 1\nline 2\n")
+
+            stdout = io.TextIOWrapper(io.BytesIO())
+
+            with (
+                mock.patch("intelliterm.daemon.DAEMON_SOCKET_PATH", socket_path),
+                mock.patch("intelliterm.daemon.serve_request", serve_request),
+                mock.patch("sys.stdin", stdin),
+                mock.patch("sys.stdout", stdout),
+            ):
+                exit_code = daemon.forward(["hi"])
+
+            thread.join()
+            server.server_close()
+
+            self.assertEqual(0, exit_code)
+            self.assertEqual(
+                b"line 1\nline 2\n", stdout.buffer.getvalue()  # type: ignore
+            )
+
+    def test_forward_to_busy_daemon(self) -> None:
+        with TemporaryDirectory() as test_dir:
+            socket_path = os.path.join(test_dir, "daemon.sock")
+
+            # (listening, but not accepting: serving another invocation)
+            with (
+                daemon.Daemon(socket_path, daemon.DaemonRequestHandler),
+                mock.patch("intelliterm.daemon.DAEMON_SOCKET_PATH", socket_path),
+            ):
+                self.assertIsNone(daemon.forward(["-m", "hi"]))
+
+    def test_environment(self) -> None:
+        with mock.patch.dict(os.environ, {"A": "daemon"}, clear=True):
+            with daemon.environment({"A": "client", "B": None}):
+                self.assertEqual({"A": "client"}, dict(os.environ))
+            with daemon.environment({"A": None, "B": "client"}):
+                self.assertEqual({"B": "client"}, dict(os.environ))
+            self.assertEqual({"A": "daemon"}, dict(os.environ))
+
+    def test_forward_without_daemon(self) -> None:
+        with TemporaryDirectory() as test_dir:
+            socket_path = os.path.join(test_dir, "daemon.sock")
+
+            with mock.patch("intelliterm.daemon.DAEMON_SOCKET_PATH", socket_path):
+                self.assertIsNone(daemon.forward(["-m", "hi"]))
@@ -0,0 +1,76 @@
+from unittest import TestCase, mock
+
+from intelliterm.diff import chunk_files, parse_diff, summarize_ignored
+
+DIFF = """commit 1234
+Author: someone
+
+diff --git a/src/app.py b/src/app.py
+index 1a2b3c4..5d6e7f8 100644
+--- a/src/app.py
++++ b/src/app.py
+@@ -1,2 +1,2 @@
+-print("hello")
++print("hi")
+@@ -10 +10,3 @@ def main():
++    one
++    two
++    three
+diff --git a/package-lock.json b/package-lock.json
+index 1111111..2222222 100644
+--- a/package-lock.json
++++ b/package-lock.json
+@@ -1 +1 @@
+-{}
++{"lockfileVersion": 3}
+diff --git a/logo.png b/logo.png
+new file mode 100644
+index 0000000..3333333
+Binary files /dev/null and b/logo.png differ
+"""
+
+
+class WordEncoding:
+    """Tokenizer stub (1 word = 1 token)."""
+
+    def encode(self, text: str) -> list[str]:
+        return text.split() if text else []
+
+    def decode(self, tokens: list[str]) -> str:
+        return " ".join(tokens)
+
+
+class TestDiff(TestCase):
+    def test_parse_diff(self) -> None:
+        file_diffs = list(parse_diff(DIFF.splitlines(keepends=True)))
+
+        self.assertEqual(
+            ["src/app.py", "package-lock.json", "logo.png"],
+            [file_diff.path for file_diff in file_diffs],
+        )
+        self.assertEqual([2, 0], [len(diff.hunks) for diff in file_diffs[::2]])
+        self.assertEqual(
+            [False, True, True], [file_diff.is_ignored() for file_diff in file_diffs]
+        )
+
+    def test_text_is_compact(self) -> None:
+        app = next(parse_diff(DIFF.splitlines(keepends=True)))
+
+        self.assertNotIn("index 1a2b3c4", app.text())
+        self.assertTrue(app.text().startswith("diff --git a/src/app.py b/src/app.py"))
+
+        truncated = app.text(max_hunk_lines=1)
+        self.assertIn('-print("hello")\n... (1 more lines)\n', truncated)
+        self.assertIn("+    one\n... (2 more lines)\n", truncated)
+
+    @mock.patch("intelliterm.prompt.get_encoding", lambda model: WordEncoding())
+    @mock.patch("intelliterm.chunking.get_encoding", lambda model: WordEncoding())
+    def test_chunk_files(self) -> None:
+        texts = ["a b\n", "c d\n", "e f g h i\n", "j\n"]
+        chunks = list(chunk_files(texts, max_tokens=4, model="gpt"))
+
+        self.assertEqual(["a b\nc d\n", "e f g h", "i", "j\n"], chunks)
+
+    def test_summarize_ignored(self) -> None:
+        self.assertEqual("", summarize_ignored([]))
+        self.assertIn("yarn.lock and 1 more", summarize_ignored(["a/yarn.lock"] * 2, 1))
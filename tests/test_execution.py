@@ -0,0 +1,59 @@
+import shutil
+import time
+from unittest import TestCase, mock
+
+from intelliterm import execution
+
+
+@mock.patch("intelliterm.execution.console")
+class TestExecution(TestCase):
+    def test_shell_pipes_and_quoting(self, console: mock.Mock) -> None:
+        result = execution.run("bash", "echo 'a b' | tr a-z A-Z", 10, 512)
+
+        assert result
+        self.assertEqual("A B\n", result.output)
+        self.assertEqual(0, result.exit_code)
+        console.out.assert_called()  # streamed
+
+    def test_output_captured(self, console: mock.Mock) -> None:
+        code = "import sys; print('out'); sys.exit('err')"
+        result = execution.run("python", code, 10, 512)
+
+        assert result
+        self.assertEqual(1, result.exit_code)
+        self.assertIn("out", result.output)
+        self.assertIn("err", result.output)
+        self.assertIn("exit code 1", result.as_context())
+
+    def test_timeout(self, console: mock.Mock) -> None:
+        start = time.time()
+        result = execution.run("sh", "sleep 30", 0.5, 512)
+
+        assert result
+        self.assertTrue(result.timed_out)
+        self.assertIsNone(result.exit_code)
+        self.assertLess(time.time() - start, 5)
+
+    def test_memory_limit(self, console: mock.Mock) -> None:
+        code = "x = bytearray(512 * 2**20)"
+        result = execution.run("python", code, 10, 128)
+
+        assert result
+        self.assertNotEqual(0, result.exit_code)
+        self.assertIn("MemoryError", result.output)
+
+    def test_output_tail_kept(self, console: mock.Mock) -> None:
+        with mock.patch.object(execution, "MAX_OUTPUT_CHARS", 100):
+            result = execution.run("python", "print('x' * 1000 + 'end')", 10, 512)
+
+        assert result
+        self.assertTrue(result.truncated)
+        self.assertEqual(100, len(result.output))
+        self.assertTrue(result.output.endswith("end\n"))
+
+    def test_unsupported(self, console: mock.Mock) -> None:
+        self.assertIsNone(execution.run("cobol", "DISPLAY 'HI'", 10, 512))
+        self.assertIsNone(execution.command("cobol", "", 512))
+        self.assertEqual(
+            shutil.which("python3"), (execution.command("py", "", 512) or [])[0]
+        )
@@ -0,0 +1,149 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase, mock
+
+from intelliterm import files
+
+
+class WordEncoding:
+    """Tokenizer stub (1 word = 1 token)."""
+
+    def encode(self, text: str) -> list[str]:
+        return text.split() if text else []
+
+
+@mock.patch("intelliterm.prompt.get_encoding", lambda model: WordEncoding())
+class TestFiles(TestCase):
+    def setUp(self) -> None:
+        self.test_dir = TemporaryDirectory()
+        self.root = self.test_dir.name
+        os.mkdir(os.path.join(self.root, ".git"))
+
+    def tearDown(self) -> None:
+        self.test_dir.cleanup()
+
+    def write(self, path: str, content: str | bytes) -> str:
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb" if isinstance(content, bytes) else "w") as file:
+            file.write(content)
+        return path
+
+    def relative(self, paths: list[str]) -> list[str]:
+        return [os.path.relpath(path, self.root) for path in paths]
+
+    def test_walk_respects_gitignore(self) -> None:
+        self.write(".gitignore", "*.log\nbuild/\n/top.txt\n")
+        self.write("src/.gitignore", "!keep.log\n")
+        for path in ["a.py", "top.txt", "x.log", "build/b.py", "src/top.txt"]:
+            self.write(path, "x")
+        self.write("src/keep.log", "x")
+        self.write(".git/HEAD", "x")
+
+        self.assertEqual(
+            ["a.py", "src/.gitignore", "src/keep.log", "src/top.txt", ".gitignore"],
+            sorted(self.relative(files.walk(self.root)), key=lambda p: p[0] == "."),
+        )
+
+    def test_expand(self) -> None:
+        self.write("a.py", "x")
+        self.write("b.md", "x")
+        self.write("src/c.py", "x")
+
+        paths = files.expand(
+            [os.path.join(self.root, "*.py"), os.path.join(self.root, "src"), ""]
+        )
+
+        self.assertEqual(["a.py", "src/c.py"], self.relative(paths))
+
+    def test_expand_glob_respects_gitignore(self) -> None:
+        self.write(".gitignore", "*.log\nbuild/\n")
+        for path in ["a.py", "x.log", "build/b.py", "build/c.log", "src/d.py"]:
+            self.write(path, "x")
+
+        paths = files.expand([os.path.join(self.root, "**", "*")])
+        self.assertEqual(["a.py", "src/d.py"], sorted(self.relative(paths)))
+
+        # (unless in the directory matched in, like walked directories)
+        paths = files.expand([os.path.join(self.root, "build", "*.py")])
+        self.assertEqual(["build/b.py"], self.relative(paths))
+
+    def test_is_binary(self) -> None:
+        self.assertTrue(files.is_binary(self.write("a.bin", b"\x89PNG\0\x01")))
+        self.assertTrue(files.is_binary(self.write("b.bin", bytes(range(1, 32)))))
+        self.assertFalse(files.is_binary(self.write("c.txt", "héllo")))
+        self.assertFalse(files.is_binary(self.write("d.txt", "hi".encode("utf-16"))))
+
+    def test_read_within_budget(self) -> None:
+        self.write("a.txt", "one two three")
+        self.write("b.bin", b"\0\0")
+        self.write("c.txt", "four five six seven")
+        self.write("d.txt", "eight")
+
+        file_inputs, skipped = files.read([self.root], token_budget=5)
+
+        self.assertEqual(["one two three", "eight"], [f.content for f in file_inputs])
+        self.assertEqual(["b.bin", "c.txt"], sorted(self.relative(skipped)))
+
+    def test_binary_not_counted_in_budget(self) -> None:
+        self.write("a.bin", b"\0" * 16)  # (estimated to fit the budget)
+        self.write("b.txt", "one two three")
+
+        file_inputs, skipped = files.read([self.root], token_budget=5)
+
+        self.assertEqual(["one two three"], [f.content for f in file_inputs])
+        self.assertEqual(["a.bin"], self.relative(skipped))
+
+    def test_parse_spec(self) -> None:
+        path = self.write("a:1", "x")
+
+        specs = {
+            "b.log:10-20": ("b.log", files.LineRange(10, 20)),
+            "b.log:10-": ("b.log", files.LineRange(10)),
+            "b.log:-5": ("b.log", files.LineRange(-5)),  # tail
+            "b.log:3": ("b.log", files.LineRange(3, 3)),
+            path: (path, None),  # existing file
+        }
+
+        for spec, expected in specs.items():
+            self.assertEqual(expected, files.parse_spec(spec))
+
+    def test_read_text_line_ranges(self) -> None:
+        lines = [f"line {i}\n" for i in range(1, 11)]
+
+        for encoding in ("utf-8", "utf-8-sig", "utf-16", "cp1252"):
+            path = self.write(f"{encoding}.log", "".join(lines).encode(encoding))
+
+            def read_text(*line_range: int) -> str:
+                return files.read_text(path, files.LineRange(*line_range))
+
+            self.assertEqual("".join(lines), files.read_text(path))
+            self.assertEqual("".join(lines[2:5]), read_text(3, 5))
+            self.assertEqual("".join(lines[:2]), read_text(1, 2))
+            self.assertEqual(lines[0], read_text(1, 1))
+            self.assertEqual("".join(lines[7:]), read_text(8))
+            self.assertEqual("".join(lines[-3:]), read_text(-3))
+            self.assertEqual("", read_text(20, 30))
+
+    def test_iter_lines_across_blocks(self) -> None:
+        lines = [f"{i} é\n" for i in range(3000)]
+        path = self.write("big.log", "".join(lines))
+        line_range = files.LineRange(1000, 2000)
+
+        with mock.patch.object(files, "BLOCK_SIZE", 1024):
+            self.assertEqual(lines, list(files.iter_lines(path)))
+            self.assertEqual(lines[999:2000], list(files.iter_lines(path, line_range)))
+
+    def test_invalid_bytes_replaced(self) -> None:
+        path = self.write("mixed.txt", b"ok \xe9\xff\n" + b"\x81" * 10)
+
+        self.assertTrue(files.read_text(path).startswith("ok "))
+
+    def test_split_paths(self) -> None:
+        path = self.write("a.py", "x")
+
+        self.assertEqual(
+            ([path, "*.md", f"{path}:1-2"], ["explain", "this"]),
+            files.split_paths([path, "*.md", f"{path}:1-2", "explain", "this"]),
+        )
+        self.assertEqual(([], ["missing.py"]), files.split_paths(["missing.py"]))
@@ -0,0 +1,45 @@
+import time
+from unittest import TestCase, mock
+
+from intelliterm.notifications import Notification
+
+
+@mock.patch("intelliterm.notifications.console")
+class TestNotification(TestCase):
+    def test_printed_without_display(self, console: mock.Mock) -> None:
+        notification = Notification()
+        notification.emit("saved")
+
+        console.info.assert_called_once_with("saved")
+
+    def test_queued_and_expired(self, console: mock.Mock) -> None:
+        refreshed: list[float] = []
+
+        def refresh() -> bool:
+            refreshed.append(time.monotonic())
+            return True
+
+        notification = Notification(duration=0.05)
+        notification.subscribe(refresh)
+
+        notification.emit("one")
+        notification.emit("two", duration=60)
+        console.info.assert_not_called()
+
+        self.assertEqual("one", notification.current())
+        time.sleep(0.1)
+        self.assertEqual("two", notification.current())
+        self.assertEqual("two", notification.current())
+        # (refreshed on emits, and when "one" expired)
+        self.assertEqual(3, len(refreshed))
+
+    def test_oldest_dropped(self, console: mock.Mock) -> None:
+        notification = Notification(duration=0, max_queued=2)
+        notification.subscribe(lambda: True)
+
+        for message in ["one", "two", "three"]:
+            notification.emit(message)
+
+        self.assertEqual("two", notification.current())
+        self.assertEqual("three", notification.current())
+        self.assertIsNone(notification.current())
@@ -0,0 +1,73 @@
+import pstats
+import tempfile
+import time
+from unittest import TestCase, mock
+
+from intelliterm.profiling import Profiler, Sampler
+
+
+def busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+@mock.patch("intelliterm.profiling.atexit")
+class TestProfiler(TestCase):
+    def setUp(self) -> None:
+        self.logs_dir = tempfile.mkdtemp()
+        patcher = mock.patch("intelliterm.profiling.LOGS_DIR", self.logs_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_disabled(self, atexit: mock.Mock) -> None:
+        profiler = Profiler()
+
+        with profiler.profile("response"):
+            busy(0.01)
+
+        self.assertIsNone(profiler.stop())
+        atexit.register.assert_not_called()
+
+    def test_cprofile_phase(self, atexit: mock.Mock) -> None:
+        profiler = Profiler()
+        profiler.start("cprofile", "response")
+        atexit.register.assert_called_once()
+
+        busy(0.01)  # (not the phase profiled)
+        with profiler.profile("response"):
+            time.sleep(0.01)
+
+        path = profiler.stop()
+        assert path is not None
+
+        with open(path) as file:
+            self.assertIn("sleep", file.read())
+        stats = pstats.Stats(path.replace(".txt", ".prof"))
+        functions = [function for _, _, function in stats.stats]  # type: ignore
+        self.assertIn("<built-in method time.sleep>", functions)
+        self.assertNotIn("busy", functions)
+
+    def test_sampling(self, atexit: mock.Mock) -> None:
+        profiler = Profiler()
+        profiler.start("sampling")
+        busy(0.2)
+        path = profiler.stop()
+        assert path is not None
+
+        with open(path) as file:
+            self.assertIn("busy (test_profiling.py", file.read())
+        with open(path.replace(".txt", ".folded")) as file:
+            self.assertRegex(file.read(), r"test_sampling .*;busy .* \d+\n")
+
+
+class TestSampler(TestCase):
+    def test_summary(self) -> None:
+        sampler = Sampler()
+        sampler.stacks.update({"main;render;markdown": 3, "main;read": 1})
+        summary = sampler.summary(top=1)
+
+        self.assertIn("4 samples", summary)
+        self.assertIn("3  75.0%  markdown", summary)
+        self.assertIn("4 100.0%  main", summary)
+        self.assertNotIn("read", summary)
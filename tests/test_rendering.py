@@ -0,0 +1,70 @@
+import io
+from unittest import TestCase, mock
+
+from rich.console import Console
+from rich.text import Text
+
+from intelliterm.rendering import Block, MarkdownStream, echo
+
+RESPONSE = (
+    "# Title\n\nSome text\nwrapped.\n\n- a\n- b\n\n  continued\n\n"
+    + "```python\nx = 1\n```\nAfter code.\n\n1. one\n2. two\n"
+)
+
+
+def render(deltas: list[str], max_live_lines: int = 20) -> tuple[str, list[str]]:
+    file = io.StringIO()
+    console = Console(file=file, width=40, force_terminal=False)
+
+    with MarkdownStream(console, max_live_lines=max_live_lines) as stream:
+        with mock.patch.object(stream, "_print", wraps=stream._print) as printed:
+            for delta in deltas:
+                stream.append(delta)
+    return file.getvalue(), [call.args[0] for call in printed.call_args_list]
+
+
+class TestRendering(TestCase):
+    def test_blocks_printed_once_complete(self) -> None:
+        whole, _ = render([RESPONSE])
+        output, blocks = render([RESPONSE[i : i + 3] for i in range(0, 999, 3)])
+
+        self.assertEqual(whole, output)
+        self.assertEqual(
+            [
+                "# Title\n\n",
+                "Some text\nwrapped.\n\n",
+                "- a\n- b\n\n  continued\n\n",
+                "```python\nx = 1\n```\n",
+                "After code.\n\n",
+            ],
+            blocks,
+        )
+
+    def test_long_code_printed_in_parts(self) -> None:
+        code = "".join(f"x = {i}\n" for i in range(10))
+        _, blocks = render(["```py\n", code, "```\n"], max_live_lines=4)
+
+        self.assertEqual("```py\nx = 0\nx = 1\nx = 2\nx = 3\nx = 4\n```\n", blocks[0])
+        self.assertTrue(all(block.startswith("```py\n") for block in blocks))
+
+    def test_longer_fences(self) -> None:
+        content = "````md\n```py\nx = 1\n```\n````\nAfter.\n\nEnd\n"
+        _, blocks = render([content[i : i + 3] for i in range(0, len(content), 3)])
+
+        # (inner, shorter fence doesn't close the block)
+        self.assertEqual(["````md\n```py\nx = 1\n```\n````\n", "After.\n\n"], blocks)
+
+    def test_block_strips_leading_blank_lines(self) -> None:
+        console = Console(width=20, force_terminal=False)
+
+        with console.capture() as capture:
+            console.print(Block("- a"))
+        self.assertEqual(" • a", capture.get().rstrip())
+
+    def test_echo_summarizes_large_input(self) -> None:
+        summary = echo("first line\n" + "x\n" * 1000)
+
+        assert isinstance(summary, Text)
+        self.assertIn("first line…", summary.plain)
+        self.assertIn("1001 lines", summary.plain)
+        self.assertNotIsInstance(echo("short"), Text)
@@ -0,0 +1,56 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from intelliterm.retrieval import Index, chunk_lines, terms
+
+
+class TestRetrieval(TestCase):
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        patcher = mock.patch("intelliterm.retrieval.INDEX_DIR", tempfile.mkdtemp())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.write("client.py", "def get_response(prompt):\n    return stream\n")
+        self.write("render.py", "class MarkdownStream:\n    def append(delta):\n")
+        self.write("notes.md", "Streaming responses are rendered as markdown.\n")
+
+    def write(self, name: str, content: str) -> None:
+        with open(os.path.join(self.root, name), "w") as file:
+            file.write(content)
+
+    def test_terms(self) -> None:
+        self.assertEqual(
+            ["getresponse", "get", "response", "max_tokens", "max", "tokens"],
+            terms("getResponse(max_tokens=1)"),
+        )
+
+    def test_chunk_lines(self) -> None:
+        lines = [f"{i}\n" for i in range(1, 101)]
+        self.assertEqual(
+            [(1, 40), (41, 80), (81, 100)],
+            [(start, end) for start, end, _ in chunk_lines(lines)],
+        )
+
+    def test_search(self) -> None:
+        index = Index.load(self.root)
+        self.assertEqual((3, 0), index.update())
+
+        hits = index.search("how is the response streamed?", k=2)
+        self.assertEqual("client.py:1-2", hits[0].name)
+        self.assertIn("def get_response", hits[0].content)
+        self.assertEqual([], index.search("unrelated", k=2))
+
+    def test_incremental(self) -> None:
+        Index.load(self.root).update()
+        index = Index.load(self.root)  # (saved)
+        self.assertEqual((0, 0), index.update())
+
+        self.write("client.py", "def complete(context):\n    pass\n")
+        os.utime(os.path.join(self.root, "client.py"), (1, 1))
+        os.remove(os.path.join(self.root, "notes.md"))
+        self.assertEqual((1, 1), index.update())
+
+        hits = index.search("complete streaming", k=3)
+        self.assertEqual(["client.py:1-2"], [hit.name for hit in hits])
@@ -0,0 +1,138 @@
+import dataclasses
+import io
+import json
+import os
+import tempfile
+import time
+from unittest import TestCase, mock
+
+from rich.console import Console
+
+from intelliterm.stats import (
+    LATENCY_BUCKETS,
+    Measurement,
+    Stats,
+    histogram,
+    load_saved,
+    percentile,
+    summarize,
+)
+from intelliterm.types import Backend
+
+
+def measurement(config: str = "gpt", latency: float = 2.0) -> Measurement:
+    return Measurement(
+        config=config,
+        model="model",
+        latency=latency,
+        ttft=0.5,
+        tokens_sent=100,
+        tokens_received=30,
+    )
+
+
+class TestStats(TestCase):
+    def test_percentile(self) -> None:
+        values = [float(i) for i in range(1, 101)]
+
+        self.assertEqual(50, percentile(values, 50))
+        self.assertEqual(99, percentile(values, 99))
+        self.assertEqual(1, percentile(values, 0))
+        self.assertEqual(7, percentile([7.0], 90))
+
+    def test_histogram(self) -> None:
+        counts = histogram([0.1, 0.5, 0.6, 3, 100], LATENCY_BUCKETS)
+
+        self.assertEqual([2, 1, 0, 1, 0, 0, 0, 1], counts)
+
+    def test_tokens_per_second(self) -> None:
+        self.assertEqual(20, measurement().tokens_per_second)
+        self.assertIsNone(measurement(latency=0.5).tokens_per_second)
+
+    def test_cache_rates(self) -> None:
+        stats = Stats()
+        stats.register_cache("used", lambda: (3, 1))
+        stats.register_cache("unused", lambda: (0, 0))
+
+        self.assertEqual({"used": 0.75, "unused": None}, stats.cache_rates())
+
+    def test_load_saved(self) -> None:
+        directory = tempfile.mkdtemp()
+        saved = measurement()
+        context = [
+            {"role": "user", "content": "hi", "stats": None},
+            {"role": "assistant", "content": "hello", "stats": saved.to_dict()},
+            {"role": "assistant", "content": "(saved before stats)"},
+        ]
+
+        with open(os.path.join(directory, "chat.json"), "w") as file:
+            json.dump({"_context": context}, file)
+        with open(os.path.join(directory, "broken.json"), "w") as file:
+            file.write("{")
+
+        with mock.patch("intelliterm.stats.SAVED_CHATS_DIR", directory):
+            self.assertEqual([saved], list(load_saved()))
+
+    def test_summarize(self) -> None:
+        file = io.StringIO()
+        console = Console(file=file, width=120, force_terminal=False)
+        measurements = [measurement("gpt", 1.0), measurement("claude", 40.0)]
+
+        console.print(summarize(measurements, 2048, {"toolbar": 0.5}))
+        output = file.getvalue()
+
+        self.assertIn("claude", output)
+        self.assertIn("1.00s / 1.00s / 1.00s", output)
+        self.assertIn("2.0 KiB", output)
+        self.assertIn("toolbar 50%", output)
+
+    @mock.patch("intelliterm.client.count_tokens", lambda text, model=None: len(text))
+    def test_measured_with_settings_sent(self) -> None:
+        from intelliterm.client import Client
+        from intelliterm.config import config
+
+        # (ie: `!use` typed ahead while response is streaming)
+        sent = dataclasses.replace(config.settings(), name="SENT", model="sent")
+        client = Client(Backend.OPENAI)
+
+        with mock.patch("intelliterm.client.MarkdownStream"), mock.patch(
+            "intelliterm.client.stats"
+        ):
+            client.stream(iter(["a", "b"]), time.perf_counter(), [], sent)
+
+        assert client.measurement is not None
+        self.assertEqual(
+            ("SENT", "sent", 2),
+            (
+                client.measurement.config,
+                client.measurement.model,
+                client.measurement.tokens_received,
+            ),
+        )
+
+    def test_measured_without_tokenizer(self) -> None:
+        from intelliterm.client import Client
+        from intelliterm.config import config
+        from intelliterm.prompt import Prompt
+
+        client = Client(Backend.OPENAI)
+
+        # (ie: offline, encoding not cached)
+        with mock.patch(
+            "intelliterm.prompt.get_encoding", side_effect=OSError("offline")
+        ), mock.patch("intelliterm.client.MarkdownStream"), mock.patch(
+            "intelliterm.client.stats"
+        ):
+            content = client.stream(
+                iter(["abcd", "efgh"]),
+                time.perf_counter(),
+                [Prompt(content="x" * 40)],
+                config.settings(),
+            )
+
+        assert client.measurement is not None
+        self.assertEqual("abcdefgh", content)
+        self.assertEqual(
+            (10, 2),
+            (client.measurement.tokens_sent, client.measurement.tokens_received),
+        )
@@ -0,0 +1,61 @@
+import json
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from intelliterm.tracing import NULL_SPAN, Tracer, traced
+
+
+class TestTracer(TestCase):
+    def setUp(self) -> None:
+        self.tracer = Tracer()
+        self.path = os.path.join(tempfile.mkdtemp(), "trace.json")
+
+    def test_disabled_is_noop(self) -> None:
+        self.assertIs(NULL_SPAN, self.tracer.span("noop"))
+        self.tracer.instant("noop")
+        self.tracer.write()
+
+        self.assertFalse(self.tracer.enabled)
+        self.assertFalse(os.path.exists(self.path))
+
+    @mock.patch("intelliterm.tracing.atexit")
+    def test_written_as_trace_events(self, atexit: mock.Mock) -> None:
+        self.tracer.start(self.path)
+        atexit.register.assert_called_once_with(self.tracer.write)
+
+        with self.tracer.span("client.request", backend="openai"):
+            self.tracer.instant("client.first_token")
+
+        with self.assertRaises(KeyError):
+            with self.tracer.span("chat.save"):
+                raise KeyError
+        self.tracer.write()
+
+        with open(self.path) as file:
+            events = json.load(file)["traceEvents"]
+        by_name = {event["name"]: event for event in events}
+
+        request = by_name["client.request"]
+        self.assertEqual(("X", "client"), (request["ph"], request["cat"]))
+        self.assertEqual({"backend": "openai"}, request["args"])
+        self.assertLessEqual(request["ts"], by_name["client.first_token"]["ts"])
+        self.assertEqual("i", by_name["client.first_token"]["ph"])
+        self.assertEqual({"error": "KeyError"}, by_name["chat.save"]["args"])
+        self.assertIn("thread_name", by_name)
+
+    @mock.patch("intelliterm.tracing.atexit")
+    def test_traced(self, atexit: mock.Mock) -> None:
+        @traced("double")
+        def double(x: int) -> int:
+            return 2 * x
+
+        with mock.patch("intelliterm.tracing.tracer", self.tracer):
+            self.assertEqual(4, double(2))
+            self.tracer.start(self.path)
+            self.assertEqual(6, double(3))
+            self.tracer.write()
+
+        with open(self.path) as file:
+            events = json.load(file)["traceEvents"]
+        self.assertEqual(1, [event["name"] for event in events].count("double"))
@@ -0,0 +1,30 @@
+from unittest import TestCase
+
+from intelliterm.typeahead import TypeAhead
+
+
+class TestTypeAhead(TestCase):
+    def test_lines_and_editing(self) -> None:
+        typeahead = TypeAhead()
+        typeahead.feed("helo\x7flo\rsecond\x1b[Dline\r\r")
+        typeahead.feed("draft \x15dr")
+
+        self.assertEqual(["hello", "secondline"], list(typeahead.lines))
+        self.assertEqual("dr", typeahead.text)
+
+    def test_lines_handled(self) -> None:
+        handled: list[str] = []
+
+        def on_line(line: str) -> bool:
+            handled.append(line)
+            return line.startswith("!")
+
+        typeahead = TypeAhead(on_line)
+        typeahead.feed("!help\nwhy?\n")
+
+        self.assertEqual(["!help", "why?"], handled)
+        self.assertEqual(["why?"], list(typeahead.lines))
+
+    def test_not_a_terminal(self) -> None:
+        with TypeAhead() as typeahead:  # (stdin is not a terminal under pytest)
+            self.assertIsNone(typeahead._thread)
@@ -0,0 +1,75 @@
+import logging
+import os
+import subprocess
+import tempfile
+from unittest import TestCase, mock
+
+from intelliterm.utils import (
+    LogFileHandler,
+    remove_legacy_logs,
+    remove_old_logs,
+    shorten,
+)
+
+
+class TestLogging(TestCase):
+    def setUp(self) -> None:
+        self.logs_dir = tempfile.mkdtemp()
+
+    def test_shorten(self) -> None:
+        self.assertEqual("short", shorten("short", 5))
+        self.assertEqual("long … (10 chars)", shorten("long input", 5))
+
+    def test_rotated_by_size(self) -> None:
+        path = os.path.join(self.logs_dir, "test.log")
+        handler = LogFileHandler(path, max_bytes=100, max_age=3600, backups=2)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        for i in range(20):
+            handler.handle(logging.makeLogRecord({"msg": f"{i:02} " + "x" * 40}))
+        handler.close()
+
+        files = sorted(os.listdir(self.logs_dir))
+        self.assertEqual(3, len(files))  # (current and 2 backups)
+        with open(path) as file:
+            self.assertIn("19 ", file.read())
+        self.assertLessEqual(os.path.getsize(path), 100)
+
+    def test_remove_legacy_logs(self) -> None:
+        names = [f"intelliterm_logs_2024-01-0{i}_00-00-00.log" for i in range(1, 5)]
+
+        for name in names + ["intelliterm.log"]:
+            open(os.path.join(self.logs_dir, name), "w").close()
+
+        with mock.patch("intelliterm.utils.LOGS_DIR", self.logs_dir):
+            remove_legacy_logs(keep=1)
+
+        self.assertEqual(
+            sorted([names[-1], "intelliterm.log"]), sorted(os.listdir(self.logs_dir))
+        )
+
+    def test_remove_old_logs(self) -> None:
+        ended = subprocess.Popen(["true"])
+        ended.wait()
+        live = os.getpid()
+        names = [
+            f"intelliterm.{live}.log",  # (oldest, but running)
+            "intelliterm.log",  # (previous version)
+            f"intelliterm.{ended.pid}.log.2024-01-01_00-00-00",
+            f"intelliterm.{ended.pid}.log",
+            f"intelliterm.{live}.log.2024-01-01_00-00-00",
+        ]
+
+        for i, name in enumerate(names):
+            path = os.path.join(self.logs_dir, name)
+            open(path, "w").close()
+            os.utime(path, (i, i))
+        open(os.path.join(self.logs_dir, "other.log"), "w").close()
+
+        with mock.patch("intelliterm.utils.LOGS_DIR", self.logs_dir):
+            remove_old_logs(keep=1)
+
+        self.assertEqual(
+            sorted(names[:1] + names[2:] + ["other.log"]),
+            sorted(os.listdir(self.logs_dir)),
+        )
@@ -0,0 +1,75 @@
+import time
+from unittest import TestCase, mock
+
+from intelliterm import execution
+from intelliterm.warm_pool import WarmPool
+
+
+@mock.patch("intelliterm.execution.console")
+class TestWarmPool(TestCase):
+    def setUp(self) -> None:
+        self.pool = WarmPool()
+        self.pool.start(("json",))
+
+    def tearDown(self) -> None:
+        self.pool.stop()
+
+    def run_warm(self, code: str, timeout: float = 10) -> execution.RunResult:
+        with mock.patch("intelliterm.warm_pool.pool", self.pool):
+            result = execution.run("python", code, timeout, 512, warm=True)
+        assert result
+        return result
+
+    def test_runs_are_isolated(self, console: mock.Mock) -> None:
+        code = "import sys; print(__name__, 'json' in sys.modules); x = 1"
+        self.assertEqual("__main__ True\n", self.run_warm(code).output)
+
+        result = self.run_warm("import sys; print(x)")
+        self.assertIn("NameError", result.output)
+        self.assertEqual(1, result.exit_code)
+
+    def test_exit_code_and_output(self, console: mock.Mock) -> None:
+        result = self.run_warm("import sys; print('out'); sys.exit('err')")
+
+        self.assertEqual("out\nerr\n", result.output)
+        self.assertEqual(1, result.exit_code)
+        self.assertEqual(3, self.run_warm("raise SystemExit(3)").exit_code)
+
+    def test_timeout(self, console: mock.Mock) -> None:
+        start = time.time()
+        result = self.run_warm("import time; time.sleep(30)", timeout=0.5)
+
+        self.assertTrue(result.timed_out)
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual("ok\n", self.run_warm("print('ok')").output)
+
+    def test_falls_back_to_cold(self, console: mock.Mock) -> None:
+        self.pool.stop()
+        self.pool.start()
+        assert self.pool._process
+        self.pool._process.kill()
+        self.pool._process.wait()
+
+        with mock.patch.object(self.pool, "is_running", return_value=True):
+            self.assertEqual("ok\n", self.run_warm("print('ok')").output)
+
+    def test_same_interpreter_as_cold(self, console: mock.Mock) -> None:
+        code = "import sys; print(sys.executable, sys.path[0] == '')"
+        cold = execution.run("python", code, 10, 512)
+
+        assert cold
+        self.assertEqual(cold.output, self.run_warm(code).output)
+
+    def test_preload_failure(self, console: mock.Mock) -> None:
+        self.pool.start(("json", "no_such_module"))
+
+        self.assertEqual("ok\n", self.run_warm("print('ok')").output)
+        console.warning.assert_called_once()
+        self.assertIn("no_such_module", console.warning.call_args[0][0])
+        self.assertIn("no_such_module", self.pool.error or "")
+
+        # (not restarted with the same modules, runs cold)
+        self.pool.start(("json", "no_such_module"))
+        self.assertFalse(self.pool.is_started())
+        self.assertEqual("ok\n", self.run_warm("print('ok')").output)
+        console.warning.assert_called_once()